@@ -0,0 +1,50 @@
+"""Measures allocations, peak RSS and time of parse + typecheck + IR generation.
+
+Run with `poetry run python benchmarks/ast_memory_benchmark.py [statements]`.
+Run it in a fresh process each time, since peak RSS only grows.
+"""
+import resource
+import sys
+import time
+
+from compiler.ir_generator import generate_ir
+from compiler.parser import parse
+from compiler.symtab import create_global_symtab
+from compiler.tokenizer import iter_tokens
+from compiler.typecheck import typecheck
+
+
+def generate_source(statements: int) -> str:
+    body = ''.join(
+        f'var x{i % 100} = {i} + 2 * 3; if x{i % 100} < 10 then {{ -x{i % 100} }} else {{ x{i % 100} }}; '
+        for i in range(statements)
+    )
+    return '{ ' + body + 'True }'
+
+
+def main() -> None:
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    source = generate_source(statements)
+    reserved = set(create_global_symtab().symbols.keys()) | {'print_int', 'print_bool'}
+    blocks_before = sys.getallocatedblocks()
+
+    start = time.perf_counter()
+    tree = parse(iter_tokens(source))
+    parsed = time.perf_counter()
+    typecheck(tree)
+    checked = time.perf_counter()
+    instructions = generate_ir(reserved, tree)
+    generated = time.perf_counter()
+
+    blocks = sys.getallocatedblocks() - blocks_before
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f'{statements} statements, {len(instructions)} IR instructions')
+    print(f'parse        {parsed - start:>8.3f}s')
+    print(f'typecheck    {checked - parsed:>8.3f}s')
+    print(f'generate_ir  {generated - checked:>8.3f}s')
+    print(f'live allocations  {blocks}')
+    print(f'peak RSS          {peak_rss / 1024:.1f}MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Measures the latency of each compiler stage, and compares running the
+compiled executable with interpret().
+
+Run with `poetry run python benchmarks/backend_benchmark.py [runs]`.
+The executable's time includes starting the process.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from compiler.compiler import compile_to_executable
+from compiler.instrumentation import CompileReport
+from compiler.interpreter import interpret
+from compiler.parser import parse
+from compiler.tokenizer import tokenize
+from bytecode_benchmark import PROGRAMS, arithmetic, branches
+from closure_compiler_benchmark import generate_program
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    sys.setrecursionlimit(100_000)
+    programs = {
+        **PROGRAMS,
+        'arithmetic x10': arithmetic(5000),
+        'statements x10': generate_program(2000),
+        'branches x10': branches(5000),
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name, source in programs.items():
+            report = CompileReport()
+            executable = compile_to_executable(source, report=report)
+            path = os.path.join(work_dir, 'program')
+            with open(path, 'wb') as f:
+                f.write(executable)
+            os.chmod(path, 0o755)
+
+            tree = parse(tokenize(source))
+            start = time.perf_counter()
+            for _ in range(runs):
+                interpret(tree)
+            interpreted = (time.perf_counter() - start) / runs
+            start = time.perf_counter()
+            for _ in range(runs):
+                subprocess.run([path], stdout=subprocess.DEVNULL, check=True)
+            native = (time.perf_counter() - start) / runs
+
+            print(f'{name}: compiled in {report.wall_seconds * 1000:.1f}ms')
+            for stage in report.stages:
+                print(f'    {stage.name:<18} {stage.wall_seconds * 1000:>8.2f}ms')
+            print(f'    interpret()        {interpreted * 1000:>8.3f}ms per run')
+            print(f'    executable         {native * 1000:>8.3f}ms per run ({interpreted / native:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Compares compiling many small programs one at a time with compiling
+them as a batch, with the CLI and with each server mode.
+
+Run with `poetry run python benchmarks/batch_compile_benchmark.py [programs]`.
+"""
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from server_load_test import MAIN, free_port, send
+
+
+def programs(count: int) -> list[str]:
+    return [f'{{ var x = {i}; if x % 3 == 0 then print_int(x * 7) else print_bool(x > 10); x }}'
+            for i in range(count)]
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    codes = programs(count)
+    print(f'{count} programs')
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        paths = [Path(work_dir) / f'program{i}.src' for i in range(count)]
+        for path, code in zip(paths, codes):
+            path.write_text(code)
+        start = time.perf_counter()
+        for path in paths:
+            subprocess.run([sys.executable, str(MAIN), 'compile', str(path), f'--output={path}.out'], check=True)
+        print(f'{"compile, one by one":<28} {time.perf_counter() - start:>7.2f}s')
+        start = time.perf_counter()
+        subprocess.run([sys.executable, str(MAIN), 'compile', '--batch', f'--output={work_dir}/out',
+                        *map(str, paths)], check=True)
+        print(f'{"compile --batch":<28} {time.perf_counter() - start:>7.2f}s')
+
+    for mode, args in {'forking': [], 'workers=4': ['--workers=4'], 'asyncio': ['--async']}.items():
+        port = free_port()
+        server = subprocess.Popen([sys.executable, str(MAIN), 'serve', f'--port={port}', *args],
+                                  stdout=subprocess.DEVNULL)
+        try:
+            for _ in range(200):
+                try:
+                    send(port, b'{"command": "ping"}')
+                    break
+                except ConnectionError:
+                    time.sleep(0.05)
+            start = time.perf_counter()
+            for code in codes:
+                send(port, json.dumps({'command': 'compile', 'code': code}).encode())
+            one_by_one = time.perf_counter() - start
+            batched = send(port, json.dumps({'command': 'compile_batch', 'codes': codes}).encode())
+            print(f'{mode + ", one by one":<28} {one_by_one:>7.2f}s')
+            print(f'{mode + ", compile_batch":<28} {batched:>7.2f}s')
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
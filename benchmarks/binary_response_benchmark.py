@@ -0,0 +1,74 @@
+"""Compares the throughput and peak memory of JSON and binary responses
+for large executables.
+
+Run with `poetry run python benchmarks/binary_response_benchmark.py [requests]`.
+Executables of each size are put in a compile cache in advance, so the
+requests measure only sending them. The server runs one pre-forked
+worker, and its peak RSS (VmHWM) is read from /proc after the requests.
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from compiler.compile_cache import CompileCache
+from server_load_test import MAIN, free_port, send
+
+
+def receive_all(port: int, data: bytes) -> int:
+    with socket.create_connection(('127.0.0.1', port)) as s:
+        s.sendall(data)
+        s.shutdown(socket.SHUT_WR)
+        received = 0
+        buffer = bytearray(1 << 20)
+        while count := s.recv_into(buffer):
+            received += count
+    return received
+
+
+def peak_rss_kib(pid: int) -> int:
+    for line in Path(f'/proc/{pid}/status').read_text().splitlines():
+        if line.startswith('VmHWM:'):
+            return int(line.split()[1])
+    raise Exception('no VmHWM')
+
+
+def main() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with tempfile.TemporaryDirectory() as cache_dir:
+        print(f'{"size":>6} {"response":<8} {"sent":>10} {"MB/s":>8} {"req/s":>7} {"worker peak RSS":>16}')
+        for megabytes in [1, 8, 32]:
+            code = f'print_int({megabytes})'
+            cache = CompileCache(cache_dir, max_bytes=1 << 30)
+            cache.put(cache.key(code, {'optimization_level': 1}), os.urandom(megabytes << 20))
+            for binary in [False, True]:
+                port = free_port()
+                server = subprocess.Popen([sys.executable, str(MAIN), 'serve', f'--port={port}', '--workers=1',
+                                           f'--cache-dir={cache_dir}', f'--cache-size={1 << 30}'],
+                                          stdout=subprocess.DEVNULL)
+                try:
+                    for _ in range(200):
+                        try:
+                            send(port, b'{"command": "ping"}')
+                            break
+                        except ConnectionError:
+                            time.sleep(0.05)
+                    (worker,) = Path(f'/proc/{server.pid}/task/{server.pid}/children').read_text().split()
+                    request = json.dumps({'command': 'compile', 'code': code, 'binary': binary}).encode()
+                    start = time.perf_counter()
+                    total = sum(receive_all(port, request) for _ in range(requests))
+                    seconds = time.perf_counter() - start
+                    rss = peak_rss_kib(int(worker))
+                finally:
+                    server.terminate()
+                    server.wait()
+                print(f'{megabytes:>4}MB {"binary" if binary else "json":<8} {total // requests:>10} '
+                      f'{total / seconds / 1e6:>8.1f} {requests / seconds:>7.1f} {rss / 1024:>13.1f}MiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Compares interpret(), compile_closures() and the bytecode VM.
+
+Run with `poetry run python benchmarks/bytecode_benchmark.py [runs]`.
+Each program is evaluated `runs` times. Compile times are measured
+separately and not included in the run times.
+"""
+import sys
+import time
+from typing import Callable
+
+from compiler.bytecode import compile_bytecode
+from compiler.closure_compiler import compile_closures
+from compiler.interpreter import interpret
+from compiler.parser import parse
+from compiler.tokenizer import tokenize
+from compiler.vm import run_bytecode
+from closure_compiler_benchmark import generate_program
+from scope_benchmark import generate_program as generate_nested_program
+
+
+def arithmetic(terms: int) -> str:
+    return '{ var x = 3; ' + ' + '.join(f'x * {i} - {i} % 7' for i in range(terms)) + ' }'
+
+
+def branches(count: int) -> str:
+    body = ''.join(
+        f'if x < {i} and not (x == 0) or x > 1000 then {{ x = x + 3 }} else {{ x = x - 1 }}; '
+        for i in range(count)
+    )
+    return f'{{ var x = 1; {body}x }}'
+
+
+PROGRAMS: dict[str, str] = {
+    'arithmetic': arithmetic(500),
+    'branches': branches(500),
+    'statements': generate_program(200),
+    'nested shadowing': generate_nested_program(100, 200),
+}
+
+
+def measure(run: Callable[[], object], runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        run()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    sys.setrecursionlimit(100_000)
+    print(f'{"program":<18} {"interpret":>10} {"closures":>10} {"vm":>10} {"vm compile":>11} {"vm speedup":>11}')
+    for name, source in PROGRAMS.items():
+        tree = parse(tokenize(source))
+        interpreted = measure(lambda: interpret(tree), runs)
+        closures = measure(compile_closures(tree), runs)
+        start = time.perf_counter()
+        bytecode = compile_bytecode(tree)
+        compile_seconds = time.perf_counter() - start
+        assert run_bytecode(bytecode) == interpret(tree)
+        vm = measure(lambda: run_bytecode(bytecode), runs)
+        print(f'{name:<18} {interpreted:>9.3f}s {closures:>9.3f}s {vm:>9.3f}s {compile_seconds:>10.4f}s '
+              f'{interpreted / vm:>10.1f}x')
+
+
+if __name__ == '__main__':
+    main()
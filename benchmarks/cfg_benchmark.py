@@ -0,0 +1,51 @@
+"""Measures building the CFG and solving liveness and reaching definitions.
+
+Run with `poetry run python benchmarks/cfg_benchmark.py [max_instructions]`.
+The time per instruction should stay roughly constant as the IR grows.
+The IR is moved out of the garbage collector's reach with gc.freeze()
+before measuring, since otherwise collections that walk the whole IR
+dominate at the larger sizes.
+"""
+import gc
+import sys
+import time
+
+from compiler.cfg import build_cfg, liveness, reaching_definitions
+from compiler.ir_generator import generate_ir
+from compiler.parser import parse
+from compiler.symtab import create_global_symtab
+from compiler.tokenizer import tokenize
+from compiler.typecheck import typecheck
+from bytecode_benchmark import branches
+
+RESERVED = set(create_global_symtab().symbols.keys()) | {'print_int', 'print_bool'}
+
+
+def main() -> None:
+    max_instructions = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    sys.setrecursionlimit(100_000)
+    print(f'{"instructions":>12} {"blocks":>7} {"build":>9} {"liveness":>9} {"reaching":>9} {"us/insn":>8}')
+    for size in [max_instructions // 2 ** k for k in range(5, -1, -1)]:
+        # Each if statement of `branches` is 36 IR instructions
+        tree = parse(tokenize(branches(size // 36)))
+        typecheck(tree)
+        instructions = generate_ir(RESERVED, tree)
+        gc.collect()
+        gc.freeze()
+        start = time.perf_counter()
+        cfg = build_cfg(instructions)
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        liveness(cfg)
+        liveness_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        reaching_definitions(cfg)
+        reaching_seconds = time.perf_counter() - start
+        total = build_seconds + liveness_seconds + reaching_seconds
+        print(f'{len(instructions):>12} {len(cfg.blocks):>7} {build_seconds:>8.3f}s {liveness_seconds:>8.3f}s '
+              f'{reaching_seconds:>8.3f}s {total * 1e6 / len(instructions):>8.2f}')
+        gc.unfreeze()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Compares running a program many times with interpret() and with
+compile_closures().
+
+Run with `poetry run python benchmarks/closure_compiler_benchmark.py [runs]`.
+The language has no loops, so the hot path of a loop is simulated by
+evaluating the same program repeatedly.
+"""
+import sys
+import time
+from typing import Callable
+
+from compiler.closure_compiler import compile_closures
+from compiler.interpreter import interpret
+from compiler.parser import parse
+from compiler.tokenizer import tokenize
+
+STATEMENT = '''
+    var x{i} = total * 3 + {i} - (total % 7);
+    {{ var total = x{i} / 2; x{i} = x{i} - total }};
+    if x{i} > 100 and not (x{i} == 0) then {{ total = x{i} / 5 }} else {{ total = total + 1 }};
+'''
+
+
+def generate_program(statements: int) -> str:
+    body = ''.join(STATEMENT.format(i=i) for i in range(statements))
+    return f'{{ var total = 1;{body} total }}'
+
+
+def measure(run: Callable[[], object], runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        run()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f'{"statements":>10} {"interpret":>10} {"compile":>10} {"closures":>10} {"speedup":>8}')
+    for statements in [10, 100, 1000]:
+        tree = parse(tokenize(generate_program(statements)))
+        interpreted = measure(lambda: interpret(tree), runs)
+        start = time.perf_counter()
+        run = compile_closures(tree)
+        compile_seconds = time.perf_counter() - start
+        assert run() == interpret(tree)
+        compiled = measure(run, runs)
+        print(f'{statements:>10} {interpreted:>9.3f}s {compile_seconds:>9.4f}s {compiled:>9.3f}s '
+              f'{interpreted / compiled:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
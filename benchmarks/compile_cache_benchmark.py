@@ -0,0 +1,34 @@
+"""Compares compiling a program with fetching it from CompileCache.
+
+Run with `poetry run python benchmarks/compile_cache_benchmark.py [runs]`.
+"""
+import sys
+import tempfile
+import time
+
+from compiler.compile_cache import CompileCache
+from compiler.compiler import compile_to_executable
+from bytecode_benchmark import PROGRAMS
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    sys.setrecursionlimit(100_000)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = CompileCache(cache_dir)
+        print(f'{"program":<18} {"compile":>10} {"cached":>10}')
+        for name, source in PROGRAMS.items():
+            options = {'optimization_level': 1}
+            start = time.perf_counter()
+            cache.get_or_compile(source, options, lambda: compile_to_executable(source))
+            miss = time.perf_counter() - start
+            start = time.perf_counter()
+            for _ in range(runs):
+                cache.get_or_compile(source, options, lambda: compile_to_executable(source))
+            hit = (time.perf_counter() - start) / runs
+            print(f'{name:<18} {miss * 1000:>8.1f}ms {hit * 1_000_000:>8.1f}us')
+        print(cache.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Reports what fold_constants() removes from constant-heavy programs.
+
+Run with `poetry run python benchmarks/constant_folding_benchmark.py`.
+For each program it prints the AST nodes and IR instructions before and
+after folding, the time of the pass, and the run_ir() time of the IR.
+"""
+import random
+import sys
+import time
+
+from compiler.constant_folding import count_nodes, fold_constants
+from compiler.ir_generator import generate_ir
+from compiler.ir_interpreter import load_ir, run_ir
+from compiler.parser import parse
+from compiler.symtab import create_global_symtab
+from compiler.tokenizer import tokenize
+from compiler.typecheck import typecheck
+from bytecode_benchmark import PROGRAMS
+
+RESERVED = set(create_global_symtab().symbols.keys()) | {'print_int', 'print_bool'}
+
+
+def constant_expression(rng: random.Random, depth: int, variable_ratio: float) -> str:
+    """A random Int expression. Leaves are constants, or `x` with
+    probability `variable_ratio`. Division is only by nonzero constants."""
+    if depth == 0:
+        return 'x' if rng.random() < variable_ratio else str(rng.randint(0, 100))
+    left = constant_expression(rng, depth - 1, variable_ratio)
+    op = rng.choice(['+', '-', '*', '/', '%'])
+    if op in ('/', '%'):
+        right = str(rng.randint(1, 9))
+    else:
+        right = constant_expression(rng, depth - 1, variable_ratio)
+    return f'({left} {op} {right})'
+
+
+def statements(rng: random.Random, count: int, variable_ratio: float) -> str:
+    body = ''.join(f'x = x + {constant_expression(rng, 5, variable_ratio)} * 1 + 0; ' for _ in range(count))
+    return f'{{ var x = 1; {body}x }}'
+
+
+def main() -> None:
+    sys.setrecursionlimit(100_000)
+    rng = random.Random(0)
+    programs = {
+        'all constant': statements(rng, 200, 0.0),
+        '10% variables': statements(rng, 200, 0.1),
+        '50% variables': statements(rng, 200, 0.5),
+        **PROGRAMS,
+    }
+    print(f'{"program":<18} {"nodes":>13} {"IR insns":>13} {"fold":>8} {"run_ir before":>14} {"after":>8}')
+    for name, source in programs.items():
+        tree = parse(tokenize(source))
+        typecheck(tree)
+        nodes_before = count_nodes(tree)
+        ir_before = generate_ir(RESERVED, tree)
+        start = time.perf_counter()
+        tree = fold_constants(tree)
+        fold_seconds = time.perf_counter() - start
+        ir_after = generate_ir(RESERVED, tree)
+        program_before, program_after = load_ir(ir_before), load_ir(ir_after)
+        assert run_ir(program_before) == run_ir(program_after)
+        start = time.perf_counter()
+        run_ir(program_before)
+        before_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        run_ir(program_after)
+        after_seconds = time.perf_counter() - start
+        print(f'{name:<18} {nodes_before:>6}->{count_nodes(tree):<6} {len(ir_before):>6}->{len(ir_after):<6} '
+              f'{fold_seconds * 1000:>6.1f}ms {before_seconds * 1000:>12.1f}ms {after_seconds * 1000:>6.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
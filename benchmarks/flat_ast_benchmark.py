@@ -0,0 +1,63 @@
+"""Compares memory use and traversal time of ast nodes and FlatAST.
+
+Run with `poetry run python benchmarks/flat_ast_benchmark.py [nodes]`.
+"""
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from compiler.flat_ast import from_ast
+from compiler.interpreter import interpret, interpret_flat
+from compiler.ir_generator import generate_ir, generate_ir_flat
+from compiler.parser import parse
+from compiler.symtab import create_global_symtab
+from compiler.tokenizer import iter_tokens
+from compiler.typecheck import typecheck, typecheck_flat
+
+NODES_PER_STATEMENT = 6
+
+
+def generate_source(nodes: int) -> str:
+    """A block with about `nodes` nodes."""
+    statements = nodes // NODES_PER_STATEMENT
+    return '{ var x = 0; ' + 'var x = x + 1 * 2; ' * statements + 'x }'
+
+
+def traced(build: Callable[[], Any]) -> tuple[Any, int]:
+    """Returns the result of `build()` and the bytes it still holds."""
+    tracemalloc.start()
+    result = build()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained
+
+
+def timed(run: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    source = generate_source(nodes)
+    tree, tree_bytes = traced(lambda: parse(iter_tokens(source)))
+    flat, flat_bytes = traced(lambda: from_ast(tree))
+    print(f'{len(flat)} nodes')
+    print(f'{"":<16} {"ast":>10} {"FlatAST":>10}')
+    print(f'{"memory":<16} {tree_bytes / 1e6:>8.1f}MB {flat_bytes / 1e6:>8.1f}MB')
+    print(f'{"bytes/node":<16} {tree_bytes / len(flat):>10.1f} {flat_bytes / len(flat):>10.1f}')
+
+    reserved = set(create_global_symtab().symbols.keys())
+    passes: list[tuple[str, Callable[[], Any], Callable[[], Any]]] = [
+        ('typecheck', lambda: typecheck(tree), lambda: typecheck_flat(flat)),
+        ('interpret', lambda: interpret(tree), lambda: interpret_flat(flat)),
+        ('generate_ir', lambda: generate_ir(reserved, tree), lambda: generate_ir_flat(reserved, flat)),
+    ]
+    for name, run_tree, run_flat in passes:
+        print(f'{name:<16} {timed(run_tree):>9.3f}s {timed(run_flat):>9.3f}s')
+
+
+if __name__ == '__main__':
+    main()
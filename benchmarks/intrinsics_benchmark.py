@@ -0,0 +1,52 @@
+"""Counts the machine instructions of `main` and times the executables of
+arithmetic-heavy programs, to see the effect of inline intrinsics.
+
+Run with `poetry run python benchmarks/intrinsics_benchmark.py [runs]`.
+The run time includes starting the process, which is about 0.2ms.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from compiler.assembler import assemble
+from compiler.assembly_generator import generate_assembly
+from compiler.compiler import generate_program_ir
+from bytecode_benchmark import arithmetic, branches
+
+
+def count_instructions(assembly: str) -> tuple[int, int]:
+    """The number of instructions and calls in `main`."""
+    lines = [line.strip() for line in assembly[assembly.index('main:'):].splitlines()]
+    instructions = [line for line in lines if line and not line.startswith(('#', '.')) and not line.endswith(':')]
+    return len(instructions), sum(1 for line in instructions if line.startswith('call'))
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    sys.setrecursionlimit(100_000)
+    programs = {
+        'arithmetic': arithmetic(500),
+        'arithmetic x10': arithmetic(5000),
+        'arithmetic x40': arithmetic(20000),
+        'branches x10': branches(5000),
+    }
+    print(f'{"program":<16} {"insns":>8} {"calls":>7} {"run":>9}')
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, 'program')
+        for name, source in programs.items():
+            assembly = generate_assembly(generate_program_ir(source))
+            with open(path, 'wb') as f:
+                f.write(assemble(assembly))
+            os.chmod(path, 0o755)
+            start = time.perf_counter()
+            for _ in range(runs):
+                subprocess.run([path], stdout=subprocess.DEVNULL, check=True)
+            seconds = (time.perf_counter() - start) / runs
+            instructions, calls = count_instructions(assembly)
+            print(f'{name:<16} {instructions:>8} {calls:>7} {seconds * 1000:>7.3f}ms')
+
+
+if __name__ == '__main__':
+    main()
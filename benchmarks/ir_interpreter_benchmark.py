@@ -0,0 +1,40 @@
+"""Compares running IR with run_ir() against interpret().
+
+Run with `poetry run python benchmarks/ir_interpreter_benchmark.py [runs]`.
+Each program is evaluated `runs` times. load_ir() runs once per program
+and is measured separately.
+"""
+import sys
+import time
+
+from compiler.interpreter import interpret
+from compiler.ir_generator import generate_ir
+from compiler.ir_interpreter import load_ir, run_ir
+from compiler.parser import parse
+from compiler.symtab import create_global_symtab
+from compiler.tokenizer import tokenize
+from compiler.typecheck import typecheck
+from bytecode_benchmark import PROGRAMS, measure
+
+RESERVED = set(create_global_symtab().symbols.keys()) | {'print_int', 'print_bool'}
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    sys.setrecursionlimit(100_000)
+    print(f'{"program":<18} {"IR insns":>9} {"interpret":>10} {"load_ir":>9} {"run_ir":>9} {"speedup":>8}')
+    for name, source in PROGRAMS.items():
+        tree = parse(tokenize(source))
+        typecheck(tree)
+        instructions = generate_ir(RESERVED, tree)
+        interpreted = measure(lambda: interpret(tree), runs)
+        start = time.perf_counter()
+        program = load_ir(instructions)
+        load_seconds = time.perf_counter() - start
+        ir_seconds = measure(lambda: run_ir(program), runs)
+        print(f'{name:<18} {len(instructions):>9} {interpreted:>9.3f}s {load_seconds:>8.4f}s {ir_seconds:>8.3f}s '
+              f'{interpreted / ir_seconds:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""Measures parse() time against nesting depth.
+
+Run with `poetry run python benchmarks/nesting_benchmark.py [max_depth]`.
+Parse time should grow linearly with depth, and no depth should
+raise RecursionError.
+"""
+import sys
+import time
+from typing import Callable
+
+from compiler.parser import parse
+from compiler.tokenizer import tokenize
+
+SHAPES: dict[str, Callable[[int], str]] = {
+    'blocks': lambda n: '{ ' * n + 'x' + ' }' * n,
+    'parentheses': lambda n: '(' * n + 'x' + ')' * n,
+    'else if chain': lambda n: 'if a then 1 else ' * n + '0',
+    'nested then': lambda n: 'if a then ' * n + '1',
+    'function calls': lambda n: 'f(' * n + 'x' + ')' * n,
+    'declarations': lambda n: '{ var x = ' * n + '1' + ' }' * n,
+}
+
+
+def main() -> None:
+    max_depth = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f'{"shape":<16} {"depth":>8} {"seconds":>9} {"us/level":>9}')
+    for name, shape in SHAPES.items():
+        depth = 100
+        while depth <= max_depth:
+            tokens = tokenize(shape(depth))
+            start = time.perf_counter()
+            parse(tokens)
+            seconds = time.perf_counter() - start
+            print(f'{name:<16} {depth:>8} {seconds:>9.4f} {seconds * 1e6 / depth:>9.2f}')
+            depth *= 10
+
+
+if __name__ == '__main__':
+    main()
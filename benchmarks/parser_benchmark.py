@@ -0,0 +1,57 @@
+"""Measures parse() on expression-heavy inputs.
+
+Run with `poetry run python benchmarks/parser_benchmark.py`.
+"""
+import random
+import time
+
+from compiler.parser import parse
+from compiler.tokenizer import tokenize
+
+OPERATORS = ['+', '-', '*', '/', '%', '<', '<=', '>', '>=', '==', '!=', 'and', 'or']
+
+
+def random_expression(rng: random.Random, depth: int) -> str:
+    """A random expression using every operator, with some parentheses and unary ops."""
+    if depth == 0:
+        return rng.choice(['x', 'y', '1', '23', 'True', '-z', 'not b'])
+    left = random_expression(rng, depth - 1)
+    right = random_expression(rng, depth - 1)
+    expr = f'{left} {rng.choice(OPERATORS)} {right}'
+    return f'({expr})' if rng.random() < 0.2 else expr
+
+
+def flat_sum(terms: int) -> str:
+    return ' + '.join(str(i) for i in range(terms))
+
+
+def measure(source: str, repeats: int = 5) -> float:
+    """Returns the best wall time of parsing the tokens of `source`."""
+    tokens = tokenize(source)
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        parse(tokens)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    rng = random.Random(0)
+    inputs = [
+        ('random expression, 2^12 leaves', random_expression(rng, 12)),
+        ('random expression, 2^15 leaves', random_expression(rng, 15)),
+        ('flat sum, 5000 terms', flat_sum(5000)),
+        ('flat sum, 100000 terms', flat_sum(100_000)),
+    ]
+    for name, source in inputs:
+        try:
+            seconds = measure(source)
+            tokens = len(tokenize(source))
+            print(f'{name:<35} {seconds:>8.4f}s {seconds * 1e6 / tokens:>8.2f}us/token')
+        except RecursionError:
+            print(f'{name:<35} RecursionError')
+
+
+if __name__ == '__main__':
+    main()
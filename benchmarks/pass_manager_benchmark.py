@@ -0,0 +1,43 @@
+"""Prints the statistics of each IR pass at -O0, -O1 and -O2.
+
+Run with `poetry run python benchmarks/pass_manager_benchmark.py`.
+"""
+import sys
+import time
+
+from compiler.ir_generator import generate_ir
+from compiler.ir_interpreter import load_ir, run_ir
+from compiler.parser import parse
+from compiler.pass_manager import pass_manager_for_level
+from compiler.symtab import create_global_symtab
+from compiler.tokenizer import tokenize
+from compiler.typecheck import typecheck
+from bytecode_benchmark import PROGRAMS
+
+RESERVED = set(create_global_symtab().symbols.keys()) | {'print_int', 'print_bool'}
+
+
+def main() -> None:
+    sys.setrecursionlimit(100_000)
+    for name, source in PROGRAMS.items():
+        tree = parse(tokenize(source))
+        typecheck(tree)
+        instructions = generate_ir(RESERVED, tree)
+        expected = run_ir(load_ir(instructions))
+        print(f'== {name}: {len(instructions)} instructions')
+        for level in [0, 1, 2]:
+            manager = pass_manager_for_level(level)
+            optimized = manager.run(instructions)
+            program = load_ir(optimized)
+            start = time.perf_counter()
+            assert run_ir(program) == expected
+            run_seconds = time.perf_counter() - start
+            total = sum(s.seconds for s in manager.stats)
+            print(f'-O{level}: {len(optimized)} instructions, passes {total * 1000:.1f}ms, '
+                  f'run_ir {run_seconds * 1000:.1f}ms')
+            for stats in manager.stats:
+                print(f'    {stats}')
+
+
+if __name__ == '__main__':
+    main()
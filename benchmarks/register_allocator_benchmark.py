@@ -0,0 +1,47 @@
+"""Compares the stack slots needed by allocate() with one slot per variable.
+
+Run with `poetry run python benchmarks/register_allocator_benchmark.py`.
+"""
+import gc
+import sys
+import time
+
+from compiler.ir_generator import generate_ir
+from compiler.parser import parse
+from compiler.register_allocator import allocate
+from compiler.symtab import create_global_symtab
+from compiler.tokenizer import tokenize
+from compiler.typecheck import typecheck
+from bytecode_benchmark import PROGRAMS, branches
+from closure_compiler_benchmark import generate_program
+
+RESERVED = set(create_global_symtab().symbols.keys()) | {'print_int', 'print_bool'}
+# Callee-saved registers, which a backend could keep values in across calls
+REGISTERS = ['%rbx', '%r12', '%r13', '%r14', '%r15']
+
+
+def main() -> None:
+    sys.setrecursionlimit(100_000)
+    programs = {
+        **PROGRAMS,
+        'statements x10': generate_program(2000),
+        'branches x10': branches(5000),
+    }
+    print(f'{"program":<18} {"insns":>7} {"naive":>7} {"slots":>6} {"with 5 regs":>11} {"seconds":>8}')
+    for name, source in programs.items():
+        tree = parse(tokenize(source))
+        typecheck(tree)
+        instructions = generate_ir(RESERVED, tree)
+        gc.collect()
+        gc.freeze()
+        start = time.perf_counter()
+        stack_only = allocate(instructions)
+        seconds = time.perf_counter() - start
+        with_registers = allocate(instructions, REGISTERS)
+        gc.unfreeze()
+        print(f'{name:<18} {len(instructions):>7} {stack_only.naive_slot_count:>7} {stack_only.slot_count:>6} '
+              f'{with_registers.slot_count:>11} {seconds:>7.3f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Measures interpret() on deeply nested blocks that shadow names.
+
+Run with `poetry run python benchmarks/scope_benchmark.py [runs]`.
+Every block declares the same names again, and the innermost block reads
+a variable declared at the top, so looking it up by name would have to
+walk past every nested scope. The time of interpret() includes the
+`resolve()` pass, which is also shown separately.
+"""
+import sys
+import time
+
+from compiler.interpreter import interpret
+from compiler.parser import parse
+from compiler.resolver import resolve
+from compiler.tokenizer import tokenize
+
+SHADOWED = ['a', 'b', 'c', 'd']
+
+
+def generate_program(depth: int, reads: int) -> str:
+    """`depth` nested blocks that each redeclare SHADOWED, with `reads`
+    reads of the outermost `top` in the innermost block."""
+    declarations = ' '.join(f'var {name} = {name} + 1;' for name in SHADOWED)
+    inner = ' + '.join(['top'] * reads) + ' + a'
+    return (
+        '{ var top = 1; ' + ' '.join(f'var {name} = 0;' for name in SHADOWED) + ' '
+        + f'{{ {declarations} ' * depth + inner + ' }' * depth + ' }'
+    )
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    sys.setrecursionlimit(100_000)
+    print(f'{"depth":>6} {"reads":>6} {"seconds":>9} {"resolve":>9}')
+    for depth in [1, 10, 100, 500]:
+        reads = 200
+        tree = parse(tokenize(generate_program(depth, reads)))
+        assert interpret(tree) == reads + depth
+        start = time.perf_counter()
+        for _ in range(runs):
+            interpret(tree)
+        seconds = (time.perf_counter() - start) / runs
+        start = time.perf_counter()
+        resolve(tree)
+        resolve_seconds = time.perf_counter() - start
+        print(f'{depth:>6} {reads:>6} {seconds:>9.5f} {resolve_seconds:>9.5f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Load-tests the server modes: one forked process per connection, a
+pool of pre-forked workers, and asyncio with a process pool.
+
+Run with `poetry run python benchmarks/server_load_test.py [requests] [concurrency]`.
+Each mode is started on a free port, and `concurrency` clients send
+`requests` requests in total. Both `ping` and `compile` are measured, so
+the cost of the server itself can be told apart from compiling. The
+asyncio server is also measured with framed requests, where each client
+keeps one connection open.
+"""
+import json
+import socket
+import subprocess
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+MAIN = Path(__file__).parent.parent / 'src' / '__main__.py'
+
+MODES: dict[str, list[str]] = {
+    'forking': [],
+    'workers=4': ['--workers=4'],
+    'workers=8': ['--workers=8', '--request-queue-size=128'],
+    'asyncio': ['--async', '--workers=4'],
+}
+
+REQUESTS: dict[str, dict[str, Any]] = {
+    'ping': {'command': 'ping'},
+    'compile': {'command': 'compile', 'code': '{ var x = 3; var y = x * 7 - 1; if y > 10 then print_int(y) else print_int(x); y }'},
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port: int = s.getsockname()[1]
+        return port
+
+
+def send(port: int, data: bytes) -> float:
+    start = time.perf_counter()
+    with socket.create_connection(('127.0.0.1', port)) as s:
+        s.sendall(data)
+        s.shutdown(socket.SHUT_WR)
+        response = b''
+        while chunk := s.recv(65536):
+            response += chunk
+    seconds = time.perf_counter() - start
+    if 'error' in json.loads(response):
+        raise Exception(json.loads(response)['error'])
+    return seconds
+
+
+class FramedClient(threading.local):
+    """One persistent connection per client thread."""
+    connection: socket.socket | None = None
+
+    def send(self, port: int, data: bytes) -> float:
+        start = time.perf_counter()
+        if self.connection is None:
+            self.connection = socket.create_connection(('127.0.0.1', port))
+        self.connection.sendall(struct.pack('>I', len(data)) + data)
+        (length,) = struct.unpack('>I', self._receive(4))
+        response = json.loads(self._receive(length))
+        seconds = time.perf_counter() - start
+        if 'error' in response:
+            raise Exception(response['error'])
+        return seconds
+
+    def _receive(self, size: int) -> bytes:
+        assert self.connection is not None
+        data = b''
+        while len(data) < size:
+            chunk = self.connection.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError('connection closed')
+            data += chunk
+        return data
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def main() -> None:
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    print(f'{total} requests, {concurrency} clients')
+    print(f'{"mode":<16} {"request":<8} {"p50":>8} {"p99":>8} {"req/s":>8}')
+    for mode, args in MODES.items():
+        port = free_port()
+        server = subprocess.Popen([sys.executable, str(MAIN), 'serve', f'--port={port}', *args],
+                                  stdout=subprocess.DEVNULL)
+        try:
+            for _ in range(200):
+                try:
+                    send(port, b'{"command": "ping"}')
+                    break
+                except ConnectionError:
+                    time.sleep(0.05)
+            senders = {mode: send}
+            if '--async' in args:
+                senders[f'{mode} framed'] = FramedClient().send
+            for sender_name, sender in senders.items():
+                for name, request in REQUESTS.items():
+                    data = json.dumps(request).encode()
+                    with ThreadPoolExecutor(concurrency) as pool:
+                        start = time.perf_counter()
+                        latencies = sorted(pool.map(lambda _: sender(port, data), range(total)))
+                        seconds = time.perf_counter() - start
+                    print(f'{sender_name:<16} {name:<8} {percentile(latencies, 0.5) * 1000:>6.1f}ms '
+                          f'{percentile(latencies, 0.99) * 1000:>6.1f}ms {total / seconds:>8.0f}')
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
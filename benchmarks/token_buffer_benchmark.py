@@ -0,0 +1,42 @@
+"""Compares the memory used by a list of Token objects with a TokenBuffer.
+
+Run with `poetry run python benchmarks/token_buffer_benchmark.py [max_size_kb]`.
+"""
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from compiler.token_buffer import TokenBuffer
+from compiler.tokenizer import tokenize
+from tokenizer_benchmark import generate_source
+
+
+def measure(build: Callable[[str], Any], source: str) -> tuple[int, int, float]:
+    """Returns (retained bytes, peak bytes, seconds) for building tokens of `source`."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build(source)
+    seconds = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return retained, peak, seconds
+
+
+def main() -> None:
+    max_size_kb = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    print(f'{"size":>10} {"tokens":>8} {"representation":>15} {"retained":>10} {"peak":>10} {"B/token":>8} {"seconds":>8}')
+    size_kb = 1
+    while size_kb <= max_size_kb:
+        source = generate_source(size_kb * 1024)
+        token_count = len(TokenBuffer.from_source(source))
+        for name, build in [('list[Token]', tokenize), ('TokenBuffer', TokenBuffer.from_source)]:
+            retained, peak, seconds = measure(build, source)
+            print(f'{size_kb:>8}KB {token_count:>8} {name:>15} {retained / 1e6:>8.2f}MB {peak / 1e6:>8.2f}MB '
+                  f'{retained / token_count:>8.1f} {seconds:>8.3f}')
+        size_kb *= 10
+
+
+if __name__ == '__main__':
+    main()
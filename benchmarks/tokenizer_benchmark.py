@@ -0,0 +1,52 @@
+"""Measures how tokenize() scales with the size of the source code.
+
+Run with `poetry run python benchmarks/tokenizer_benchmark.py [max_size_kb]`.
+The time per kilobyte should stay roughly constant as the input grows.
+"""
+import sys
+import time
+
+from compiler.tokenizer import tokenize
+
+SNIPPET = '''{
+    var total = 0;
+    var i = 123;
+    // add some numbers
+    total = total + i * 2 - (i % 7);
+    if total >= 100 and not False then { total = total / 3 } else { total = 1 };
+    /* a multiline
+       comment */
+    print_int(total)
+}
+'''
+
+
+def generate_source(size: int) -> str:
+    """Repeats SNIPPET until the source is at least `size` characters long."""
+    return SNIPPET * (size // len(SNIPPET) + 1)
+
+
+def measure(source: str, repeats: int) -> float:
+    """Returns the best wall time of `repeats` tokenize() runs."""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        tokenize(source)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    max_size_kb = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    print(f'{"size":>10} {"tokens":>10} {"seconds":>10} {"us/KB":>10}')
+    size_kb = 1
+    while size_kb <= max_size_kb:
+        source = generate_source(size_kb * 1024)
+        token_count = len(tokenize(source))
+        seconds = measure(source, repeats=5 if size_kb < 1000 else 1)
+        print(f'{size_kb:>8}KB {token_count:>10} {seconds:>10.4f} {seconds * 1e6 / size_kb:>10.1f}')
+        size_kb *= 10
+
+
+if __name__ == '__main__':
+    main()
@@ -1,27 +1,88 @@
+import asyncio
 from base64 import b64encode
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import asdict
 import json
+import multiprocessing
+import os
+from pathlib import Path
 import re
+import signal
+import struct
 import sys
-from socketserver import ForkingTCPServer, StreamRequestHandler
-from traceback import format_exception
-from typing import Any
+import time
+from socketserver import BaseRequestHandler, ForkingTCPServer, StreamRequestHandler, TCPServer
+from traceback import format_exception, print_exc
+from typing import Any, Callable, Iterator
 
+from compiler.compile_cache import CompileCache
+from compiler.assembly_generator import generate_assembly
+from compiler.compiler import compile_to_executable, generate_program_ir
+from compiler.instrumentation import CompileReport
 
-def call_compiler(source_code: str) -> bytes:
-    # *** TODO ***
-    # Call your compiler here and return the compiled executable.
-    # Raise an exception on compilation error.
-    # *** TODO ***
-    raise NotImplementedError("Compiler not implemented")
+
+def call_compiler(source_code: str, optimization_level: int = 1, report: CompileReport | None = None) -> bytes:
+    return compile_to_executable(source_code, optimization_level, report)
+
+
+def call_compiler_with_report(source_code: str, optimization_level: int = 1) -> tuple[bytes, CompileReport]:
+    """call_compiler() with every stage measured, for a process pool."""
+    report = CompileReport(trace_memory=True)
+    return call_compiler(source_code, optimization_level, report), report
+
+
+def compile_pool(workers: int) -> ProcessPoolExecutor:
+    """A pool of `workers` processes for compiling. The workers are
+    forked, so they share the parent's imported modules and tables."""
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'))
+
+
+def call_compiler_batch(
+    source_codes: list[str],
+    optimization_level: int = 1,
+    pool: Executor | None = None,
+) -> list[bytes | Exception]:
+    """Compile several programs in parallel in `pool`, or in a new pool
+    with a process per CPU. The results are in the same order as the
+    sources, and a program that fails to compile gets its exception."""
+    if pool is None and len(source_codes) > 1:
+        with compile_pool(min(len(source_codes), os.cpu_count() or 1)) as new_pool:
+            return call_compiler_batch(source_codes, optimization_level, new_pool)
+    results: list[bytes | Exception] = []
+    if pool is None:
+        for source_code in source_codes:
+            try:
+                results.append(call_compiler(source_code, optimization_level))
+            except Exception as e:
+                results.append(e)
+        return results
+    futures = [pool.submit(call_compiler, source_code, optimization_level) for source_code in source_codes]
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(e)
+    return results
 
 
 def main() -> int:
     # === Option parsing ===
     command: str | None = None
-    input_file: str | None = None
+    input_files: list[str] = []
     output_file: str | None = None
     host = "127.0.0.1"
     port = 3000
+    optimization_level = 1
+    cache_dir: str | None = None
+    cache_size = 256 * 1024 * 1024
+    workers = 0
+    max_requests_per_worker = 0
+    request_queue_size = 32
+    use_asyncio = False
+    request_timeout = 60.0
+    batch = False
+    stats_format: str | None = None
     for arg in sys.argv[1:]:
         if (m := re.fullmatch(r'--output=(.+)', arg)) is not None:
             output_file = m[1]
@@ -29,14 +90,34 @@ def main() -> int:
             host = m[1]
         elif (m := re.fullmatch(r'--port=(.+)', arg)) is not None:
             port = int(m[1])
+        elif (m := re.fullmatch(r'-O([012])', arg)) is not None:
+            optimization_level = int(m[1])
+        elif (m := re.fullmatch(r'--cache-dir=(.+)', arg)) is not None:
+            cache_dir = m[1]
+        elif (m := re.fullmatch(r'--cache-size=(\d+)', arg)) is not None:
+            cache_size = int(m[1])
+        elif (m := re.fullmatch(r'--workers=(\d+)', arg)) is not None:
+            workers = int(m[1])
+        elif (m := re.fullmatch(r'--max-requests-per-worker=(\d+)', arg)) is not None:
+            max_requests_per_worker = int(m[1])
+        elif (m := re.fullmatch(r'--request-queue-size=(\d+)', arg)) is not None:
+            request_queue_size = int(m[1])
+        elif arg == '--async':
+            use_asyncio = True
+        elif arg == '--batch':
+            batch = True
+        elif (m := re.fullmatch(r'--stats=(json)', arg)) is not None:
+            stats_format = m[1]
+        elif (m := re.fullmatch(r'--timeout=(\d+(?:\.\d+)?)', arg)) is not None:
+            request_timeout = float(m[1])
         elif arg.startswith('-'):
             raise Exception(f"Unknown argument: {arg}")
         elif command is None:
             command = arg
-        elif input_file is None:
-            input_file = arg
         else:
-            raise Exception("Multiple input files not supported")
+            input_files.append(arg)
+    if len(input_files) > 1 and not batch:
+        raise Exception("Multiple input files not supported without --batch")
 
     valid_commands = ['compile', 'serve']
     if command is None:
@@ -48,57 +129,496 @@ def main() -> int:
         return 1
 
     def read_source_code() -> str:
-        if input_file is not None:
-            with open(input_file) as f:
+        if input_files:
+            with open(input_files[0]) as f:
                 return f.read()
         else:
             return sys.stdin.read()
 
     # === Command implementations ===
 
-    if command == 'compile':
+    if command == 'compile' and batch:
+        # Each input file is compiled to a file of the same name without
+        # the extension in the output directory
+        if output_file is None:
+            raise Exception("Output directory flag --output=... required")
+        if stats_format is not None:
+            raise Exception("--stats is not supported with --batch")
+        output_paths = [Path(output_file) / Path(input_file).stem for input_file in input_files]
+        if len(set(output_paths)) < len(output_paths):
+            raise Exception("Input files must have different names")
+        source_codes = []
+        for input_file in input_files:
+            with open(input_file) as source_file:
+                source_codes.append(source_file.read())
+        Path(output_file).mkdir(parents=True, exist_ok=True)
+        failed = False
+        results = call_compiler_batch(source_codes, optimization_level)
+        for input_file, output_path, result in zip(input_files, output_paths, results):
+            if isinstance(result, Exception):
+                print(f"{input_file}: {result}", file=sys.stderr)
+                failed = True
+            else:
+                output_path.write_bytes(result)
+        return 1 if failed else 0
+    elif command == 'compile':
         source_code = read_source_code()
         if output_file is None:
             raise Exception("Output file flag --output=... required")
-        executable = call_compiler(source_code)
+        report = CompileReport(trace_memory=True) if stats_format is not None else None
+        executable = call_compiler(source_code, optimization_level, report)
         with open(output_file, 'wb') as f:
             f.write(executable)
+        if report is not None:
+            print(report.to_json())
     elif command == 'serve':
         try:
-            run_server(host, port)
+            cache = CompileCache(cache_dir, cache_size) if cache_dir is not None else None
+            if use_asyncio:
+                asyncio.run(run_async_server(host, port, optimization_level, cache,
+                                             workers=workers or os.cpu_count() or 1,
+                                             request_timeout=request_timeout,
+                                             request_queue_size=request_queue_size))
+                return 0
+            run_server(host, port, optimization_level, cache,
+                       workers=workers,
+                       max_requests_per_worker=max_requests_per_worker,
+                       request_queue_size=request_queue_size)
         except KeyboardInterrupt:
             pass
     return 0
 
 
-def run_server(host: str, port: int) -> None:
-    class Server(ForkingTCPServer):
-        allow_reuse_address = True
-        request_queue_size = 32
+def batch_response(results: list[bytes | BaseException]) -> list[dict[str, Any]]:
+    """The response item of each program in a batch."""
+    return [
+        {"error": "".join(format_exception(result))} if isinstance(result, BaseException)
+        else {"program": b64encode(result).decode()}
+        for result in results
+    ]
+
+
+def compile_batch(
+    source_codes: list[str],
+    optimization_level: int,
+    cache: CompileCache | None,
+    pool: Executor | None = None,
+) -> list[bytes | Exception]:
+    """Like call_compiler_batch(), but programs in `cache` are not
+    compiled again. Every source gets a program or an exception, in the
+    same order."""
+    options = {'optimization_level': optimization_level}
+    keys = [cache.key(source_code, options) for source_code in source_codes] if cache is not None else []
+    cached = [cache.get(key) for key in keys] if cache is not None else [None] * len(source_codes)
+    missing = [i for i, data in enumerate(cached) if data is None]
+    compiled = dict(zip(missing, call_compiler_batch([source_codes[i] for i in missing], optimization_level, pool),
+                        strict=True))
+    results: list[bytes | Exception] = []
+    for i, data in enumerate(cached):
+        if data is not None:
+            results.append(data)
+            continue
+        result = compiled[i]
+        if cache is not None and isinstance(result, bytes):
+            cache.put(keys[i], result)
+        results.append(result)
+    return results
+
+
+# A binary response is a header of a status and a payload length,
+# followed by the payload. The payload is the executable, the error
+# message in UTF-8, or the JSON response of a command that doesn't
+# return a program. A program's "stats" are not sent in binary.
+BINARY_HEADER = struct.Struct('>BI')
+BINARY_PROGRAM = 0
+BINARY_ERROR = 1
+BINARY_JSON = 2
+
+
+def encode_response(result: dict[str, Any], binary: bool = False) -> list[bytes | memoryview]:
+    """The chunks to send for a response from handle_command(). A JSON
+    response has the program in base64. A binary response sends the
+    program as it is, without copying it."""
+    if binary:
+        if "error" in result:
+            payload: bytes = result["error"].encode()
+            status = BINARY_ERROR
+        elif "program" in result:
+            payload = result["program"]
+            status = BINARY_PROGRAM
+        else:
+            payload = json.dumps(result).encode()
+            status = BINARY_JSON
+        return [BINARY_HEADER.pack(status, len(payload)), memoryview(payload)]
+    if "program" in result:
+        result = {**result, "program": b64encode(result["program"]).decode()}
+    return [json.dumps(result).encode()]
+
+
+def wants_binary(input: Any) -> bool:
+    return isinstance(input, dict) and input.get("binary") is True
+
+
+def handle_command(
+    input: dict[str, Any],
+    optimization_level: int,
+    cache: CompileCache | None,
+    pool: Executor | None = None,
+) -> dict[str, Any]:
+    """Run one request and return the response. A program in the response
+    is bytes, and encode_response() encodes it for sending. Batches are
+    compiled in `pool`, or in a new pool if there is none."""
+    result: dict[str, Any] = {}
+    try:
+        if input["command"] == "compile":
+            source_code = input["code"]
+            report = CompileReport(trace_memory=True) if input.get("stats") else None
+            if cache is not None:
+                executable = cache.get_or_compile(
+                    source_code,
+                    {'optimization_level': optimization_level},
+                    lambda: call_compiler(source_code, optimization_level, report),
+                )
+            else:
+                executable = call_compiler(source_code, optimization_level, report)
+            result["program"] = executable
+            if report is not None:
+                result["stats"] = asdict(report)
+        elif input["command"] == "compile_batch":
+            result["results"] = batch_response(list(compile_batch(input["codes"], optimization_level, cache, pool)))
+        elif input["command"] == "ping":
+            pass
+        elif input["command"] == "stats":
+            result["cache"] = asdict(cache.stats()) if cache is not None else None
+        else:
+            result["error"] = "Unknown command: " + input['command']
+    except Exception as e:
+        result["error"] = "".join(format_exception(e))
+    return result
+
+
+def warm_up() -> None:
+    """Import and run the whole compiler once, so that processes forked
+    afterwards start warm."""
+    generate_assembly(generate_program_ir('{ var x = 1; if x < 2 then print_int(x) else print_bool(x > 1) }'))
+
+
+def run_server(
+    host: str,
+    port: int,
+    optimization_level: int = 1,
+    cache: CompileCache | None = None,
+    workers: int = 0,
+    max_requests_per_worker: int = 0,
+    request_queue_size: int = 32,
+) -> None:
+    """Serve compile requests. With `workers`, a fixed pool of worker
+    processes handles them, otherwise each connection gets a new process.
+
+    Each worker has a pool of its share of the CPUs for compiling
+    batches, which it keeps until it exits. A pool can't be used across
+    a fork, so without `workers` every batch gets a new pool."""
+    queue_size = request_queue_size
+    # The batch pool of this process, if it has one
+    batch_pool: Executor | None = None
 
     class Handler(StreamRequestHandler):
         def handle(self) -> None:
-            result: dict[str, Any] = {}
+            input: Any = None
             try:
-                input_str = self.rfile.read().decode()
-                input = json.loads(input_str)
-                if input["command"] == "compile":
-                    source_code = input["code"]
-                    executable = call_compiler(source_code)
-                    result["program"] = b64encode(executable).decode()
-                elif input["command"] == "ping":
-                    pass
-                else:
-                    result["error"] = "Unknown command: " + input['command']
+                input = json.loads(self.rfile.read().decode())
+                result = handle_command(input, optimization_level, cache, batch_pool)
             except Exception as e:
-                result["error"] = "".join(format_exception(e))
-            result_str = json.dumps(result)
-            self.request.sendall(str.encode(result_str))
+                result = {"error": "".join(format_exception(e))}
+            for chunk in encode_response(result, wants_binary(input)):
+                self.request.sendall(chunk)
+
+    @contextmanager
+    def worker_batch_pool() -> Iterator[None]:
+        nonlocal batch_pool
+        with compile_pool(max(1, (os.cpu_count() or 1) // workers)) as pool:
+            # Fork the pool's processes before accepting connections, so
+            # that they don't inherit client sockets and keep them open
+            pool.submit(os.getpid).result()
+            batch_pool = pool
+            try:
+                yield
+            finally:
+                batch_pool = None
+
+    if workers > 0:
+        run_worker_pool((host, port), Handler, workers, max_requests_per_worker, request_queue_size,
+                        worker_context=worker_batch_pool)
+        return
+
+    class Server(ForkingTCPServer):
+        allow_reuse_address = True
+        request_queue_size = queue_size
 
     print(f"Starting TCP server at {host}:{port}")
     with Server((host, port), Handler) as server:
         server.serve_forever()
 
 
+# A worker that fails within WORKER_START_SECONDS of starting is restarted
+# after a delay that doubles with each such failure in a row, up to
+# MAX_RESTART_DELAY. After MAX_FAILED_STARTS in a row the server stops.
+WORKER_START_SECONDS = 1.0
+RESTART_DELAY = 0.1
+MAX_RESTART_DELAY = 5.0
+MAX_FAILED_STARTS = 5
+
+
+def run_worker_pool(
+    address: tuple[str, int],
+    handler: type[BaseRequestHandler],
+    workers: int,
+    max_requests_per_worker: int = 0,
+    request_queue_size: int = 32,
+    worker_context: Callable[[], AbstractContextManager[Any]] = nullcontext,
+) -> None:
+    """Serve with `workers` processes that are forked in advance and
+    accept connections from the same listening socket. A worker exits
+    after `max_requests_per_worker` requests (0 means never) and is
+    replaced by a new one. Each worker handles its requests inside
+    `worker_context()`. A worker that exits with an error is logged and
+    replaced, with a growing delay if it keeps failing on start-up."""
+    queue_size = request_queue_size
+
+    class Server(TCPServer):
+        allow_reuse_address = True
+        request_queue_size = queue_size
+
+    warm_up()
+
+    with Server(address, handler) as server:
+        # The start time of each worker
+        worker_pids: dict[int, float] = {}
+
+        def start_worker() -> None:
+            # SIGTERM is blocked until the worker is recorded, so that a
+            # worker forked just before the server stops is stopped too
+            signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTERM})
+            pid = os.fork()
+            if pid != 0:
+                worker_pids[pid] = time.monotonic()
+                signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTERM})
+                return
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTERM})
+            # SIGTERM exits with SystemExit, so the worker context is
+            # closed too. Closing it is not interrupted by SIGTERM, which
+            # could leave the processes of a pool running.
+            status = 0
+            try:
+                with worker_context():
+                    try:
+                        handled = 0
+                        while max_requests_per_worker == 0 or handled < max_requests_per_worker:
+                            server.handle_request()
+                            handled += 1
+                    finally:
+                        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTERM})
+            except (KeyboardInterrupt, SystemExit):
+                pass
+            except BaseException:
+                print_exc()
+                status = 1
+            finally:
+                os._exit(status)
+
+        print(f"Starting TCP server at {address[0]}:{address[1]} with {workers} workers")
+        # Stop the workers too when terminated
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        for _ in range(workers):
+            start_worker()
+        failed_starts = 0
+        try:
+            while True:
+                pid, wait_status = os.wait()
+                started = worker_pids.pop(pid, time.monotonic())
+                exit_code = os.waitstatus_to_exitcode(wait_status)
+                if exit_code != 0:
+                    reason = (f"was killed by {signal.Signals(-exit_code).name}" if exit_code < 0
+                              else f"exited with status {exit_code}")
+                    print(f"Worker {pid} {reason}", file=sys.stderr)
+                if exit_code != 0 and time.monotonic() - started < WORKER_START_SECONDS:
+                    failed_starts += 1
+                    if failed_starts >= MAX_FAILED_STARTS:
+                        raise Exception(f"Workers failed to start {failed_starts} times in a row")
+                    time.sleep(min(RESTART_DELAY * 2 ** (failed_starts - 1), MAX_RESTART_DELAY))
+                else:
+                    failed_starts = 0
+                start_worker()
+        finally:
+            for pid in worker_pids:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+
+# The length prefix of a frame in the framed protocol
+FRAME_HEADER = struct.Struct('>I')
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+
+async def run_async_server(
+    host: str,
+    port: int,
+    optimization_level: int = 1,
+    cache: CompileCache | None = None,
+    workers: int = 1,
+    request_timeout: float = 60.0,
+    max_pipelined: int = 32,
+    request_queue_size: int = 32,
+) -> None:
+    """Serve requests with asyncio, compiling in a pool of `workers`
+    processes.
+
+    A connection whose first byte is `{` uses the old protocol: one JSON
+    request until EOF, and one response, which is binary if the request
+    asks for it. Otherwise the client sends frames of a 4-byte big-endian
+    length and a JSON request, and gets framed JSON responses on the same
+    connection. Framed responses are sent as soon as they are ready, so
+    they may come out of order. A request's "id" is copied to its
+    response to match them.
+
+    At most `workers` compiles run at once, and the rest wait. A request
+    that takes longer than `request_timeout` seconds gets an error. Each
+    connection can have at most `max_pipelined` requests in progress.
+    After that the server stops reading from it until one finishes, so a
+    fast client is slowed down by TCP flow control instead of queueing
+    without bound.
+    """
+    loop = asyncio.get_running_loop()
+    warm_up()
+    pool = compile_pool(workers)
+    compile_slots = asyncio.Semaphore(workers)
+
+    async def compile(source_code: str, report: CompileReport | None = None) -> bytes:
+        """Compile in the pool. The stages are added to `report`, which
+        stays empty if the program was cached. The cache does file IO and
+        takes a lock, so it's used in a thread to not block the loop."""
+        if cache is not None:
+            key = cache.key(source_code, {'optimization_level': optimization_level})
+            cached = await loop.run_in_executor(None, cache.get, key)
+            if cached is not None:
+                return cached
+        await compile_slots.acquire()
+        future: asyncio.Future[Any]
+        if report is not None:
+            future = loop.run_in_executor(pool, call_compiler_with_report, source_code, optimization_level)
+        else:
+            future = loop.run_in_executor(pool, call_compiler, source_code, optimization_level)
+        # The slot is taken until the worker is done, even if the request
+        # times out, since a worker can't be interrupted.
+        future.add_done_callback(lambda _: compile_slots.release())
+        executable = await asyncio.shield(future)
+        if report is not None:
+            executable, worker_report = executable
+            report.stages.extend(worker_report.stages)
+        if cache is not None:
+            await loop.run_in_executor(None, cache.put, key, executable)
+        return executable
+
+    async def respond(input: Any) -> dict[str, Any]:
+        result: dict[str, Any] = {}
+        try:
+            async with asyncio.timeout(request_timeout):
+                if input["command"] == "compile":
+                    report = CompileReport(trace_memory=True) if input.get("stats") else None
+                    result["program"] = await compile(input["code"], report)
+                    if report is not None:
+                        result["stats"] = asdict(report)
+                elif input["command"] == "compile_batch":
+                    results = await asyncio.gather(*(compile(code) for code in input["codes"]),
+                                                   return_exceptions=True)
+                    result["results"] = batch_response(results)
+                else:
+                    result = await loop.run_in_executor(None, handle_command, input, optimization_level, cache)
+        except TimeoutError:
+            result = {"error": f"Request timed out after {request_timeout} seconds"}
+        except Exception as e:
+            result = {"error": "".join(format_exception(e))}
+        if isinstance(input, dict) and "id" in input:
+            result["id"] = input["id"]
+        return result
+
+    async def serve_framed(first_byte: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        in_progress = asyncio.Semaphore(max_pipelined)
+        write_lock = asyncio.Lock()
+        tasks: set[asyncio.Task[None]] = set()
+
+        async def send(response: dict[str, Any]) -> None:
+            (data,) = encode_response(response)
+            async with write_lock:
+                writer.write(FRAME_HEADER.pack(len(data)) + data)
+                await writer.drain()
+
+        async def handle(request: bytes) -> None:
+            try:
+                try:
+                    input = json.loads(request)
+                except Exception as e:
+                    await send({"error": "".join(format_exception(e))})
+                    return
+                await send(await respond(input))
+            finally:
+                in_progress.release()
+
+        header = first_byte
+        try:
+            while True:
+                header += await reader.readexactly(FRAME_HEADER.size - len(header))
+                (length,) = FRAME_HEADER.unpack(header)
+                if length > MAX_FRAME_SIZE:
+                    await send({"error": f"Request too large: {length} bytes"})
+                    break
+                request = await reader.readexactly(length)
+                await in_progress.acquire()
+                task = asyncio.create_task(handle(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                header = b''
+        except asyncio.IncompleteReadError:
+            pass  # The client closed the connection
+        if tasks:
+            await asyncio.wait(tasks)
+
+    async def serve_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            first_byte = await reader.read(1)
+            if first_byte == b'{':
+                input: Any = None
+                try:
+                    input = json.loads(first_byte + await reader.read())
+                    response = await respond(input)
+                except Exception as e:
+                    response = {"error": "".join(format_exception(e))}
+                for chunk in encode_response(response, wants_binary(input)):
+                    writer.write(chunk)
+                await writer.drain()
+            elif first_byte:
+                await serve_framed(first_byte, reader, writer)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    with pool:
+        # Fork the workers before accepting connections. A worker forked
+        # later would inherit the open client sockets and keep them open.
+        await loop.run_in_executor(pool, os.getpid)
+        server = await asyncio.start_server(serve_connection, host, port, backlog=request_queue_size)
+        print(f"Starting asyncio server at {host}:{port} with {workers} compile workers")
+        # Stop serving, and then the pool, when terminated
+        loop.add_signal_handler(signal.SIGTERM, server.close)
+        async with server:
+            try:
+                await server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+
 if __name__ == '__main__':
     sys.exit(main())
@@ -0,0 +1,29 @@
+import subprocess
+import tempfile
+from pathlib import Path
+from compiler.instrumentation import CompileReport, stage
+
+
+def assemble(assembly_code: str, report: CompileReport | None = None) -> bytes:
+    """Assemble and link a program with the system `as` and `ld` and
+    return the executable. The tools are measured as stages 'as' and
+    'ld' of `report`."""
+    with tempfile.TemporaryDirectory(prefix='compiler-') as work_dir:
+        source = Path(work_dir) / 'program.s'
+        obj = Path(work_dir) / 'program.o'
+        executable = Path(work_dir) / 'program'
+        source.write_text(assembly_code)
+        with stage(report, 'as') as stats:
+            _run_tool('as', ['as', '-g', '-o', str(obj), str(source)])
+            stats.counts['bytes'] = obj.stat().st_size
+        with stage(report, 'ld') as stats:
+            _run_tool('ld', ['ld', '-static', '-o', str(executable), str(obj)])
+            program = executable.read_bytes()
+            stats.counts['bytes'] = len(program)
+        return program
+
+
+def _run_tool(name: str, command: list[str]) -> None:
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"{name} failed:\n{result.stderr}")
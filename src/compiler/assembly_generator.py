@@ -0,0 +1,229 @@
+from compiler import ir
+from compiler.intrinsics import IntrinsicArgs, all_intrinsics, comparison_conditions, negated_conditions
+from compiler.ir import IRVar
+from compiler.ir_passes import uses
+from compiler.register_allocator import allocate
+
+# Registers that the runtime routines don't change, so the allocator can
+# keep values in them across calls. They are saved by `main`.
+callee_saved_registers = ['%rbx', '%r12', '%r13', '%r14', '%r15']
+
+argument_registers = ['%rdi', '%rsi', '%rdx', '%rcx', '%r8', '%r9']
+
+# The runtime routine that implements each global function that is not
+# an intrinsic.
+runtime_functions = {
+    'print_int': 'print_int',
+    'print_bool': 'print_bool',
+}
+
+# The runtime: the entry point and printing. It uses no libc, so the
+# program can be linked with `ld` alone.
+RUNTIME = '''
+    .global _start
+    .text
+
+_start:
+    call main
+    movq $60, %rax
+    xorq %rdi, %rdi
+    syscall
+
+# Writes %rdi in decimal and a newline to stdout.
+print_int:
+    pushq %rbp
+    movq %rsp, %rbp
+    subq $32, %rsp
+    movq %rdi, %rax
+    leaq -1(%rbp), %rsi
+    movb $10, (%rsi)
+    movq $10, %rcx
+.Lprint_int_digit:
+    # Take digits from the absolute value, which works for the smallest
+    # integer too when the remainders are negated
+    cqto
+    idivq %rcx
+    testq %rdx, %rdx
+    jns .Lprint_int_positive
+    negq %rdx
+.Lprint_int_positive:
+    addq $48, %rdx
+    decq %rsi
+    movb %dl, (%rsi)
+    testq %rax, %rax
+    jnz .Lprint_int_digit
+    testq %rdi, %rdi
+    jns .Lprint_int_write
+    decq %rsi
+    movb $45, (%rsi)
+.Lprint_int_write:
+    movq %rbp, %rdx
+    subq %rsi, %rdx
+    movq $1, %rax
+    movq $1, %rdi
+    syscall
+    movq %rbp, %rsp
+    popq %rbp
+    ret
+
+# Writes "true" or "false" and a newline to stdout.
+print_bool:
+    movq $1, %rax
+    testq %rdi, %rdi
+    jz .Lprint_false
+    leaq true_text(%rip), %rsi
+    movq $5, %rdx
+    jmp .Lprint_bool_write
+.Lprint_false:
+    leaq false_text(%rip), %rsi
+    movq $6, %rdx
+.Lprint_bool_write:
+    movq $1, %rdi
+    syscall
+    ret
+
+    .section .rodata
+true_text:
+    .ascii "true\\n"
+false_text:
+    .ascii "false\\n"
+    .text
+'''
+
+
+def generate_assembly(instructions: list[ir.Instruction]) -> str:
+    """Translate the IR of a program to x86-64 assembly for the GNU
+    assembler, including the runtime.
+
+    Variables are placed by the register allocator, in callee-saved
+    registers or in stack slots of `main`. Operators are compiled inline
+    from `all_intrinsics`, and a comparison whose only use is the next
+    CondJump becomes a single conditional jump. Other calls go to the
+    runtime."""
+    allocation = allocate(instructions, callee_saved_registers)
+    used_registers = sorted(set(allocation.registers.values()), key=callee_saved_registers.index)
+    use_counts: dict[IRVar, int] = {}
+    for insn in instructions:
+        for var in uses(insn):
+            use_counts[var] = use_counts.get(var, 0) + 1
+    lines: list[str] = []
+    label_count = 0
+
+    def emit(line: str) -> None:
+        if line.endswith(':'):
+            lines.append(line)
+        else:
+            lines.append(f'    {line}')
+
+    def new_label() -> str:
+        nonlocal label_count
+        label_count += 1
+        # IR label names can't contain a dot
+        return f'.Lintrinsic.{label_count}'
+
+    def location(var: IRVar) -> str:
+        location = allocation.location(var)
+        if isinstance(location, str):
+            return location
+        # Stack slots are below the saved registers
+        return f'-{8 * (len(used_registers) + location + 1)}(%rbp)'
+
+    def move(source: str, dest: str) -> None:
+        if source == dest:
+            return
+        if source.startswith('%') or dest.startswith('%'):
+            emit(f'movq {source}, {dest}')
+        else:
+            emit(f'movq {source}, %rax')
+            emit(f'movq %rax, {dest}')
+
+    def falls_through_to(i: int, label: ir.Label) -> bool:
+        """Whether the instruction after `instructions[i]` is `label`."""
+        following = instructions[i + 1] if i + 1 < len(instructions) else None
+        return isinstance(following, ir.Label) and following.name == label.name
+
+    def conditional_jump(i: int, condition: str, then_label: ir.Label, else_label: ir.Label) -> None:
+        """Jump to `then_label` if `condition` holds after `instructions[i]`,
+        leaving out jumps to the next instruction."""
+        if falls_through_to(i, then_label):
+            emit(f'j{negated_conditions[condition]} .L{else_label.name}')
+            return
+        emit(f'j{condition} .L{then_label.name}')
+        if not falls_through_to(i, else_label):
+            emit(f'jmp .L{else_label.name}')
+
+    lines.append('main:')
+    emit('pushq %rbp')
+    emit('movq %rsp, %rbp')
+    for register in used_registers:
+        emit(f'pushq {register}')
+    # Keep %rsp 16-byte aligned at calls. It is aligned after pushing %rbp.
+    frame_size = 8 * allocation.slot_count
+    if (frame_size + 8 * len(used_registers)) % 16 != 0:
+        frame_size += 8
+    if frame_size:
+        emit(f'subq ${frame_size}, %rsp')
+
+    # The comparison that was fused into the next CondJump, if any
+    fused: str | None = None
+    for i, insn in enumerate(instructions):
+        # IRVar's __str__ ends in a newline
+        lines.append(f'    # {str(insn).replace("\n", "")}')
+        match insn:
+            case ir.Label():
+                lines.append(f'.L{insn.name}:')
+            case ir.LoadIntConst():
+                if -2**31 <= insn.value < 2**31:
+                    emit(f'movq ${insn.value}, {location(insn.dest)}')
+                else:
+                    emit(f'movabsq ${insn.value}, %rax')
+                    emit(f'movq %rax, {location(insn.dest)}')
+            case ir.LoadBoolConst():
+                emit(f'movq ${int(insn.value)}, {location(insn.dest)}')
+            case ir.Copy():
+                move(location(insn.source), location(insn.dest))
+            case ir.Call() if insn.fun.name in all_intrinsics:
+                next_insn = instructions[i + 1] if i + 1 < len(instructions) else None
+                if (insn.fun.name in comparison_conditions
+                        and isinstance(next_insn, ir.CondJump)
+                        and next_insn.cond == insn.dest
+                        and use_counts[insn.dest] == 1):
+                    emit(f'movq {location(insn.args[0])}, %rax')
+                    emit(f'cmpq {location(insn.args[1])}, %rax')
+                    fused = comparison_conditions[insn.fun.name]
+                    continue
+                all_intrinsics[insn.fun.name](IntrinsicArgs(
+                    arg_refs=[location(arg) for arg in insn.args],
+                    emit=emit,
+                    new_label=new_label,
+                ))
+                emit(f'movq %rax, {location(insn.dest)}')
+            case ir.Call():
+                if insn.fun.name not in runtime_functions:
+                    raise Exception(f"{insn.location}: unknown function {insn.fun.name}")
+                if len(insn.args) > len(argument_registers):
+                    raise Exception(f"{insn.location}: too many arguments to {insn.fun.name}")
+                for arg, register in zip(insn.args, argument_registers):
+                    emit(f'movq {location(arg)}, {register}')
+                emit(f'call {runtime_functions[insn.fun.name]}')
+                emit(f'movq %rax, {location(insn.dest)}')
+            case ir.Jump():
+                if not falls_through_to(i, insn.label):
+                    emit(f'jmp .L{insn.label.name}')
+            case ir.CondJump():
+                if fused is None:
+                    emit(f'cmpq $0, {location(insn.cond)}')
+                    conditional_jump(i, 'ne', insn.then_label, insn.else_label)
+                else:
+                    conditional_jump(i, fused, insn.then_label, insn.else_label)
+            case _:
+                raise Exception(f"{insn.location}: unknown instruction {type(insn).__name__}")
+        fused = None
+
+    emit('movq $0, %rax')
+    emit(f'leaq -{8 * len(used_registers)}(%rbp), %rsp')
+    for register in reversed(used_registers):
+        emit(f'popq {register}')
+    emit('popq %rbp')
+    emit('ret')
+    return RUNTIME + '\n'.join(lines) + '\n'
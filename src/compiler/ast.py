@@ -1,52 +1,61 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from .token_location import Location
+from .types import Type
 
-@dataclass
+@dataclass(slots=True)
 class Expression:
     """Base class for AST nodes representing expressions."""
     location: Location
+    # Set by the type checker. Not part of equality, so parsed trees
+    # can be compared with expected ones before and after type checking.
+    type: Type | None = field(default=None, kw_only=True, compare=False, repr=False)
 
-@dataclass
+@dataclass(slots=True)
 class Literal(Expression):
     value: int | bool
 
-@dataclass
+@dataclass(slots=True)
 class Identifier(Expression):
     name: str
+    # Set by `resolve()`: the frame slot of the variable, or -1 for a
+    # name that is not declared in the program, like a built-in.
+    slot: int = field(default=-1, kw_only=True, compare=False, repr=False)
 
-@dataclass
+@dataclass(slots=True)
 class BinaryOp(Expression):
     """AST node for a binary operation like `A + B`"""
     left: Expression
     op: str
     right: Expression
 
-@dataclass
+@dataclass(slots=True)
 class UnaryOp(Expression):
     op: str
     operand: Expression
 
-@dataclass
+@dataclass(slots=True)
 class IfExpression(Expression):
     condition: Expression
     then_branch: Expression
     else_branch: Expression | None
 
-@dataclass
+@dataclass(slots=True)
 class FunctionCall(Expression):
     function: Expression
     arguments: list[Expression]
 
-@dataclass
+@dataclass(slots=True)
 class VariableDeclaration(Expression):
     name: str
     value: Expression
+    # Set by `resolve()`: the frame slot of the declared variable.
+    slot: int = field(default=-1, kw_only=True, compare=False, repr=False)
 
-@dataclass
+@dataclass(slots=True)
 class Block(Expression):
     statements: list[Expression]
 
-@dataclass
+@dataclass(slots=True)
 class Assignment(Expression):
     name: Identifier
     value: Expression
\ No newline at end of file
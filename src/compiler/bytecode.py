@@ -0,0 +1,196 @@
+import sys
+from dataclasses import dataclass, field
+from enum import IntEnum
+from compiler import ast
+from compiler.resolver import resolve
+
+type Constant = int | bool | str | None
+
+class Opcode(IntEnum):
+    """Bytecode instructions. Each instruction is one 32-bit word: the
+    opcode in the low byte and a 24-bit argument in the rest.
+
+    Binary and unary operators take their operands from the stack and
+    push the result. Jump targets are instruction indices."""
+    LOAD_CONST = 0            # push constants[arg]
+    LOAD_LOCAL = 1            # push frame[arg]
+    STORE_LOCAL = 2           # frame[arg] = top of stack, which is kept
+    LOAD_GLOBAL = 3           # push the global named constants[arg]
+    STORE_GLOBAL = 4          # set the global named constants[arg], keeping the value
+    POP = 5
+    JUMP = 6
+    JUMP_IF_FALSE = 7         # pop, and jump if the value is false
+    JUMP_IF_FALSE_OR_POP = 8  # jump if top of stack is false, else pop it
+    JUMP_IF_TRUE_OR_POP = 9   # jump if top of stack is true, else pop it
+    RETURN = 10               # return top of stack
+    ADD = 11
+    SUB = 12
+    MUL = 13
+    DIV = 14
+    MOD = 15
+    EQ = 16
+    NE = 17
+    LT = 18
+    LE = 19
+    GT = 20
+    GE = 21
+    NEG = 22
+    NOT = 23
+
+binary_opcodes = {
+    '+': Opcode.ADD, '-': Opcode.SUB, '*': Opcode.MUL, '/': Opcode.DIV, '%': Opcode.MOD,
+    '==': Opcode.EQ, '!=': Opcode.NE, '<': Opcode.LT, '<=': Opcode.LE, '>': Opcode.GT, '>=': Opcode.GE,
+}
+unary_opcodes = {'-': Opcode.NEG, 'not': Opcode.NOT}
+
+jump_opcodes = {Opcode.JUMP, Opcode.JUMP_IF_FALSE, Opcode.JUMP_IF_FALSE_OR_POP, Opcode.JUMP_IF_TRUE_OR_POP}
+
+MAX_ARG = (1 << 24) - 1
+
+
+@dataclass(slots=True)
+class Bytecode:
+    """A compiled program.
+
+    `code` holds instruction words in native byte order, so the VM can
+    read it through `memoryview(code).cast('I')`."""
+    code: bytearray = field(default_factory=bytearray)
+    constants: list[Constant] = field(default_factory=list)
+    frame_size: int = 0
+
+    def __len__(self) -> int:
+        """The number of instructions."""
+        return len(self.code) // 4
+
+    def instruction(self, index: int) -> tuple[Opcode, int]:
+        word = int.from_bytes(self.code[index * 4:index * 4 + 4], sys.byteorder)
+        return Opcode(word & 0xff), word >> 8
+
+
+def compile_bytecode(node: ast.Expression) -> Bytecode:
+    """Compile a program to bytecode that `run_bytecode()` evaluates with
+    the same result as `interpret()`.
+
+    Variables are resolved to frame slots with `resolve()`. Undeclared
+    names are looked up as globals when the program runs. `and` and `or`
+    leave their deciding operand on the stack, which is the same as in
+    `interpret()` for type checked programs."""
+    bytecode = Bytecode()
+    bytecode.frame_size = resolve(node)
+    code = bytecode.code
+    constant_ids: dict[tuple[type, Constant], int] = {}
+
+    def emit(op: Opcode, arg: int = 0) -> int:
+        """Appends an instruction and returns its index."""
+        if not 0 <= arg <= MAX_ARG:
+            raise ValueError(f"Bytecode argument out of range: {arg}")
+        index = len(code) // 4
+        code.extend((op | arg << 8).to_bytes(4, sys.byteorder))
+        return index
+
+    def patch(index: int, target: int) -> None:
+        """Sets the target of the jump at `index`."""
+        word = int.from_bytes(code[index * 4:index * 4 + 4], sys.byteorder)
+        code[index * 4:index * 4 + 4] = ((word & 0xff) | target << 8).to_bytes(4, sys.byteorder)
+
+    def here() -> int:
+        return len(code) // 4
+
+    def constant(value: Constant) -> int:
+        # True and 1 are equal as dict keys, so the type is part of the key
+        key = (type(value), value)
+        if key not in constant_ids:
+            constant_ids[key] = len(bytecode.constants)
+            bytecode.constants.append(value)
+        return constant_ids[key]
+
+    def compile_node(node: ast.Expression) -> None:
+        match node:
+            case ast.Literal():
+                emit(Opcode.LOAD_CONST, constant(node.value))
+
+            case ast.Identifier():
+                if node.slot >= 0:
+                    emit(Opcode.LOAD_LOCAL, node.slot)
+                else:
+                    emit(Opcode.LOAD_GLOBAL, constant(node.name))
+
+            case ast.BinaryOp():
+                compile_node(node.left)
+                # Special handling for short-circuiting operators
+                if node.op in ("and", "or"):
+                    op = Opcode.JUMP_IF_FALSE_OR_POP if node.op == "and" else Opcode.JUMP_IF_TRUE_OR_POP
+                    jump = emit(op)
+                    compile_node(node.right)
+                    patch(jump, here())
+                    return
+                compile_node(node.right)
+                if node.op not in binary_opcodes:
+                    raise ValueError(f"{node.location}: unknown operator {node.op}")
+                emit(binary_opcodes[node.op])
+
+            case ast.UnaryOp():
+                compile_node(node.operand)
+                if node.op not in unary_opcodes:
+                    raise ValueError(f"{node.location}: unknown operator {node.op}")
+                emit(unary_opcodes[node.op])
+
+            case ast.IfExpression():
+                compile_node(node.condition)
+                jump_to_else = emit(Opcode.JUMP_IF_FALSE)
+                compile_node(node.then_branch)
+                jump_to_end = emit(Opcode.JUMP)
+                patch(jump_to_else, here())
+                if node.else_branch is not None:
+                    compile_node(node.else_branch)
+                else:
+                    emit(Opcode.LOAD_CONST, constant(None))
+                patch(jump_to_end, here())
+
+            case ast.VariableDeclaration():
+                compile_node(node.value)
+                emit(Opcode.STORE_LOCAL, node.slot)
+
+            case ast.Block():
+                if not node.statements:
+                    emit(Opcode.LOAD_CONST, constant(None))
+                for i, statement in enumerate(node.statements):
+                    if i > 0:
+                        emit(Opcode.POP)
+                    compile_node(statement)
+
+            case ast.Assignment():
+                compile_node(node.value)
+                if node.name.slot >= 0:
+                    emit(Opcode.STORE_LOCAL, node.name.slot)
+                else:
+                    emit(Opcode.STORE_GLOBAL, constant(node.name.name))
+
+            case _:
+                raise ValueError(f"Unknown node type: {type(node)}")
+
+    compile_node(node)
+    emit(Opcode.RETURN)
+    return bytecode
+
+
+def disassemble(bytecode: Bytecode) -> str:
+    """A listing with one instruction per line. Jump targets are marked
+    with '>>' and constant arguments are shown in parentheses."""
+    targets = set()
+    for i in range(len(bytecode)):
+        op, arg = bytecode.instruction(i)
+        if op in jump_opcodes:
+            targets.add(arg)
+
+    lines = []
+    for i in range(len(bytecode)):
+        op, arg = bytecode.instruction(i)
+        marker = '>>' if i in targets else '  '
+        line = f'{marker} {i:>4} {op.name:<20}'
+        if op in (Opcode.LOAD_CONST, Opcode.LOAD_GLOBAL, Opcode.STORE_GLOBAL):
+            line += f' {arg} ({bytecode.constants[arg]!r})'
+        elif op in (Opcode.LOAD_LOCAL, Opcode.STORE_LOCAL) or op in jump_opcodes:
+            line += f' {arg}'
+        lines.append(line.rstrip())
+    return '\n'.join(lines)
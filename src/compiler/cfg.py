@@ -0,0 +1,272 @@
+from collections import deque
+from dataclasses import dataclass, field
+from compiler import ir
+from compiler.ir import IRVar
+from compiler.ir_passes import destination, uses
+
+
+@dataclass(slots=True, eq=False)
+class BasicBlock:
+    """A sequence of instructions that is only entered at the start and
+    only left at the end. `instructions` includes the leading label and
+    the ending jump, if any."""
+    index: int
+    instructions: list[ir.Instruction] = field(default_factory=list)
+    successors: list["BasicBlock"] = field(default_factory=list)
+    predecessors: list["BasicBlock"] = field(default_factory=list)
+
+    @property
+    def label(self) -> str | None:
+        first = self.instructions[0] if self.instructions else None
+        return first.name if isinstance(first, ir.Label) else None
+
+    def __repr__(self) -> str:
+        return f'BasicBlock({self.index}, {self.label}, {len(self.instructions)} instructions)'
+
+
+@dataclass(slots=True)
+class CFG:
+    """A control flow graph. The first block is the entry."""
+    blocks: list[BasicBlock]
+
+    def instructions(self) -> list[ir.Instruction]:
+        """The instructions of all blocks in order."""
+        return [insn for block in self.blocks for insn in block.instructions]
+
+    def reverse_postorder(self) -> list[BasicBlock]:
+        """The blocks reachable from the entry, each before its successors
+        except along back edges. Unreachable blocks come last."""
+        visited = [False] * len(self.blocks)
+        postorder: list[BasicBlock] = []
+        # Each entry is a block and the index of its next successor to visit
+        stack: list[tuple[BasicBlock, int]] = [(self.blocks[0], 0)]
+        visited[0] = True
+        while stack:
+            block, i = stack[-1]
+            if i < len(block.successors):
+                stack[-1] = (block, i + 1)
+                successor = block.successors[i]
+                if not visited[successor.index]:
+                    visited[successor.index] = True
+                    stack.append((successor, 0))
+            else:
+                stack.pop()
+                postorder.append(block)
+        postorder.reverse()
+        return postorder + [block for block in self.blocks if not visited[block.index]]
+
+
+def build_cfg(instructions: list[ir.Instruction]) -> CFG:
+    """Split instructions into basic blocks at labels and after jumps,
+    and connect the blocks by jumps and fall-through."""
+    blocks = [BasicBlock(0)]
+    for insn in instructions:
+        current = blocks[-1]
+        if isinstance(insn, ir.Label) and current.instructions:
+            current = BasicBlock(len(blocks))
+            blocks.append(current)
+        current.instructions.append(insn)
+        if isinstance(insn, (ir.Jump, ir.CondJump)):
+            blocks.append(BasicBlock(len(blocks)))
+    if len(blocks) > 1 and not blocks[-1].instructions:
+        blocks.pop()
+
+    by_label = {block.label: block for block in blocks if block.label is not None}
+
+    def block_at(label: ir.Label) -> BasicBlock:
+        if label.name not in by_label:
+            raise Exception(f"{label.location}: undefined label {label.name}")
+        return by_label[label.name]
+
+    for block in blocks:
+        last = block.instructions[-1] if block.instructions else None
+        if isinstance(last, ir.Jump):
+            targets = [block_at(last.label)]
+        elif isinstance(last, ir.CondJump):
+            targets = [block_at(last.then_label), block_at(last.else_label)]
+        elif block.index + 1 < len(blocks):
+            targets = [blocks[block.index + 1]]
+        else:
+            targets = []
+        for target in targets:
+            if target not in block.successors:
+                block.successors.append(target)
+                target.predecessors.append(block)
+    return CFG(blocks)
+
+
+@dataclass(slots=True)
+class DataflowResult:
+    """The facts at the start and end of each block, as bitsets indexed
+    by block index."""
+    block_in: list[int]
+    block_out: list[int]
+
+
+def solve_dataflow(cfg: CFG, gen: list[int], kill: list[int], forward: bool) -> DataflowResult:
+    """Solve a gen/kill dataflow problem where facts are merged by union,
+    like liveness and reaching definitions.
+
+    Sets of facts are bitsets stored in Python ints, and `gen` and `kill`
+    are indexed by block index. For a forward problem,
+    `out = gen | (in & ~kill)` where `in` is the union of the `out` of
+    the predecessors. A backward problem is the same with `in` and `out`
+    and predecessors and successors swapped.
+
+    Blocks are visited in reverse postorder (postorder when backward),
+    so without loops every block is processed once.
+    """
+    n = len(cfg.blocks)
+    block_in = [0] * n
+    block_out = [0] * n
+    order = cfg.reverse_postorder()
+    if not forward:
+        order.reverse()
+    # For a backward problem, "in" is the end of the block and "out" the start
+    merged, computed = (block_in, block_out) if forward else (block_out, block_in)
+    not_kill = [~k for k in kill]
+
+    worklist = deque(block.index for block in order)
+    queued = [True] * n
+    while worklist:
+        i = worklist.popleft()
+        queued[i] = False
+        block = cfg.blocks[i]
+        sources = block.predecessors if forward else block.successors
+        facts = 0
+        for source in sources:
+            facts |= computed[source.index]
+        merged[i] = facts
+        result = gen[i] | (facts & not_kill[i])
+        if result != computed[i]:
+            computed[i] = result
+            for target in (block.successors if forward else block.predecessors):
+                if not queued[target.index]:
+                    queued[target.index] = True
+                    worklist.append(target.index)
+    return DataflowResult(block_in, block_out)
+
+
+def bits(bitset: int) -> list[int]:
+    """The indices of the set bits, in increasing order."""
+    result = []
+    while bitset:
+        low = bitset & -bitset
+        result.append(low.bit_length() - 1)
+        bitset ^= low
+    return result
+
+
+def _bitset(ids: set[int]) -> int:
+    result = 0
+    for i in ids:
+        result |= 1 << i
+    return result
+
+
+def upward_exposed(cfg: CFG) -> set[str]:
+    """The names of the variables that some block reads before writing
+    them. Other variables are only read in the block that wrote them, so
+    the dataflow analyses don't need to track them. This keeps bitsets
+    small: most IR variables are temporaries used once."""
+    names = set()
+    for block in cfg.blocks:
+        written = set()
+        for insn in block.instructions:
+            for var in uses(insn):
+                if var.name not in written:
+                    names.add(var.name)
+            dest = destination(insn)
+            if dest is not None:
+                written.add(dest.name)
+    return names
+
+
+@dataclass(slots=True)
+class Liveness:
+    """The variables live at the start (`live_in`) and end (`live_out`)
+    of each block. Bit i stands for `variables[i]`."""
+    variables: list[IRVar]
+    live_in: list[int]
+    live_out: list[int]
+
+    def live_variables(self, bitset: int) -> set[IRVar]:
+        return {self.variables[i] for i in bits(bitset)}
+
+
+def liveness(cfg: CFG) -> Liveness:
+    """Find the variables whose current value may still be read."""
+    tracked = upward_exposed(cfg)
+    variables: list[IRVar] = []
+    variable_ids: dict[str, int] = {}
+    gen = []
+    kill = []
+    for block in cfg.blocks:
+        # Walk backwards, so a read is exposed unless a write comes
+        # before it in the block
+        gen_ids: set[int] = set()
+        kill_ids: set[int] = set()
+        for insn in reversed(block.instructions):
+            dest = destination(insn)
+            if dest is not None and dest.name in tracked:
+                if dest.name not in variable_ids:
+                    variable_ids[dest.name] = len(variables)
+                    variables.append(dest)
+                kill_ids.add(variable_ids[dest.name])
+                gen_ids.discard(variable_ids[dest.name])
+            for var in uses(insn):
+                if var.name in tracked:
+                    if var.name not in variable_ids:
+                        variable_ids[var.name] = len(variables)
+                        variables.append(var)
+                    gen_ids.add(variable_ids[var.name])
+        gen.append(_bitset(gen_ids))
+        kill.append(_bitset(kill_ids))
+
+    result = solve_dataflow(cfg, gen, kill, forward=False)
+    return Liveness(variables, result.block_in, result.block_out)
+
+
+@dataclass(slots=True)
+class ReachingDefinitions:
+    """The definitions that may reach the start (`reach_in`) and end
+    (`reach_out`) of each block. Bit i stands for `definitions[i]`, a
+    (block index, instruction index in the block) pair."""
+    definitions: list[tuple[int, int]]
+    reach_in: list[int]
+    reach_out: list[int]
+
+
+def reaching_definitions(cfg: CFG) -> ReachingDefinitions:
+    """Find which writes of each variable may be the latest one.
+
+    Only writes of variables in `upward_exposed()` are included, since
+    the others are never read outside their own block."""
+    tracked = upward_exposed(cfg)
+    definitions: list[tuple[int, int]] = []
+    # The ids of all definitions of each variable
+    definitions_of: dict[str, set[int]] = {}
+    block_definitions: list[dict[str, int]] = []
+    for block in cfg.blocks:
+        # The last definition of each variable in the block
+        last: dict[str, int] = {}
+        for i, insn in enumerate(block.instructions):
+            dest = destination(insn)
+            if dest is not None and dest.name in tracked:
+                definitions_of.setdefault(dest.name, set()).add(len(definitions))
+                last[dest.name] = len(definitions)
+                definitions.append((block.index, i))
+        block_definitions.append(last)
+
+    all_definitions_of = {name: _bitset(ids) for name, ids in definitions_of.items()}
+    gen = []
+    kill = []
+    for last in block_definitions:
+        gen.append(_bitset(set(last.values())))
+        block_kill = 0
+        for name in last:
+            block_kill |= all_definitions_of[name]
+        kill.append(block_kill)
+
+    result = solve_dataflow(cfg, gen, kill, forward=True)
+    return ReachingDefinitions(definitions, result.block_in, result.block_out)
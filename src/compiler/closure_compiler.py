@@ -0,0 +1,113 @@
+from typing import Any, Callable
+from compiler import ast
+from compiler.resolver import resolve
+from compiler.symtab import SymTab, Value, create_global_symtab
+
+# Local variables live in a flat list, one slot per declaration.
+type Frame = list[Any]
+
+# A compiled node: evaluates the node in the given frame.
+type Closure = Callable[[Frame], Value]
+
+
+def compile_closures(node: ast.Expression, symtab: SymTab | None = None) -> Callable[[], Value]:
+    """Translate an AST once into nested Python closures.
+
+    Operators are looked up in `symtab` (the global symbol table by
+    default) at compile time, and every variable is resolved to a slot in
+    a preallocated frame by `resolve()`. The returned function evaluates
+    the program with the same results as `interpret()`, but without
+    dispatching on node types or looking up names, so it can be called
+    many times cheaply.
+    """
+    if symtab is None:
+        symtab = create_global_symtab()
+    frame_size = resolve(node)
+
+    def lookup_operator(name: str) -> Callable[..., Any]:
+        operator = symtab.lookup(name)
+        if not callable(operator):
+            raise ValueError(f"Operator {name} is not callable")
+        return operator
+
+    def compile_node(node: ast.Expression) -> Closure:
+        match node:
+            case ast.Literal():
+                value = node.value
+                return lambda frame: value
+
+            case ast.Identifier():
+                slot = node.slot
+                if slot < 0:
+                    # Not a local variable, so it must be a global
+                    global_value = symtab.lookup(node.name)
+                    return lambda frame: global_value
+                return lambda frame: frame[slot]
+
+            case ast.BinaryOp():
+                left = compile_node(node.left)
+                right = compile_node(node.right)
+                # Special handling for short-circuiting operators
+                if node.op == "and":
+                    return lambda frame: bool(right(frame)) if left(frame) else False
+                elif node.op == "or":
+                    return lambda frame: True if left(frame) else bool(right(frame))
+                operator = lookup_operator(node.op)
+                return lambda frame: operator(left(frame), right(frame))
+
+            case ast.UnaryOp():
+                operand = compile_node(node.operand)
+                unary_operator = lookup_operator(f"unary_{node.op}")
+                return lambda frame: unary_operator(operand(frame))
+
+            case ast.IfExpression():
+                condition = compile_node(node.condition)
+                then_branch = compile_node(node.then_branch)
+                if node.else_branch is None:
+                    return lambda frame: then_branch(frame) if condition(frame) else None
+                else_branch = compile_node(node.else_branch)
+                return lambda frame: then_branch(frame) if condition(frame) else else_branch(frame)
+
+            case ast.VariableDeclaration():
+                value_closure = compile_node(node.value)
+                slot = node.slot
+
+                def declare(frame: Frame) -> Value:
+                    frame[slot] = value = value_closure(frame)
+                    return value
+                return declare
+
+            case ast.Block():
+                statements = [compile_node(statement) for statement in node.statements]
+
+                def block(frame: Frame) -> Value:
+                    result: Value = None
+                    for statement in statements:
+                        result = statement(frame)
+                    return result
+                return block
+
+            case ast.Assignment():
+                value_closure = compile_node(node.value)
+                name = node.name.name
+                slot = node.name.slot
+                if slot < 0:
+                    def assign_global(frame: Frame) -> Value:
+                        value = value_closure(frame)
+                        symtab.set(name, value)
+                        return value
+                    return assign_global
+
+                def assign(frame: Frame) -> Value:
+                    frame[slot] = value = value_closure(frame)
+                    return value
+                return assign
+
+            case _:
+                raise ValueError(f"Unknown node type: {type(node)}")
+
+    root = compile_node(node)
+
+    def run() -> Value:
+        return root([None] * frame_size)
+    return run
@@ -0,0 +1,153 @@
+import fcntl
+import functools
+import hashlib
+import json
+import os
+import struct
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+
+@functools.cache
+def compiler_version() -> str:
+    """A hash of the compiler's source files, so that cached programs
+    are not reused after the compiler changes."""
+    digest = hashlib.sha256()
+    for path in sorted(Path(__file__).parent.glob('*.py')):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+@dataclass(slots=True)
+class CacheStats:
+    hits: int
+    misses: int
+    entries: int
+    size_bytes: int
+    max_bytes: int
+
+
+# Hits and misses, as two unsigned 64-bit integers
+_COUNTERS = struct.Struct('<QQ')
+
+
+class CompileCache:
+    """Compiled programs on disk, keyed by a hash of the source code, the
+    compiler version and the compiler options.
+
+    Several processes can share a cache directory: entries are written to
+    a temporary file and renamed into place, so a reader sees a whole
+    entry or none. Reading an entry updates its modification time, and
+    when the entries take more than `max_bytes`, the least recently used
+    ones are removed. The hit and miss counters are kept in a file that
+    is locked while it is updated.
+    """
+
+    def __init__(self, directory: str | Path, max_bytes: int = 256 * 1024 * 1024) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._entries = self.directory / 'entries'
+        self._entries.mkdir(parents=True, exist_ok=True)
+        self._counters = self.directory / 'counters'
+        self._counters.touch(exist_ok=True)
+        # Hash the compiler once here, not in every forked child
+        self._version = compiler_version()
+
+    def key(self, source_code: str, options: dict[str, Any]) -> str:
+        digest = hashlib.sha256()
+        digest.update(self._version.encode())
+        digest.update(json.dumps(options, sort_keys=True).encode())
+        digest.update(source_code.encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> bytes | None:
+        path = self._entries / key
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            # Also when another process evicted the entry after reading it
+            self._count(hit=False)
+            return None
+        self._count(hit=True)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=self._entries, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self._entries / key)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self.evict()
+
+    def get_or_compile(self, source_code: str, options: dict[str, Any], compile: Callable[[], bytes]) -> bytes:
+        """The cached program, or the result of `compile()`, which is then
+        cached. Compile errors are not cached."""
+        key = self.key(source_code, options)
+        data = self.get(key)
+        if data is None:
+            data = compile()
+            self.put(key, data)
+        return data
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the rest fit in
+        `max_bytes`."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self._entries):
+            if entry.name.startswith('.tmp-'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass  # Removed by another process
+            total -= size
+
+    def stats(self) -> CacheStats:
+        hits, misses = self._update_counters(0, 0)
+        entries = 0
+        size = 0
+        for entry in os.scandir(self._entries):
+            if entry.name.startswith('.tmp-'):
+                continue
+            try:
+                size += entry.stat().st_size
+            except FileNotFoundError:
+                continue
+            entries += 1
+        return CacheStats(hits, misses, entries, size, self.max_bytes)
+
+    def _count(self, hit: bool) -> None:
+        self._update_counters(int(hit), int(not hit))
+
+    def _update_counters(self, hits: int, misses: int) -> tuple[int, int]:
+        """Add to the counters and return the new values."""
+        with open(self._counters, 'r+b') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            data = f.read(_COUNTERS.size)
+            old_hits, old_misses = _COUNTERS.unpack(data) if len(data) == _COUNTERS.size else (0, 0)
+            new = (old_hits + hits, old_misses + misses)
+            if hits or misses:
+                f.seek(0)
+                f.write(_COUNTERS.pack(*new))
+            # Closing the file releases the lock
+        return new
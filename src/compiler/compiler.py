@@ -1,23 +1,73 @@
-from compiler.tokenizer import tokenize
+from typing import Iterator
+from compiler.tokenizer import tokenize, iter_tokens
 from compiler.token import Token
 from compiler.token_location import Location
 from compiler.typecheck import typecheck
 from compiler.types import Type, FunType
 from compiler.parser import parse
 import compiler.ast as ast
+from compiler.ir import Instruction
 from compiler.ir_generator import generate_ir
 from compiler.symtab import create_global_symtab
+from compiler.constant_folding import count_nodes, fold_constants
+from compiler.pass_manager import pass_manager_for_level
+from compiler.assembly_generator import generate_assembly
+from compiler.assembler import assemble
+from compiler.instrumentation import CompileReport, StageStats, stage
 
 
-def compile(code):
-    tokens = tokenize(code)
-    parsed = parse(tokens)
-    typecheck(parsed)
+def _counted(tokens: Iterator[Token], stats: StageStats) -> Iterator[Token]:
+    """Pass tokens through, counting them in `stats.counts['tokens']`."""
+    count = 0
+    for token in tokens:
+        count += 1
+        yield token
+    stats.counts['tokens'] = count
+
+
+def generate_program_ir(code: str, optimization_level: int = 1,
+                        report: CompileReport | None = None) -> list[Instruction]:
+    """Compile source code to optimized IR. Each stage is measured in
+    `report`. Tokens are streamed to the parser, so 'parse' includes
+    tokenizing."""
+    with stage(report, 'parse') as stats:
+        parsed = parse(_counted(iter_tokens(code), stats) if report is not None else iter_tokens(code))
+        if report is not None:
+            stats.counts['nodes'] = count_nodes(parsed)
+    with stage(report, 'typecheck'):
+        typecheck(parsed)
+    if optimization_level >= 1:
+        with stage(report, 'fold constants') as stats:
+            parsed = fold_constants(parsed)
+            if report is not None:
+                stats.counts['nodes'] = count_nodes(parsed)
     # Provide the IR generator with known global names (operators, builtins)
     global_sym = create_global_symtab()
     reserved = set(global_sym.symbols.keys())
     # also reserve printing helpers
     reserved.update({'print_int', 'print_bool'})
-    ir = generate_ir(reserved, parsed)
-    print(ir)
-    return ir
\ No newline at end of file
+    with stage(report, 'generate IR') as stats:
+        ir = generate_ir(reserved, parsed)
+        stats.counts['instructions'] = len(ir)
+    with stage(report, 'optimize IR') as stats:
+        ir = pass_manager_for_level(optimization_level).run(ir)
+        stats.counts['instructions'] = len(ir)
+    return ir
+
+
+def compile(code: str, optimization_level: int = 1, print_ir: bool = False) -> list[Instruction]:
+    """The IR of source code, which is also printed if `print_ir` is set."""
+    ir = generate_program_ir(code, optimization_level)
+    if print_ir:
+        print(ir)
+    return ir
+
+
+def compile_to_executable(code: str, optimization_level: int = 1,
+                          report: CompileReport | None = None) -> bytes:
+    """Compile source code to an x86-64 Linux executable."""
+    ir = generate_program_ir(code, optimization_level, report)
+    with stage(report, 'generate assembly') as stats:
+        assembly = generate_assembly(ir)
+        stats.counts['lines'] = assembly.count('\n')
+    return assemble(assembly, report)
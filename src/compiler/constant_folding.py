@@ -0,0 +1,153 @@
+from typing import Any, Callable
+from compiler import ast
+from compiler.int_ops import int_div, int_mod, wrap_int
+from compiler.types import Bool, Int, Unit
+
+# How operators are evaluated at compile time. Integer operators must
+# give the same results as the generated code, so they wrap around to
+# 64 bits and divide towards zero.
+folded_binary_ops: dict[str, Callable[[Any, Any], Any]] = {
+    '+': lambda a, b: wrap_int(a + b),
+    '-': lambda a, b: wrap_int(a - b),
+    '*': lambda a, b: wrap_int(a * b),
+    '/': int_div,
+    '%': int_mod,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+}
+folded_unary_ops: dict[str, Callable[[Any], Any]] = {
+    '-': lambda a: wrap_int(-a),
+    'not': lambda a: not a,
+}
+
+
+def count_nodes(node: ast.Expression | None) -> int:
+    """The number of nodes in the tree."""
+    match node:
+        case None:
+            return 0
+        case ast.BinaryOp():
+            return 1 + count_nodes(node.left) + count_nodes(node.right)
+        case ast.UnaryOp():
+            return 1 + count_nodes(node.operand)
+        case ast.IfExpression():
+            return 1 + count_nodes(node.condition) + count_nodes(node.then_branch) + count_nodes(node.else_branch)
+        case ast.FunctionCall():
+            return 1 + count_nodes(node.function) + sum(count_nodes(a) for a in node.arguments)
+        case ast.VariableDeclaration():
+            return 1 + count_nodes(node.value)
+        case ast.Block():
+            return 1 + sum(count_nodes(s) for s in node.statements)
+        case ast.Assignment():
+            return 1 + count_nodes(node.name) + count_nodes(node.value)
+        case _:
+            return 1
+
+
+def fold_constants(node: ast.Expression) -> ast.Expression:
+    """Evaluate constant subexpressions of a type checked tree and simplify
+    identities like `x * 1`, `x + 0` and `not not b`.
+
+    Returns the new root. Nodes are changed in place where possible. An
+    expression is only removed if evaluating it could have no effect, so
+    for example `x * 0` is kept. Division by a constant zero is left for
+    the program to fail on when it runs.
+    """
+    match node:
+        case ast.BinaryOp():
+            node.left = fold_constants(node.left)
+            node.right = fold_constants(node.right)
+            return _fold_binary_op(node)
+
+        case ast.UnaryOp():
+            node.operand = fold_constants(node.operand)
+            operand = node.operand
+            if isinstance(operand, ast.Literal) and node.op in folded_unary_ops:
+                return _literal(node, folded_unary_ops[node.op](operand.value))
+            # `not not b` is `b`, and `- -x` is `x` even for the smallest integer
+            if isinstance(operand, ast.UnaryOp) and operand.op == node.op:
+                return operand.operand
+            return node
+
+        case ast.IfExpression():
+            node.condition = fold_constants(node.condition)
+            node.then_branch = fold_constants(node.then_branch)
+            if node.else_branch is not None:
+                node.else_branch = fold_constants(node.else_branch)
+            if isinstance(node.condition, ast.Literal):
+                if node.condition.value:
+                    return node.then_branch
+                if node.else_branch is not None:
+                    return node.else_branch
+                # A skipped if without else is the same as an empty block
+                empty = ast.Block(node.location, [])
+                empty.type = Unit
+                return empty
+            return node
+
+        case ast.FunctionCall():
+            node.arguments = [fold_constants(argument) for argument in node.arguments]
+            return node
+
+        case ast.VariableDeclaration():
+            node.value = fold_constants(node.value)
+            return node
+
+        case ast.Block():
+            node.statements = [fold_constants(statement) for statement in node.statements]
+            return node
+
+        case ast.Assignment():
+            node.value = fold_constants(node.value)
+            return node
+
+        case _:
+            return node
+
+
+def _literal(node: ast.Expression, value: int | bool) -> ast.Literal:
+    literal = ast.Literal(node.location, value)
+    literal.type = Bool if isinstance(value, bool) else Int
+    return literal
+
+
+def _is_literal(node: ast.Expression, value: int | bool) -> bool:
+    # Compare types too, since True == 1 in Python
+    return isinstance(node, ast.Literal) and type(node.value) is type(value) and node.value == value
+
+
+def _fold_binary_op(node: ast.BinaryOp) -> ast.Expression:
+    left, op, right = node.left, node.op, node.right
+
+    # The right side of 'and' and 'or' is only evaluated if the left side
+    # doesn't decide the result
+    if op in ('and', 'or'):
+        # The value that decides the result: False for 'and', True for 'or'
+        decisive = op == 'or'
+        if _is_literal(left, decisive):
+            return left
+        if _is_literal(left, not decisive):
+            return right
+        if _is_literal(right, not decisive):
+            return left
+        return node
+
+    if isinstance(left, ast.Literal) and isinstance(right, ast.Literal) and op in folded_binary_ops:
+        if op in ('/', '%') and right.value == 0:
+            return node
+        return _literal(node, folded_binary_ops[op](left.value, right.value))
+
+    # Identities that keep the other operand, which is still evaluated
+    if op == '+' and _is_literal(left, 0):
+        return right
+    if op in ('+', '-') and _is_literal(right, 0):
+        return left
+    if op == '*' and _is_literal(left, 1):
+        return right
+    if op in ('*', '/') and _is_literal(right, 1):
+        return left
+    return node
@@ -0,0 +1,237 @@
+from array import array
+from enum import IntEnum
+from typing import Any, Sequence
+import compiler.ast as ast
+from compiler.token_location import Location
+from compiler.types import Type, Bool, Int, Unit
+
+class Kind(IntEnum):
+    """Node kinds. Literals are split by the type of their value."""
+    INT_LITERAL = 0
+    BOOL_LITERAL = 1
+    IDENTIFIER = 2
+    BINARY_OP = 3
+    UNARY_OP = 4
+    IF_EXPRESSION = 5
+    FUNCTION_CALL = 6
+    VARIABLE_DECLARATION = 7
+    BLOCK = 8
+    ASSIGNMENT = 9
+
+# Operators of BinaryOp and UnaryOp nodes. An operator id is its index here.
+operators = ['=', 'or', 'and', '==', '!=', '<', '<=', '>', '>=', '+', '-', '*', '/', '%', 'not']
+operator_ids = {op: i for i, op in enumerate(operators)}
+
+# Types set by the type checker. A type id is its index here, -1 means no type.
+types = [Unit, Int, Bool]
+
+
+class FlatAST:
+    """An AST stored in parallel arrays instead of one object per node.
+
+    Nodes are addressed by integer ids. Children are always added before
+    their parent, so the last node added by `from_ast()` is the root.
+
+    For each node:
+    - `kinds`: the `Kind` of the node
+    - `rows`, `columns`: the location
+    - `first_child`, `child_count`: a range in `children`, which holds the
+      ids of the child nodes in the same order as the fields of the ast
+      class (for IfExpression without else there are two children)
+    - `operators`: operator id of BinaryOp and UnaryOp nodes, else -1
+    - `values`: the value of literals (0 or 1 for booleans), and for
+      Identifier and VariableDeclaration an index into `names`
+    - `types`: type id set by `typecheck_flat()`, -1 until then
+    """
+
+    def __init__(self) -> None:
+        self.kinds = array('b')
+        self.rows = array('i')
+        self.columns = array('i')
+        self.first_child = array('i')
+        self.child_count = array('i')
+        self.operators = array('b')
+        self.values = array('q')
+        self.types = array('b')
+        self.children = array('i')
+        self.names: list[str] = []
+        self.name_ids: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def add_node(
+        self,
+        kind: Kind,
+        location: Location,
+        children: Sequence[int] = (),
+        operator: str | None = None,
+        value: int = 0,
+    ) -> int:
+        """Appends a node and returns its id."""
+        node = len(self.kinds)
+        self.kinds.append(kind)
+        self.rows.append(location.row)
+        self.columns.append(location.column)
+        self.first_child.append(len(self.children))
+        self.child_count.append(len(children))
+        self.children.extend(children)
+        self.operators.append(-1 if operator is None else operator_ids[operator])
+        self.values.append(value)
+        self.types.append(-1)
+        return node
+
+    def name_id(self, name: str) -> int:
+        """Returns the index of `name` in `names`, adding it if needed."""
+        if name not in self.name_ids:
+            self.name_ids[name] = len(self.names)
+            self.names.append(name)
+        return self.name_ids[name]
+
+    def child(self, node: int, index: int) -> int:
+        return self.children[self.first_child[node] + index]
+
+    def child_list(self, node: int) -> array:
+        start = self.first_child[node]
+        return self.children[start:start + self.child_count[node]]
+
+    def location(self, node: int) -> Location:
+        return Location(self.rows[node], self.columns[node])
+
+    def operator(self, node: int) -> str:
+        return operators[self.operators[node]]
+
+    def name(self, node: int) -> str:
+        return self.names[self.values[node]]
+
+    def type(self, node: int) -> Type | None:
+        type_id = self.types[node]
+        return None if type_id < 0 else types[type_id]
+
+    def set_type(self, node: int, t: Type) -> None:
+        self.types[node] = types.index(t)
+
+
+def _child_expressions(node: ast.Expression) -> list[ast.Expression]:
+    """The children of an ast node in the order FlatAST stores them."""
+    match node:
+        case ast.BinaryOp():
+            return [node.left, node.right]
+        case ast.UnaryOp():
+            return [node.operand]
+        case ast.IfExpression():
+            branches = [node.condition, node.then_branch]
+            if node.else_branch is not None:
+                branches.append(node.else_branch)
+            return branches
+        case ast.FunctionCall():
+            return [node.function, *node.arguments]
+        case ast.VariableDeclaration():
+            return [node.value]
+        case ast.Block():
+            return node.statements
+        case ast.Assignment():
+            return [node.name, node.value]
+        case _:
+            return []
+
+
+def from_ast(root: ast.Expression) -> FlatAST:
+    """Converts an ast tree to a FlatAST. The root is the last node.
+
+    The tree is walked with an explicit stack, so any depth is supported."""
+    flat = FlatAST()
+    # Each entry is a node, its children, and the flat ids of the children
+    # converted so far.
+    stack: list[tuple[ast.Expression, list[ast.Expression], list[int]]] = [
+        (root, _child_expressions(root), [])
+    ]
+    while stack:
+        node, child_nodes, child_ids = stack[-1]
+        if len(child_ids) < len(child_nodes):
+            child = child_nodes[len(child_ids)]
+            stack.append((child, _child_expressions(child), []))
+            continue
+        stack.pop()
+        node_id = _add_converted(flat, node, child_ids)
+        t = node.type
+        if t is not None:
+            flat.set_type(node_id, t)
+        if stack:
+            stack[-1][2].append(node_id)
+    return flat
+
+
+def _add_converted(flat: FlatAST, node: ast.Expression, child_ids: list[int]) -> int:
+    match node:
+        case ast.Literal():
+            kind = Kind.BOOL_LITERAL if isinstance(node.value, bool) else Kind.INT_LITERAL
+            return flat.add_node(kind, node.location, value=int(node.value))
+        case ast.Identifier():
+            return flat.add_node(Kind.IDENTIFIER, node.location, value=flat.name_id(node.name))
+        case ast.BinaryOp():
+            return flat.add_node(Kind.BINARY_OP, node.location, child_ids, operator=node.op)
+        case ast.UnaryOp():
+            return flat.add_node(Kind.UNARY_OP, node.location, child_ids, operator=node.op)
+        case ast.IfExpression():
+            return flat.add_node(Kind.IF_EXPRESSION, node.location, child_ids)
+        case ast.FunctionCall():
+            return flat.add_node(Kind.FUNCTION_CALL, node.location, child_ids)
+        case ast.VariableDeclaration():
+            return flat.add_node(Kind.VARIABLE_DECLARATION, node.location, child_ids, value=flat.name_id(node.name))
+        case ast.Block():
+            return flat.add_node(Kind.BLOCK, node.location, child_ids)
+        case ast.Assignment():
+            return flat.add_node(Kind.ASSIGNMENT, node.location, child_ids)
+        case _:
+            raise Exception(f'{node.location}: unknown node type: {type(node)}')
+
+
+def to_ast(flat: FlatAST, root: int | None = None) -> ast.Expression:
+    """Converts a FlatAST (or the subtree at `root`) back to ast nodes."""
+    if root is None:
+        root = len(flat) - 1
+    # Each entry is a node id and the ast nodes of its children built so far.
+    stack: list[tuple[int, list[ast.Expression]]] = [(root, [])]
+    result: ast.Expression | None = None
+    while stack:
+        node, built = stack[-1]
+        if len(built) < flat.child_count[node]:
+            stack.append((flat.child(node, len(built)), []))
+            continue
+        stack.pop()
+        result = _build_node(flat, node, built)
+        t = flat.type(node)
+        if t is not None:
+            result.type = t
+        if stack:
+            stack[-1][1].append(result)
+    assert result is not None
+    return result
+
+
+def _build_node(flat: FlatAST, node: int, c: list[Any]) -> ast.Expression:
+    loc = flat.location(node)
+    match flat.kinds[node]:
+        case Kind.INT_LITERAL:
+            return ast.Literal(loc, flat.values[node])
+        case Kind.BOOL_LITERAL:
+            return ast.Literal(loc, bool(flat.values[node]))
+        case Kind.IDENTIFIER:
+            return ast.Identifier(loc, flat.name(node))
+        case Kind.BINARY_OP:
+            return ast.BinaryOp(loc, c[0], flat.operator(node), c[1])
+        case Kind.UNARY_OP:
+            return ast.UnaryOp(loc, flat.operator(node), c[0])
+        case Kind.IF_EXPRESSION:
+            return ast.IfExpression(loc, c[0], c[1], c[2] if len(c) > 2 else None)
+        case Kind.FUNCTION_CALL:
+            return ast.FunctionCall(loc, c[0], c[1:])
+        case Kind.VARIABLE_DECLARATION:
+            return ast.VariableDeclaration(loc, flat.name(node), c[0])
+        case Kind.BLOCK:
+            return ast.Block(loc, c)
+        case Kind.ASSIGNMENT:
+            return ast.Assignment(loc, c[0], c[1])
+        case kind:
+            raise Exception(f'{loc}: unknown node kind: {kind}')
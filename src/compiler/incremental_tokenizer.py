@@ -0,0 +1,99 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from .token_buffer import TokenBuffer, kind_ids
+from .tokenizer import scan_locations
+
+
+@dataclass
+class Edit:
+    """Replaces `deleted` characters at `offset` with `inserted`."""
+    offset: int
+    deleted: int
+    inserted: str
+
+
+def retokenize(buffer: TokenBuffer, edit: Edit) -> TokenBuffer:
+    """Returns the tokens of `buffer.source` after applying `edit`.
+
+    Only the damaged region is scanned again. Tokens before it are copied
+    as they are, and scanning stops as soon as it reaches a position where
+    a token also started before the edit. From there on the old tokens
+    are reused with shifted offsets, rows and columns.
+
+    The result is the same as `TokenBuffer.from_source()` on the new source.
+    """
+    old = buffer.source
+    offset, deleted, inserted = edit.offset, edit.deleted, edit.inserted
+    if offset < 0 or deleted < 0 or offset + deleted > len(old):
+        raise ValueError(f'edit out of range for source of length {len(old)}: {edit}')
+    source = old[:offset] + inserted + old[offset + deleted:]
+    delta = len(inserted) - deleted
+    edit_end = offset + len(inserted)
+
+    # A token is kept if its end is before the edit: the scanner never
+    # looks more than one character past the end of a match.
+    keep = bisect_left(buffer.ends, offset)
+    # The exception is "/*" without a closing "*/". The scanner looked all
+    # the way to the end of the source for one before deciding that "/" is
+    # an operator, so any later edit can turn it into a comment.
+    last_close = old.rfind('*/')
+    opener = old.find('/*', max(last_close - 1, 0), offset)
+    while opener != -1:
+        i = bisect_left(buffer.starts, opener)
+        if i >= keep:
+            break
+        if buffer.starts[i] == opener:
+            keep = i
+            break
+        opener = old.find('/*', opener + 1, offset)
+
+    if keep > 0:
+        pos = buffer.ends[keep - 1]
+        row = buffer.rows[keep - 1]
+        line_start = buffer.starts[keep - 1] - buffer.columns[keep - 1] + 1
+    else:
+        pos, row, line_start = 0, 1, 0
+
+    result = TokenBuffer(
+        source,
+        buffer.kinds[:keep],
+        buffer.starts[:keep],
+        buffer.ends[:keep],
+        buffer.rows[:keep],
+        buffer.columns[:keep],
+    )
+    for token_type, start, end, row, column in scan_locations(source, pos, row, line_start):
+        if start >= edit_end:
+            # Once we're at the start of an old token, the rest of the
+            # scan would repeat the old one.
+            old_start = start - delta
+            j = bisect_left(buffer.starts, old_start)
+            if j < len(buffer.starts) and buffer.starts[j] == old_start:
+                _append_shifted(result, buffer, j, delta, row, column)
+                return result
+        result.kinds.append(kind_ids[token_type])
+        result.starts.append(start)
+        result.ends.append(end)
+        result.rows.append(row)
+        result.columns.append(column)
+    return result
+
+
+def _append_shifted(result: TokenBuffer, buffer: TokenBuffer, first: int, delta: int, row: int, column: int) -> None:
+    """Appends tokens `first..` of `buffer` to `result`, moving token `first`
+    to `row` and `column` and everything after it along with it."""
+    row_delta = row - buffer.rows[first]
+    column_delta = column - buffer.columns[first]
+    # Only the tokens on the same line as the first one change column.
+    same_line_end = bisect_right(buffer.rows, buffer.rows[first], first)
+
+    result.kinds.extend(buffer.kinds[first:])
+    result.starts.extend(array('i', [s + delta for s in buffer.starts[first:]]))
+    result.ends.extend(array('i', [e + delta for e in buffer.ends[first:]]))
+    if row_delta:
+        result.rows.extend(array('i', [r + row_delta for r in buffer.rows[first:]]))
+    else:
+        result.rows.extend(buffer.rows[first:])
+    result.columns.extend(array('i', [c + column_delta for c in buffer.columns[first:same_line_end]]))
+    result.columns.extend(buffer.columns[same_line_end:])
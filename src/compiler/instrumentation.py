@@ -0,0 +1,76 @@
+import json
+import resource
+import time
+import tracemalloc
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+from typing import Iterator
+
+
+@dataclass(slots=True)
+class StageStats:
+    """Measurements of one compiler stage.
+
+    `cpu_seconds` includes external tools like `as`. `peak_memory` is the
+    most memory that Python allocated at once during the stage, in bytes,
+    or None when memory is not traced. `counts` has the sizes of what the
+    stage produced, like the number of tokens or IR instructions."""
+    name: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_memory: int | None = None
+    counts: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class CompileReport:
+    """The stages of one compilation, in the order they ran. Tracing
+    memory with tracemalloc makes compiling several times slower, so it
+    is only done with `trace_memory`."""
+    trace_memory: bool = False
+    stages: list[StageStats] = field(default_factory=list)
+
+    @property
+    def wall_seconds(self) -> float:
+        return sum(stage.wall_seconds for stage in self.stages)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageStats]:
+        """Measure the block as a stage. The block can add counts to the
+        StageStats it gets."""
+        stats = StageStats(name)
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+        wall_start = time.perf_counter()
+        cpu_start = _cpu_time()
+        try:
+            yield stats
+        finally:
+            stats.wall_seconds = time.perf_counter() - wall_start
+            stats.cpu_seconds = _cpu_time() - cpu_start
+            if self.trace_memory:
+                stats.peak_memory = tracemalloc.get_traced_memory()[1] - memory_before
+            if started_tracing:
+                tracemalloc.stop()
+            self.stages.append(stats)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), indent=2)
+
+
+def stage(report: CompileReport | None, name: str) -> AbstractContextManager[StageStats]:
+    """`report.stage(name)`, or a stage that isn't recorded if there is no
+    report."""
+    if report is None:
+        return nullcontext(StageStats(name))
+    return report.stage(name)
+
+
+def _cpu_time() -> float:
+    """The CPU time of this process and its finished child processes."""
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
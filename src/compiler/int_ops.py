@@ -0,0 +1,26 @@
+# Integers behave like the 64-bit integers of the machine. The constant
+# folder and the IR interpreter both compute with these, so that they
+# agree with the generated code.
+INT_MIN = -(1 << 63)
+INT_MAX = (1 << 63) - 1
+
+
+def wrap_int(value: int) -> int:
+    """Wraps `value` around to a signed 64-bit integer."""
+    return ((value - INT_MIN) & 0xFFFF_FFFF_FFFF_FFFF) + INT_MIN
+
+
+def int_div(a: int, b: int) -> int:
+    """Integer division that rounds towards zero, like `idiv`."""
+    if b == 0:
+        raise ZeroDivisionError("integer division by zero")
+    q = abs(a) // abs(b)
+    return wrap_int(q if (a < 0) == (b < 0) else -q)
+
+
+def int_mod(a: int, b: int) -> int:
+    """The remainder of `int_div()`, which has the sign of `a`."""
+    if b == 0:
+        raise ZeroDivisionError("integer division by zero")
+    r = abs(a) % abs(b)
+    return r if a >= 0 else -r
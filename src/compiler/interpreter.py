@@ -1,13 +1,20 @@
 from typing import Any
 from compiler import ast
-from compiler.symtab import SymTab, create_global_symtab
-
-type Value = int | bool | None
+from compiler.flat_ast import FlatAST, Kind
+from compiler.resolver import resolve
+from compiler.symtab import SymTab, Value, create_global_symtab
 
 def interpret(node: ast.Expression, symtab: SymTab | None = None) -> Value:
+    """Evaluate a program. Names that are not declared in the program are
+    looked up in `symtab` (the global symbol table by default)."""
     if symtab is None:
         symtab = create_global_symtab()
-    
+    # Variables live in one preallocated frame, indexed by the slots
+    # assigned by the resolver
+    frame: list[Value] = [None] * resolve(node)
+    return _interpret(node, frame, symtab)
+
+def _interpret(node: ast.Expression, frame: list[Value], symtab: SymTab) -> Value:
     match node:
         case ast.Literal():
             return node.value
@@ -15,61 +22,172 @@ def interpret(node: ast.Expression, symtab: SymTab | None = None) -> Value:
         case ast.BinaryOp():
             # Special handling for short-circuiting operators
             if node.op == "and":
-                a: Any = interpret(node.left, symtab)
+                a: Any = _interpret(node.left, frame, symtab)
                 if not a:
                     return False
-                b: Any = interpret(node.right, symtab)
+                b: Any = _interpret(node.right, frame, symtab)
                 return bool(b)
             elif node.op == "or":
-                a: Any = interpret(node.left, symtab)
+                a: Any = _interpret(node.left, frame, symtab)
                 if a:
                     return True
-                b: Any = interpret(node.right, symtab)
+                b: Any = _interpret(node.right, frame, symtab)
                 return bool(b)
             else:
                 # Normal binary operators: evaluate both operands
-                a: Any = interpret(node.left, symtab)
-                b: Any = interpret(node.right, symtab)
+                a: Any = _interpret(node.left, frame, symtab)
+                b: Any = _interpret(node.right, frame, symtab)
                 operator = symtab.lookup(node.op)
                 if callable(operator):
                     return operator(a, b)
                 else:
                     raise ValueError(f"Operator {node.op} is not callable")
 
-        case ast.IfExpression():
-            if interpret(node.condition, symtab):
-                return interpret(node.then_branch, symtab)
+        case ast.UnaryOp():
+            operand: Any = _interpret(node.operand, frame, symtab)
+            operator = symtab.lookup(f"unary_{node.op}")
+            if callable(operator):
+                return operator(operand)
             else:
-                return interpret(node.else_branch, symtab)
+                raise ValueError(f"Operator {node.op} is not callable")
+
+        case ast.IfExpression():
+            if _interpret(node.condition, frame, symtab):
+                return _interpret(node.then_branch, frame, symtab)
+            elif node.else_branch is not None:
+                return _interpret(node.else_branch, frame, symtab)
+            return None
         
         case ast.Identifier():
+            if node.slot >= 0:
+                return frame[node.slot]
             value = symtab.lookup(node.name)
             return value
         
         case ast.VariableDeclaration():
-            value = interpret(node.value, symtab)
-            # Check if the variable already exists (is being reassigned)
-            try:
-                symtab.lookup(node.name)
-                # Variable exists, so update it
-                symtab.set(node.name, value)
-            except NameError:
-                # Variable doesn't exist, so define it
-                symtab.define(node.name, value)
+            # Every declaration has a slot of its own, so this never
+            # overwrites a variable that it shadows
+            value = _interpret(node.value, frame, symtab)
+            frame[node.slot] = value
             return value
         
         case ast.Block():
-            # Create a new child scope for the block
-            child_symtab = symtab.create_child()
+            # The variables of the block already have slots in the frame
             result: Value = None
             for statement in node.statements:
-                result = interpret(statement, child_symtab)
+                result = _interpret(statement, frame, symtab)
             return result
         
         case ast.Assignment():
-            value = interpret(node.value, symtab)
-            symtab.set(node.name, value)
+            value = _interpret(node.value, frame, symtab)
+            if node.name.slot >= 0:
+                frame[node.name.slot] = value
+            else:
+                symtab.set(node.name.name, value)
             return value
         
         case _:
-            raise ValueError(f"Unknown node type: {type(node)}")
\ No newline at end of file
+            raise ValueError(f"Unknown node type: {type(node)}")
+
+def interpret_flat(flat: FlatAST, node: int | None = None, symtab: SymTab | None = None) -> Value:
+    """Evaluate the FlatAST node with id `node` (the root by default).
+    Works the same way as `interpret()`.
+
+    The tree is walked with an explicit stack, so any depth is supported.
+    The values of evaluated children are kept on a value stack."""
+    if node is None:
+        node = len(flat) - 1
+    if symtab is None:
+        symtab = create_global_symtab()
+
+    def call(name: str, *args: Any) -> Value:
+        operator = symtab.lookup(name)
+        if callable(operator):
+            result: Value = operator(*args)
+            return result
+        raise ValueError(f"Operator {name.removeprefix('unary_')} is not callable")
+
+    # Each entry is a node, the scope it is in, and the scope of its
+    # children, which is new for a block. `steps` has the number of
+    # children of each entry that have been started.
+    stack: list[tuple[int, SymTab, SymTab]] = [
+        (node, symtab, symtab.create_child() if flat.kinds[node] == Kind.BLOCK else symtab)
+    ]
+    steps = [0]
+    values: list[Any] = []
+    while stack:
+        current, scope, child_scope = stack[-1]
+        kind = flat.kinds[current]
+        step = steps[-1]
+        # The index of the child to evaluate next, or -1 when the node
+        # can be evaluated from the values of its children
+        child_index = step if step < flat.child_count[current] else -1
+        if kind == Kind.BINARY_OP and step == 1 and flat.operator(current) in ('and', 'or'):
+            # Special handling for short-circuiting operators
+            if bool(values[-1]) == (flat.operator(current) == 'or'):
+                child_index = -1
+            else:
+                values.pop()
+        elif kind == Kind.IF_EXPRESSION and step == 1:
+            if values.pop():
+                child_index = 1
+            elif flat.child_count[current] > 2:
+                child_index = 2
+            else:
+                values.append(None)
+                child_index = -1
+        elif kind == Kind.IF_EXPRESSION and step == 2:
+            child_index = -1
+        elif kind == Kind.ASSIGNMENT:
+            # Only the value is evaluated, not the target
+            child_index = 1 if step == 0 else -1
+        if child_index >= 0:
+            steps[-1] = step + 1
+            child = flat.child(current, child_index)
+            stack.append((child, child_scope, child_scope.create_child() if flat.kinds[child] == Kind.BLOCK else child_scope))
+            steps.append(0)
+            continue
+        stack.pop()
+        steps.pop()
+
+        match kind:
+            case Kind.INT_LITERAL:
+                values.append(flat.values[current])
+
+            case Kind.BOOL_LITERAL:
+                values.append(bool(flat.values[current]))
+
+            case Kind.BINARY_OP:
+                op = flat.operator(current)
+                if op in ('and', 'or'):
+                    values[-1] = bool(values[-1])
+                else:
+                    b = values.pop()
+                    values[-1] = call(op, values[-1], b)
+
+            case Kind.UNARY_OP:
+                values[-1] = call(f"unary_{flat.operator(current)}", values[-1])
+
+            case Kind.IF_EXPRESSION:
+                pass  # The value of the branch, or None, is on the stack
+
+            case Kind.IDENTIFIER:
+                values.append(scope.lookup(flat.name(current)))
+
+            case Kind.VARIABLE_DECLARATION:
+                scope.define(flat.name(current), values[-1])
+
+            case Kind.BLOCK:
+                count = flat.child_count[current]
+                last = values[-1] if count > 0 else None
+                if count > 0:
+                    del values[-count:]
+                values.append(last)
+
+            case Kind.ASSIGNMENT:
+                scope.set(flat.name(flat.child(current, 0)), values[-1])
+
+            case kind:
+                raise ValueError(f"Unknown node kind: {Kind(kind).name}")
+    result: Value = values.pop()
+    return result
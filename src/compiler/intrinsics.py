@@ -0,0 +1,99 @@
+from dataclasses import dataclass
+from typing import Callable
+
+
+@dataclass(slots=True)
+class IntrinsicArgs:
+    """What an intrinsic needs to emit its code. `arg_refs` are the
+    assembly operands of the arguments, registers or memory. The result
+    goes to %rax. `new_label` returns a label that is unique in the
+    program, for intrinsics that branch."""
+    arg_refs: list[str]
+    emit: Callable[[str], None]
+    new_label: Callable[[], str]
+
+
+type Intrinsic = Callable[[IntrinsicArgs], None]
+
+
+def _arithmetic(instruction: str) -> Intrinsic:
+    def intrinsic(a: IntrinsicArgs) -> None:
+        a.emit(f'movq {a.arg_refs[0]}, %rax')
+        a.emit(f'{instruction} {a.arg_refs[1]}, %rax')
+    return intrinsic
+
+
+def _divide(remainder: bool) -> Intrinsic:
+    # `idiv` traps when the smallest integer is divided by -1, so that
+    # case is done separately: the quotient is the negation, which wraps
+    # like the other operators, and the remainder is 0.
+    def intrinsic(a: IntrinsicArgs) -> None:
+        divide, end = a.new_label(), a.new_label()
+        a.emit(f'cmpq $-1, {a.arg_refs[1]}')
+        a.emit(f'jne {divide}')
+        if remainder:
+            a.emit('xorq %rax, %rax')
+        else:
+            a.emit(f'movq {a.arg_refs[0]}, %rax')
+            a.emit('negq %rax')
+        a.emit(f'jmp {end}')
+        a.emit(f'{divide}:')
+        a.emit(f'movq {a.arg_refs[0]}, %rax')
+        a.emit('cqto')
+        a.emit(f'idivq {a.arg_refs[1]}')
+        if remainder:
+            a.emit('movq %rdx, %rax')
+        a.emit(f'{end}:')
+    return intrinsic
+
+
+def _comparison(condition: str) -> Intrinsic:
+    def intrinsic(a: IntrinsicArgs) -> None:
+        a.emit(f'movq {a.arg_refs[0]}, %rax')
+        a.emit(f'cmpq {a.arg_refs[1]}, %rax')
+        a.emit(f'set{condition} %al')
+        a.emit('movzbq %al, %rax')
+    return intrinsic
+
+
+def _negate(a: IntrinsicArgs) -> None:
+    a.emit(f'movq {a.arg_refs[0]}, %rax')
+    a.emit('negq %rax')
+
+
+def _not(a: IntrinsicArgs) -> None:
+    a.emit(f'movq {a.arg_refs[0]}, %rax')
+    a.emit('xorq $1, %rax')
+
+
+# The condition code of each comparison, for `set<cc>` and `j<cc>`
+comparison_conditions: dict[str, str] = {
+    '==': 'e',
+    '!=': 'ne',
+    '<': 'l',
+    '<=': 'le',
+    '>': 'g',
+    '>=': 'ge',
+}
+
+# The condition that is true exactly when the other one is false
+negated_conditions: dict[str, str] = {
+    'e': 'ne',
+    'ne': 'e',
+    'l': 'ge',
+    'ge': 'l',
+    'le': 'g',
+    'g': 'le',
+}
+
+# The operators that are compiled inline instead of calling the runtime
+all_intrinsics: dict[str, Intrinsic] = {
+    '+': _arithmetic('addq'),
+    '-': _arithmetic('subq'),
+    '*': _arithmetic('imulq'),
+    '/': _divide(remainder=False),
+    '%': _divide(remainder=True),
+    'unary_-': _negate,
+    'unary_not': _not,
+    **{op: _comparison(condition) for op, condition in comparison_conditions.items()},
+}
@@ -1,7 +1,9 @@
+import dataclasses
 from dataclasses import dataclass
+from typing import Any
 from compiler.token_location import Location
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class IRVar:
     """Represents the name of a memory location or built-in."""
     name: str
@@ -10,7 +12,7 @@ class IRVar:
         return f"{self.name} \n"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Instruction():
     """Base class for IR instructions."""
     location: Location
@@ -30,42 +32,42 @@ class Instruction():
         )
         return f'{type(self).__name__}({args})'
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LoadBoolConst(Instruction):
     """Loads a boolean constant value to `dest`."""
     value: bool
     dest: IRVar
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LoadIntConst(Instruction):
     """Loads a constant value to `dest`."""
     value: int
     dest: IRVar
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Copy(Instruction):
     """Copies a value from one variable to another."""
     source: IRVar
     dest: IRVar
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Call(Instruction):
     """Calls a function or built-in."""
     fun: IRVar
     args: list[IRVar]
     dest: IRVar
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Label(Instruction):
     """Marks the destination of a jump instruction."""
     name: str
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Jump(Instruction):
     """Unconditionally continues execution from the given label."""
     label: Label
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class CondJump(Instruction):
     """Continues execution from `then_label` if `cond` is true, otherwise from `else_label`."""
     cond: IRVar
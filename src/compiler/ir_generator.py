@@ -1,10 +1,99 @@
+from dataclasses import dataclass, field
+from typing import Callable
 from compiler import ast, ir
+from compiler.flat_ast import FlatAST, Kind
 from compiler.symtab import SymTable
 from compiler.types import Bool, Int, Unit
 from compiler.ir import IRVar
+from compiler.token_location import Location
 import compiler.ir
 
 
+def var_factory(reserved_names: set[str]) -> Callable[[], IRVar]:
+    """Returns a function that creates a new unique IR variable on each call."""
+    # Keep a counter and a set of used names (including reserved ones)
+    counter = 0
+    # copy reserved names so we don't mutate caller's set
+    used = set(reserved_names)
+    used.add('unit')  # the unit variable name is reserved
+
+    def new_var() -> IRVar:
+        nonlocal counter
+        while True:
+            counter += 1
+            name = f"x{counter}"
+            if name not in used:
+                used.add(name)
+                return IRVar(name)
+
+    return new_var
+
+
+def label_factory() -> Callable[[Location, str], ir.Label]:
+    """Returns a function that creates a new uniquely named label on each call."""
+    counter = 0
+
+    def new_label(loc: Location, prefix: str) -> ir.Label:
+        nonlocal counter
+        counter += 1
+        return ir.Label(loc, f"{prefix}{counter}")
+
+    return new_label
+
+
+def snapshot_operands[T](ins: list[ir.Instruction], snapshots: dict[int, list[ir.Instruction]],
+                         new_var: Callable[[], IRVar], assignments: dict[IRVar, int], loc: Location,
+                         operands: list[T], visit: Callable[[T], IRVar]) -> list[IRVar]:
+    """Emit the operands in order with `visit` and return their IR
+    variables. If an operand's variable is assigned to by a later operand,
+    a copy of it is made right after the operand, so that every operand
+    has the value it had when it was evaluated, like in the interpreter.
+    `assignments` counts the assignments to each variable so far.
+
+    The copies are added to `snapshots` by their position in `ins`, and
+    insert_snapshots() inserts them at the end, so that many copies don't
+    take quadratic time."""
+    results: list[IRVar] = []
+    # Where each operand ended in `ins`, and how many times its variable
+    # had been assigned to then
+    ends: list[tuple[int, int]] = []
+    for operand in operands:
+        var = visit(operand)
+        results.append(var)
+        ends.append((len(ins), assignments.get(var, 0)))
+    return copy_reassigned(snapshots, new_var, assignments, loc, results, ends)
+
+
+def copy_reassigned(snapshots: dict[int, list[ir.Instruction]], new_var: Callable[[], IRVar],
+                    assignments: dict[IRVar, int], loc: Location,
+                    results: list[IRVar], ends: list[tuple[int, int]]) -> list[IRVar]:
+    """The second half of snapshot_operands(): `results` are the operands'
+    variables, and `ends` has where each operand ended in the instructions
+    and how many times its variable had been assigned to then."""
+    results = list(results)
+    for i in reversed(range(len(results) - 1)):
+        position, count = ends[i]
+        if assignments.get(results[i], 0) != count:
+            snapshot = new_var()
+            snapshots.setdefault(position, []).append(ir.Copy(loc, results[i], snapshot))
+            results[i] = snapshot
+    return results
+
+
+def insert_snapshots(ins: list[ir.Instruction], snapshots: dict[int, list[ir.Instruction]]) -> list[ir.Instruction]:
+    """`ins` with the copies in `snapshots` inserted before the instruction
+    at their position. The copies at one position only read variables, so
+    their order doesn't matter."""
+    if not snapshots:
+        return ins
+    result: list[ir.Instruction] = []
+    for position, instruction in enumerate(ins):
+        result.extend(snapshots.get(position, ()))
+        result.append(instruction)
+    result.extend(snapshots.get(len(ins), ()))
+    return result
+
+
 def generate_ir(
     # 'reserved_names' should contain all global names
     # like 'print_int' and '+'. You can get them from
@@ -15,21 +104,8 @@ def generate_ir(
     # 'var_unit' is used when an expression's type is 'Unit'.
     var_unit = IRVar('unit')
 
-    def new_var() -> IRVar:
-        # Create a new unique IR variable
-        # Keep a counter and a set of used names (including reserved ones)
-        if not hasattr(new_var, "_counter"):
-            new_var._counter = 0  # type: ignore[attr-defined]
-            # copy reserved names so we don't mutate caller's set
-            new_var._used = set(reserved_names)  # type: ignore[attr-defined]
-            new_var._used.add('unit')  # the unit variable name is reserved
-
-        while True:
-            new_var._counter += 1  # type: ignore[attr-defined]
-            name = f"x{new_var._counter}"
-            if name not in new_var._used:  # type: ignore[attr-defined]
-                new_var._used.add(name)  # type: ignore[attr-defined]
-                return IRVar(name)
+    new_var = var_factory(reserved_names)
+    new_label = label_factory()
 
     # We collect the IR instructions that we generate
     # into this list.
@@ -44,6 +120,18 @@ def generate_ir(
     # (which may be shadowed) to unique IR variables.
     # The symbol table will be updated in the same way as
     # in the interpreter and type checker.
+    #
+    # Visiting a variable returns the variable itself, not a copy,
+    # so an operand that is a variable would see the assignments of
+    # the operands after it. 'assignments' counts the assignments to
+    # each variable, so that visit_operands() can copy such an operand
+    # to a new variable where it was evaluated.
+    assignments: dict[IRVar, int] = {}
+    snapshots: dict[int, list[ir.Instruction]] = {}
+
+    def visit_operands(st: SymTable[IRVar], loc: Location, exprs: list[ast.Expression]) -> list[IRVar]:
+        return snapshot_operands(ins, snapshots, new_var, assignments, loc, exprs, lambda expr: visit(st, expr))
+
     def visit(st: SymTable[IRVar], expr: ast.Expression) -> IRVar:
         loc = expr.location
 
@@ -75,13 +163,34 @@ def generate_ir(
                 # the source code variable.
                 return st.require(expr.name)
 
+            case ast.BinaryOp() if expr.op in ('and', 'or'):
+                # Short-circuiting operators: the right side is only
+                # evaluated if the left side doesn't decide the result.
+                l_right = new_label(loc, f'{expr.op}_right')
+                l_skip = new_label(loc, f'{expr.op}_skip')
+                l_end = new_label(loc, f'{expr.op}_end')
+                var_result = new_var()
+                var_left = visit(st, expr.left)
+                if expr.op == 'and':
+                    ins.append(ir.CondJump(loc, var_left, l_right, l_skip))
+                else:
+                    ins.append(ir.CondJump(loc, var_left, l_skip, l_right))
+                ins.append(l_right)
+                var_right = visit(st, expr.right)
+                ins.append(ir.Copy(loc, var_right, var_result))
+                ins.append(ir.Jump(loc, l_end))
+                ins.append(l_skip)
+                ins.append(ir.LoadBoolConst(loc, expr.op == 'or', var_result))
+                ins.append(ir.Jump(loc, l_end))
+                ins.append(l_end)
+                return var_result
+
             case ast.BinaryOp():
                 # Ask the symbol table to return the variable that refers
                 # to the operator to call.
                 var_op = st.require(expr.op)
                 # Recursively emit instructions to calculate the operands.
-                var_left = visit(st, expr.left)
-                var_right = visit(st, expr.right)
+                var_left, var_right = visit_operands(st, loc, [expr.left, expr.right])
                 # Generate variable to hold the result.
                 var_result = new_var()
                 # Emit a Call instruction that writes to that variable.
@@ -109,7 +218,57 @@ def generate_ir(
                     result_var = visit(child_st, statement)
                 return result_var
 
-            #... # Other AST node cases (see below)
+            case ast.UnaryOp():
+                var_op = st.require(f'unary_{expr.op}')
+                var_operand = visit(st, expr.operand)
+                var_result = new_var()
+                ins.append(ir.Call(loc, var_op, [var_operand], var_result))
+                return var_result
+
+            case ast.IfExpression():
+                l_then = new_label(loc, 'then')
+                l_end = new_label(loc, 'if_end')
+                var_cond = visit(st, expr.condition)
+                if expr.else_branch is None:
+                    ins.append(ir.CondJump(loc, var_cond, l_then, l_end))
+                    ins.append(l_then)
+                    visit(st, expr.then_branch)
+                    ins.append(l_end)
+                    return var_unit
+                l_else = new_label(loc, 'else')
+                # Both branches copy their value to the same variable
+                var_result = new_var()
+                ins.append(ir.CondJump(loc, var_cond, l_then, l_else))
+                ins.append(l_then)
+                ins.append(ir.Copy(loc, visit(st, expr.then_branch), var_result))
+                ins.append(ir.Jump(loc, l_end))
+                ins.append(l_else)
+                ins.append(ir.Copy(loc, visit(st, expr.else_branch), var_result))
+                ins.append(l_end)
+                return var_result
+
+            case ast.FunctionCall():
+                if not isinstance(expr.function, ast.Identifier):
+                    raise Exception(f"{loc}: only named functions can be called")
+                var_fun = st.require(expr.function.name)
+                var_args = visit_operands(st, loc, expr.arguments)
+                var_result = new_var()
+                ins.append(ir.Call(loc, var_fun, var_args, var_result))
+                return var_result
+
+            case ast.Assignment():
+                var_value = visit(st, expr.value)
+                var_target = st.require(expr.name.name)
+                ins.append(ir.Copy(loc, var_value, var_target))
+                assignments[var_target] = assignments.get(var_target, 0) + 1
+                # The value of the assignment, which later assignments to
+                # the variable don't change
+                var_result = new_var()
+                ins.append(ir.Copy(loc, var_value, var_result))
+                return var_result
+
+            case _:
+                raise Exception(f"{loc}: unsupported node type: {type(expr)}")
 
     # We start with a SymTab that maps all available global names
     # like 'print_int' to IR variables of the same name.
@@ -123,12 +282,211 @@ def generate_ir(
 
     # Start visiting the AST from the root.
     var_final_result = visit(root_symtab, root_expr)
+    ins = insert_snapshots(ins, snapshots)
 
     # Add IR code to print the result, based on the type assigned earlier
     # by the type checker.
     if root_expr.type == Int:
-        ... # Emit a call to 'print_int'
+        ins.append(ir.Call(root_expr.location, IRVar('print_int'), [var_final_result], new_var()))
     elif root_expr.type == Bool:
-        ... # Emit a call to 'print_bool'
+        ins.append(ir.Call(root_expr.location, IRVar('print_bool'), [var_final_result], new_var()))
+
+    return ins
+
+
+@dataclass(slots=True)
+class _FlatVisit:
+    """A node that generate_ir_flat() is generating IR for."""
+    node: int
+    st: SymTable[IRVar]
+    # The symbol table of the children, which is new for a block
+    child_st: SymTable[IRVar]
+    # The number of children that have been visited or skipped
+    step: int
+    # The IR variables of the visited children, and where each of them
+    # ended in the instructions, for copy_reassigned()
+    vars: list[IRVar] = field(default_factory=list)
+    ends: list[tuple[int, int]] = field(default_factory=list)
+    labels: list[ir.Label] = field(default_factory=list)
+    var_result: IRVar = IRVar('unit')
+
+
+def generate_ir_flat(reserved_names: set[str], flat: FlatAST, root: int | None = None) -> list[ir.Instruction]:
+    """Same as `generate_ir()`, but for a FlatAST walked by node id.
+
+    The tree is walked with an explicit stack, so any depth is supported.
+    Each node is visited in steps: one before each of its children and
+    one after the last, and each step emits the instructions that
+    `generate_ir()` emits at that point."""
+    if root is None:
+        root = len(flat) - 1
+    var_unit = IRVar('unit')
+    new_var = var_factory(reserved_names)
+    new_label = label_factory()
+    ins: list[ir.Instruction] = []
+    assignments: dict[IRVar, int] = {}
+    snapshots: dict[int, list[ir.Instruction]] = {}
+
+    def start_visit(node: int, st: SymTable[IRVar]) -> _FlatVisit:
+        kind = flat.kinds[node]
+        child_st = st.create_child() if kind == Kind.BLOCK else st
+        # The function of a call and the target of an assignment are
+        # not visited as expressions
+        return _FlatVisit(node, st, child_st, 1 if kind in (Kind.FUNCTION_CALL, Kind.ASSIGNMENT) else 0)
+
+    root_symtab = SymTable[IRVar](parent=None)
+    for name in reserved_names:
+        root_symtab.add_local(name, IRVar(name))
+    stack = [start_visit(root, root_symtab)]
+    while True:
+        v = stack[-1]
+        node = v.node
+        st = v.st
+        loc = flat.location(node)
+        count = flat.child_count[node]
+        # The child to visit next, or -1 when the node is done and its
+        # value is in `var`
+        child = -1
+        var = var_unit
+
+        match flat.kinds[node]:
+            case Kind.BOOL_LITERAL:
+                var = new_var()
+                ins.append(ir.LoadBoolConst(loc, bool(flat.values[node]), var))
+
+            case Kind.INT_LITERAL:
+                var = new_var()
+                ins.append(ir.LoadIntConst(loc, flat.values[node], var))
+
+            case Kind.IDENTIFIER:
+                var = st.require(flat.name(node))
+
+            case Kind.BINARY_OP if flat.operator(node) in ('and', 'or'):
+                op = flat.operator(node)
+                if v.step == 0:
+                    v.labels = [new_label(loc, f'{op}_right'), new_label(loc, f'{op}_skip'), new_label(loc, f'{op}_end')]
+                    v.var_result = new_var()
+                    child = 0
+                elif v.step == 1:
+                    l_right, l_skip, _ = v.labels
+                    if op == 'and':
+                        ins.append(ir.CondJump(loc, v.vars[0], l_right, l_skip))
+                    else:
+                        ins.append(ir.CondJump(loc, v.vars[0], l_skip, l_right))
+                    ins.append(l_right)
+                    child = 1
+                else:
+                    _, l_skip, l_end = v.labels
+                    ins.append(ir.Copy(loc, v.vars[1], v.var_result))
+                    ins.append(ir.Jump(loc, l_end))
+                    ins.append(l_skip)
+                    ins.append(ir.LoadBoolConst(loc, op == 'or', v.var_result))
+                    ins.append(ir.Jump(loc, l_end))
+                    ins.append(l_end)
+                    var = v.var_result
+
+            case Kind.BINARY_OP:
+                if v.step < 2:
+                    child = v.step
+                else:
+                    var_op = st.require(flat.operator(node))
+                    var_left, var_right = copy_reassigned(snapshots, new_var, assignments, loc, v.vars, v.ends)
+                    var = new_var()
+                    ins.append(ir.Call(loc, var_op, [var_left, var_right], var))
+
+            case Kind.VARIABLE_DECLARATION:
+                if v.step == 0:
+                    child = 0
+                else:
+                    var_local = new_var()
+                    st.add_local(flat.name(node), var_local)
+                    ins.append(ir.Copy(loc, v.vars[0], var_local))
+                    var = v.vars[0]
+
+            case Kind.BLOCK:
+                if v.step < count:
+                    child = v.step
+                elif v.vars:
+                    var = v.vars[-1]
+
+            case Kind.UNARY_OP:
+                if v.step == 0:
+                    child = 0
+                else:
+                    var_op = st.require(f'unary_{flat.operator(node)}')
+                    var = new_var()
+                    ins.append(ir.Call(loc, var_op, [v.vars[0]], var))
+
+            case Kind.IF_EXPRESSION:
+                if v.step == 0:
+                    v.labels = [new_label(loc, 'then'), new_label(loc, 'if_end')]
+                    child = 0
+                elif v.step == 1:
+                    l_then, l_end = v.labels
+                    if count < 3:
+                        ins.append(ir.CondJump(loc, v.vars[0], l_then, l_end))
+                    else:
+                        l_else = new_label(loc, 'else')
+                        v.labels.append(l_else)
+                        # Both branches copy their value to the same variable
+                        v.var_result = new_var()
+                        ins.append(ir.CondJump(loc, v.vars[0], l_then, l_else))
+                    ins.append(l_then)
+                    child = 1
+                elif count < 3:
+                    ins.append(v.labels[1])
+                elif v.step == 2:
+                    _, l_end, l_else = v.labels
+                    ins.append(ir.Copy(loc, v.vars[1], v.var_result))
+                    ins.append(ir.Jump(loc, l_end))
+                    ins.append(l_else)
+                    child = 2
+                else:
+                    ins.append(ir.Copy(loc, v.vars[2], v.var_result))
+                    ins.append(v.labels[1])
+                    var = v.var_result
+
+            case Kind.FUNCTION_CALL:
+                function = flat.child(node, 0)
+                if flat.kinds[function] != Kind.IDENTIFIER:
+                    raise Exception(f"{loc}: only named functions can be called")
+                if v.step < count:
+                    child = v.step
+                else:
+                    var_fun = st.require(flat.name(function))
+                    var_args = copy_reassigned(snapshots, new_var, assignments, loc, v.vars, v.ends)
+                    var = new_var()
+                    ins.append(ir.Call(loc, var_fun, var_args, var))
+
+            case Kind.ASSIGNMENT:
+                if v.step == 1:
+                    child = 1
+                else:
+                    var_value = v.vars[0]
+                    var_target = st.require(flat.name(flat.child(node, 0)))
+                    ins.append(ir.Copy(loc, var_value, var_target))
+                    assignments[var_target] = assignments.get(var_target, 0) + 1
+                    var = new_var()
+                    ins.append(ir.Copy(loc, var_value, var))
+
+            case kind:
+                raise Exception(f"{loc}: unsupported node kind: {Kind(kind).name}")
+
+        if child >= 0:
+            v.step += 1
+            stack.append(start_visit(flat.child(node, child), v.child_st))
+            continue
+        stack.pop()
+        if not stack:
+            break
+        parent = stack[-1]
+        parent.vars.append(var)
+        parent.ends.append((len(ins), assignments.get(var, 0)))
 
+    ins = insert_snapshots(ins, snapshots)
+    root_type = flat.type(root)
+    if root_type == Int:
+        ins.append(ir.Call(flat.location(root), IRVar('print_int'), [var], new_var()))
+    elif root_type == Bool:
+        ins.append(ir.Call(flat.location(root), IRVar('print_bool'), [var], new_var()))
     return ins
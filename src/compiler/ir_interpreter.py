@@ -0,0 +1,140 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable
+from compiler import ir
+from compiler.ir import IRVar
+from compiler.int_ops import int_div, int_mod, wrap_int
+
+# Implementations of the global functions that IR code calls.
+builtin_functions: dict[str, Callable[..., Any]] = {
+    '+': lambda a, b: wrap_int(a + b),
+    '-': lambda a, b: wrap_int(a - b),
+    '*': lambda a, b: wrap_int(a * b),
+    '/': int_div,
+    '%': int_mod,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    'unary_-': lambda a: wrap_int(-a),
+    'unary_not': lambda a: not a,
+}
+
+# Operations of loaded instructions. Each loaded instruction is a tuple
+# whose first element is one of these, followed by register indices,
+# functions, constants and instruction indices.
+LOAD = 0        # (LOAD, dest, value)
+COPY = 1        # (COPY, dest, source)
+CALL1 = 2       # (CALL1, dest, function, arg)
+CALL2 = 3       # (CALL2, dest, function, arg1, arg2)
+CALL = 4        # (CALL, dest, function, args)
+JUMP = 5        # (JUMP, target)
+COND_JUMP = 6   # (COND_JUMP, cond, then_target, else_target)
+PRINT_INT = 7   # (PRINT_INT, dest, arg)
+PRINT_BOOL = 8  # (PRINT_BOOL, dest, arg)
+
+
+@dataclass(slots=True)
+class IRProgram:
+    """IR instructions prepared for `run_ir()`.
+
+    Labels are removed and jumps point at instruction indices in `code`.
+    Every IR variable is an index into one list of registers."""
+    code: list[tuple[Any, ...]] = field(default_factory=list)
+    registers: dict[IRVar, int] = field(default_factory=dict)
+
+
+def load_ir(
+    instructions: list[ir.Instruction],
+    functions: dict[str, Callable[..., Any]] = builtin_functions,
+) -> IRProgram:
+    """Prepare IR for running. Called functions are looked up in
+    `functions` here, except for `print_int` and `print_bool`."""
+    program = IRProgram()
+    registers = program.registers
+    registers[IRVar('unit')] = 0
+
+    def reg(var: IRVar) -> int:
+        if var not in registers:
+            registers[var] = len(registers)
+        return registers[var]
+
+    # A label refers to the next instruction that isn't a label
+    targets: dict[str, int] = {}
+    index = 0
+    for insn in instructions:
+        if isinstance(insn, ir.Label):
+            targets[insn.name] = index
+        else:
+            index += 1
+
+    def target(label: ir.Label) -> int:
+        if label.name not in targets:
+            raise Exception(f"{label.location}: undefined label {label.name}")
+        return targets[label.name]
+
+    code = program.code
+    for insn in instructions:
+        match insn:
+            case ir.Label():
+                pass
+            case ir.LoadIntConst() | ir.LoadBoolConst():
+                code.append((LOAD, reg(insn.dest), insn.value))
+            case ir.Copy():
+                code.append((COPY, reg(insn.dest), reg(insn.source)))
+            case ir.Call():
+                name = insn.fun.name
+                args = [reg(arg) for arg in insn.args]
+                if name == 'print_int':
+                    code.append((PRINT_INT, reg(insn.dest), *args))
+                elif name == 'print_bool':
+                    code.append((PRINT_BOOL, reg(insn.dest), *args))
+                elif name not in functions:
+                    raise Exception(f"{insn.location}: unknown function {name}")
+                elif len(args) == 1:
+                    code.append((CALL1, reg(insn.dest), functions[name], *args))
+                elif len(args) == 2:
+                    code.append((CALL2, reg(insn.dest), functions[name], *args))
+                else:
+                    code.append((CALL, reg(insn.dest), functions[name], args))
+            case ir.Jump():
+                code.append((JUMP, target(insn.label)))
+            case ir.CondJump():
+                code.append((COND_JUMP, reg(insn.cond), target(insn.then_label), target(insn.else_label)))
+            case _:
+                raise Exception(f"{insn.location}: unknown instruction {type(insn).__name__}")
+    return program
+
+
+def run_ir(program: IRProgram) -> list[str]:
+    """Run a program prepared by `load_ir()` and return the lines that it
+    printed. Booleans are printed as `true` and `false`."""
+    code = program.code
+    end = len(code)
+    regs: list[Any] = [None] * len(program.registers)
+    output: list[str] = []
+    pc = 0
+    while pc < end:
+        insn = code[pc]
+        op = insn[0]
+        pc += 1
+        if op == COPY:
+            regs[insn[1]] = regs[insn[2]]
+        elif op == CALL2:
+            regs[insn[1]] = insn[2](regs[insn[3]], regs[insn[4]])
+        elif op == LOAD:
+            regs[insn[1]] = insn[2]
+        elif op == COND_JUMP:
+            pc = insn[2] if regs[insn[1]] else insn[3]
+        elif op == JUMP:
+            pc = insn[1]
+        elif op == CALL1:
+            regs[insn[1]] = insn[2](regs[insn[3]])
+        elif op == PRINT_INT:
+            output.append(str(regs[insn[2]]))
+        elif op == PRINT_BOOL:
+            output.append('true' if regs[insn[2]] else 'false')
+        else:
+            regs[insn[1]] = insn[2](*[regs[arg] for arg in insn[3]])
+    return output
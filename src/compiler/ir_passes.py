@@ -0,0 +1,182 @@
+import dataclasses
+from collections import Counter
+from compiler import ir
+from compiler.ir import IRVar
+
+# Instructions that only write their destination, so they can be removed
+# when nothing reads it.
+pure_instructions = (ir.LoadIntConst, ir.LoadBoolConst, ir.Copy)
+
+
+def uses(insn: ir.Instruction) -> list[IRVar]:
+    """The variables that the instruction reads. The function of a Call
+    is a global, so it is not included."""
+    match insn:
+        case ir.Copy():
+            return [insn.source]
+        case ir.Call():
+            return insn.args
+        case ir.CondJump():
+            return [insn.cond]
+        case _:
+            return []
+
+
+def destination(insn: ir.Instruction) -> IRVar | None:
+    """The variable that the instruction writes, if any."""
+    match insn:
+        case ir.LoadIntConst() | ir.LoadBoolConst() | ir.Copy() | ir.Call():
+            return insn.dest
+        case _:
+            return None
+
+
+def _replace_uses(insn: ir.Instruction, copies: dict[IRVar, IRVar]) -> ir.Instruction:
+    match insn:
+        case ir.Copy() if insn.source in copies:
+            return dataclasses.replace(insn, source=copies[insn.source])
+        case ir.Call() if any(arg in copies for arg in insn.args):
+            return dataclasses.replace(insn, args=[copies.get(arg, arg) for arg in insn.args])
+        case ir.CondJump() if insn.cond in copies:
+            return dataclasses.replace(insn, cond=copies[insn.cond])
+        case _:
+            return insn
+
+
+def propagate_copies(instructions: list[ir.Instruction]) -> list[ir.Instruction]:
+    """After `Copy(a, b)`, read `a` instead of `b` until either is written
+    again. This is done within each basic block, since other blocks can
+    be entered from places where the copy didn't happen. Copies of a
+    variable to itself are removed."""
+    result: list[ir.Instruction] = []
+    # copies[b] = a while b holds a copy of a
+    copies: dict[IRVar, IRVar] = {}
+    # copied_to[a] = the variables in `copies` that hold a copy of a
+    copied_to: dict[IRVar, set[IRVar]] = {}
+    for insn in instructions:
+        if isinstance(insn, ir.Label):
+            copies.clear()
+            copied_to.clear()
+            result.append(insn)
+            continue
+        insn = _replace_uses(insn, copies)
+        dest = destination(insn)
+        if dest is not None:
+            if isinstance(insn, ir.Copy) and insn.source == dest:
+                continue
+            # Writing `dest` ends every copy to or from it
+            if dest in copies:
+                copied_to[copies.pop(dest)].discard(dest)
+            for copy in copied_to.pop(dest, ()):
+                del copies[copy]
+            if isinstance(insn, ir.Copy):
+                copies[dest] = insn.source
+                copied_to.setdefault(insn.source, set()).add(dest)
+        result.append(insn)
+    return result
+
+
+def remove_dead_code(instructions: list[ir.Instruction]) -> list[ir.Instruction]:
+    """Remove LoadIntConst, LoadBoolConst and Copy instructions whose
+    destination is never read. Removing a Copy can make its source dead
+    too, which is handled with a worklist instead of rescanning."""
+    use_counts: Counter[IRVar] = Counter()
+    # The indices of the removable instructions that write each variable
+    definitions: dict[IRVar, list[int]] = {}
+    for i, insn in enumerate(instructions):
+        use_counts.update(uses(insn))
+        if isinstance(insn, pure_instructions):
+            definitions.setdefault(insn.dest, []).append(i)
+
+    removed = [False] * len(instructions)
+    worklist = [var for var in definitions if use_counts[var] == 0]
+    while worklist:
+        var = worklist.pop()
+        for i in definitions.pop(var, ()):
+            removed[i] = True
+            insn = instructions[i]
+            if isinstance(insn, ir.Copy):
+                use_counts[insn.source] -= 1
+                if use_counts[insn.source] == 0:
+                    worklist.append(insn.source)
+    return [insn for insn, dead in zip(instructions, removed) if not dead]
+
+
+def prune_unreachable(instructions: list[ir.Instruction]) -> list[ir.Instruction]:
+    """Remove labels that no jump refers to, and instructions that can't
+    be reached because they follow a jump without a label in between."""
+    targets = set()
+    for insn in instructions:
+        if isinstance(insn, ir.Jump):
+            targets.add(insn.label.name)
+        elif isinstance(insn, ir.CondJump):
+            targets.add(insn.then_label.name)
+            targets.add(insn.else_label.name)
+
+    result: list[ir.Instruction] = []
+    reachable = True
+    for insn in instructions:
+        if isinstance(insn, ir.Label):
+            if insn.name in targets:
+                reachable = True
+                result.append(insn)
+        elif reachable:
+            result.append(insn)
+            if isinstance(insn, (ir.Jump, ir.CondJump)):
+                reachable = False
+    return result
+
+
+def thread_jumps(instructions: list[ir.Instruction]) -> list[ir.Instruction]:
+    """Make jumps to a label that is followed by `Jump(L)` go to `L`
+    directly. Conditional jumps with the same target on both sides become
+    plain jumps, and jumps to the label right after them are removed."""
+    labels: dict[str, ir.Label] = {}
+    # The label that control goes to right after each label, if the next
+    # instruction that isn't a label is a Jump
+    forwards: dict[str, str] = {}
+    pending: list[str] = []
+    for insn in instructions:
+        if isinstance(insn, ir.Label):
+            labels[insn.name] = insn
+            pending.append(insn.name)
+            continue
+        if isinstance(insn, ir.Jump):
+            for name in pending:
+                forwards[name] = insn.label.name
+        pending = []
+
+    def final_target(label: ir.Label) -> ir.Label:
+        name = label.name
+        seen = {name}
+        while name in forwards and forwards[name] not in seen:
+            name = forwards[name]
+            seen.add(name)
+        return labels.get(name, label)
+
+    threaded: list[ir.Instruction] = []
+    for insn in instructions:
+        if isinstance(insn, ir.Jump):
+            insn = dataclasses.replace(insn, label=final_target(insn.label))
+        elif isinstance(insn, ir.CondJump):
+            then_label, else_label = final_target(insn.then_label), final_target(insn.else_label)
+            if then_label.name == else_label.name:
+                insn = ir.Jump(insn.location, then_label)
+            else:
+                insn = dataclasses.replace(insn, then_label=then_label, else_label=else_label)
+        threaded.append(insn)
+
+    # Drop jumps that only skip over labels
+    def skips_only_labels(i: int, jump: ir.Jump) -> bool:
+        for j in range(i + 1, len(threaded)):
+            following = threaded[j]
+            if not isinstance(following, ir.Label):
+                return False
+            if following.name == jump.label.name:
+                return True
+        return False
+
+    return [
+        insn for i, insn in enumerate(threaded)
+        if not (isinstance(insn, ir.Jump) and skips_only_labels(i, insn))
+    ]
@@ -1,44 +1,47 @@
+from typing import Any, Generator, Iterable
 from compiler.token import Token
+from compiler.token_stream import TokenStream
 import compiler.ast as ast
 
-def parse(tokens: list[Token]) -> ast.Expression:
-    if not tokens:
+# Parsing functions for constructs that can contain nested expressions are
+# generators. Instead of calling each other recursively, they yield the
+# generator of the nested parse and get its result sent back.
+type Parser[T] = Generator[Parser[Any], Any, T]
+
+def parse(tokens: Iterable[Token]) -> ast.Expression:
+    """Parses a list of tokens, or any iterator of tokens such as
+    `iter_tokens(source)`. Tokens are pulled through a small lookahead
+    buffer, so the full token list never needs to exist at once.
+
+    Nested blocks, if-expressions, parentheses and function calls are
+    parsed on an explicit stack (see 'run()'), so nesting depth is limited
+    only by memory, not by Python's recursion limit."""
+    stream = TokenStream(tokens)
+    if stream.peek().type == 'end':
         return None
-    # This keeps track of which token we're looking at.
-    pos = 0
-    # 'peek()' returns the token at 'pos',
+    # 'peek()' returns the next token,
     # or a special 'end' token if we're past the end
-    # of the token list.
+    # of the input.
     # This way we don't have to worry about going past
     # the end elsewhere.
     def peek() -> Token:
-        if pos < len(tokens):
-            return tokens[pos]
-        else:
-            return Token(
-                location=tokens[-1].location,
-                type="end",
-                text="",
-            )
-
-    # 'consume()' returns the token at 'pos'
-    # and increments 'pos' by one.
+        return stream.peek()
+
+    # 'consume()' returns the next token
+    # and advances the stream by one.
     #
     # If the optional parameter 'expected' is given,
     # it checks that the token being consumed has that text.
     # If 'expected' is a list, then the token must have
     # one of the texts in the list.
     def consume(expected: str | list[str] | None = None) -> Token:
-        nonlocal pos # Python'"nonlocal" lets us modify `pos`
-                     # without creating a local variable of the same name.
         token = peek()
         if isinstance(expected, str) and token.text != expected:
             raise Exception(f'{token.location}: expected "{expected}"')
         if isinstance(expected, list) and token.text not in expected:
             comma_separated = ", ".join([f'"{e}"' for e in expected])
             raise Exception(f'{token.location}: expected one of: {comma_separated}')
-        pos += 1
-        return token
+        return stream.consume()
     def parse_int_literal() -> ast.Literal:
         if peek().type != 'int_literal':
             raise Exception(f'{peek().location}: expected an integer literal')
@@ -62,41 +65,41 @@ def parse(tokens: list[Token]) -> ast.Expression:
         token = consume()
         return ast.Identifier(token.location, token.text)
 
-    def parse_function_call(function: ast.Identifier) -> ast.FunctionCall:
+    def parse_function_call(function: ast.Identifier) -> Parser[ast.FunctionCall]:
         consume('(')
         arguments: list[ast.Expression] = []
         if peek().text != ')':
-            arguments.append(parse_assignment())
+            arguments.append((yield parse_assignment()))
             while peek().text == ',':
                 consume(',')
-                arguments.append(parse_assignment())
+                arguments.append((yield parse_assignment()))
         
         consume(')')
         return ast.FunctionCall(function.location, function, arguments)
 
-    def parse_parenthesized() -> ast.Expression:
+    def parse_parenthesized() -> Parser[ast.Expression]:
         consume('(')
-        # Recursively call the top level pars function
-        #  pars inside parentheses.
-        expr = parse_assignment()
+        # Use the top level parse function
+        # inside parentheses.
+        expr = yield parse_assignment()
         consume(')')
         return expr
 
-    def parse_if_expression() -> ast.Expression:
+    def parse_if_expression() -> Parser[ast.Expression]:
         consume('if')
-        condition = parse_assignment()
+        condition = yield parse_assignment()
         consume('then')
-        then_branch = parse_assignment()
+        then_branch = yield parse_assignment()
         
         # optional else branch
         else_branch = None
         if peek().text == 'else':
             consume('else')
-            else_branch = parse_assignment()
+            else_branch = yield parse_assignment()
         
         return ast.IfExpression(condition.location, condition, then_branch, else_branch)
 
-    def parse_block() -> ast.Block:
+    def parse_block() -> Parser[ast.Block]:
         """Parse a block: { statement; statement; ... }"""
         block_location = peek().location
         consume('{')
@@ -105,7 +108,7 @@ def parse(tokens: list[Token]) -> ast.Expression:
         last_was_compound = True  
         
         while peek().text != '}':
-            stmt = parse_statement()
+            stmt = yield parse_statement()
             statements.append(stmt)
             is_compound = isinstance(stmt, (
                 ast.IfExpression,
@@ -131,14 +134,14 @@ def parse(tokens: list[Token]) -> ast.Expression:
         consume('}')
         return ast.Block(block_location, statements)
 
-    def parse_statement() -> ast.Expression:
+    def parse_statement() -> Parser[ast.Expression]:
         """Parse a statement, which can be a variable declaration or an expression."""
         if peek().text == 'var':
             return parse_variable_declaration()
         else:
             return parse_assignment()
 
-    def parse_variable_declaration() -> ast.VariableDeclaration:
+    def parse_variable_declaration() -> Parser[ast.VariableDeclaration]:
         """Parse a variable declaration: var name = value"""
         var_location = peek().location
         consume('var')
@@ -150,24 +153,29 @@ def parse(tokens: list[Token]) -> ast.Expression:
         
         consume('=')
         
-        value = parse_assignment()
+        value = yield parse_assignment()
         
         return ast.VariableDeclaration(var_location, variable_name, value)
 
-    def parse_atom() -> ast.Expression:
-        """Parse atomic expressions: literals, identifiers, if, parentheses, unary ops, blocks."""
-        if peek().text in ['-', 'not']:
-            operator_token = consume()
-            operator = operator_token.text
-            operand = parse_atom()  # Right-associative for unary operators
-            return ast.UnaryOp(operator_token.location, operator, operand)
-        
+    def parse_unary() -> Parser[ast.Expression]:
+        """Parse any number of unary operators followed by an atom."""
+        operator_tokens: list[Token] = []
+        while peek().text in ['-', 'not']:
+            operator_tokens.append(consume())
+        expr = yield from parse_atom()
+        # Right-associative for unary operators
+        for operator_token in reversed(operator_tokens):
+            expr = ast.UnaryOp(operator_token.location, operator_token.text, expr)
+        return expr
+
+    def parse_atom() -> Parser[ast.Expression]:
+        """Parse atomic expressions: literals, identifiers, if, parentheses, blocks."""
         if peek().text == '(':
-            return parse_parenthesized()
+            return (yield from parse_parenthesized())
         elif peek().text == '{':
-            return parse_block()
+            return (yield from parse_block())
         elif peek().text == 'if':
-            return parse_if_expression()
+            return (yield from parse_if_expression())
         elif peek().type == 'int_literal':
             return parse_int_literal()
         elif peek().type == 'bool_literal':
@@ -176,7 +184,7 @@ def parse(tokens: list[Token]) -> ast.Expression:
             identifier = parse_identifier()
             #function call
             if peek().text == '(':
-                return parse_function_call(identifier)
+                return (yield from parse_function_call(identifier))
             return identifier
         else:
             raise Exception(f'{peek().location}: expected "(", "if", an integer literal, an identifier, a block, or a unary operator')
@@ -191,51 +199,67 @@ def parse(tokens: list[Token]) -> ast.Expression:
         ['*', '/', '%'],
     ]
 
-    def parse_binary_op_level(level: int) -> ast.Expression:
-        if level >= len(left_associative_binary_operators):
-            return parse_atom()
-        
-        left = parse_binary_op_level(level + 1)
-        
-        operators_at_this_level = left_associative_binary_operators[level]
-        
-        #right-associative =
-        if operators_at_this_level == ['=']:
-            while peek().text == '=':
-                operator_token = consume()
-                operator = operator_token.text
-                right = parse_binary_op_level(level)
-                # Extract the variable name from the left Identifier
-                if isinstance(left, ast.Identifier):
-                    variable_name = left.name
-                else:
-                    raise Exception(f'{operator_token.location}: left side of assignment must be an identifier')
-                left = ast.Assignment(
-                    operator_token.location,
-                    left,
-                    right
-                )
+    # Binding power of each binary operator is its level in the table above.
+    # An operator on the operator stack is applied before pushing a new one
+    # if its binding power is at least 'reduce_threshold' of the new one:
+    # equal power for left-associative operators, higher for '='.
+    binding_powers: dict[str, int] = {}
+    reduce_thresholds: dict[str, int] = {}
+    for level, operators_at_this_level in enumerate(left_associative_binary_operators):
+        for operator in operators_at_this_level:
+            binding_powers[operator] = level
+            reduce_thresholds[operator] = level + 1 if operator == '=' else level
+
+    def apply_operator(operands: list[ast.Expression], operator_token: Token) -> None:
+        """Replace the top two operands with the binary operation on them."""
+        right = operands.pop()
+        left = operands.pop()
+        if operator_token.text == '=':
+            # The left side of an assignment must be a variable name
+            if not isinstance(left, ast.Identifier):
+                raise Exception(f'{operator_token.location}: left side of assignment must be an identifier')
+            operands.append(ast.Assignment(operator_token.location, left, right))
         else:
-            # left-associative operators
-            while peek().text in operators_at_this_level:
-                operator_token = consume()
-                operator = operator_token.text
-                right = parse_binary_op_level(level + 1)
-                left = ast.BinaryOp(
-                    operator_token.location,
-                    left,
-                    operator,
-                    right
-                )
-        
-        return left
+            operands.append(ast.BinaryOp(operator_token.location, left, operator_token.text, right))
+
+    def parse_assignment() -> Parser[ast.Expression]:
+        """Entry point for expression parsing.
+
+        Binary operators are parsed by precedence climbing over explicit
+        operand and operator stacks instead of one recursive call per
+        precedence level, so long expressions don't need deep recursion."""
+        operands = [(yield from parse_unary())]
+        operators: list[tuple[Token, int]] = []
+        while (threshold := reduce_thresholds.get(peek().text)) is not None:
+            while operators and operators[-1][1] >= threshold:
+                apply_operator(operands, operators.pop()[0])
+            operator_token = consume()
+            operators.append((operator_token, binding_powers[operator_token.text]))
+            operands.append((yield from parse_unary()))
+        while operators:
+            apply_operator(operands, operators.pop()[0])
+        return operands[0]
+
+    def run(parser: Parser[ast.Expression]) -> ast.Expression:
+        """Run 'parser' to completion, along with every nested parser it
+        yields. The parsers waiting for a nested result are kept on 'stack'
+        instead of the Python call stack."""
+        stack = [parser]
+        result: Any = None
+        while True:
+            try:
+                nested = stack[-1].send(result)
+            except StopIteration as done:
+                stack.pop()
+                if not stack:
+                    return done.value
+                result = done.value
+            else:
+                stack.append(nested)
+                result = None
 
-    def parse_assignment() -> ast.Expression:
-        """Entry point for expression parsing."""
-        return parse_binary_op_level(0)
-    
     # Parse top-level: could be a statement (var decl) or an expression
-    parsed = parse_statement()
+    parsed = run(parse_statement())
     if peek().type != 'end':
         raise Exception(f'{peek().location}: unexpected token "{peek().text}"')
     return parsed
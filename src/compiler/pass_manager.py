@@ -0,0 +1,61 @@
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+from compiler import ir
+from compiler.ir_passes import propagate_copies, prune_unreachable, remove_dead_code, thread_jumps
+
+type IRPass = Callable[[list[ir.Instruction]], list[ir.Instruction]]
+
+
+@dataclass(slots=True)
+class PassStats:
+    """What one run of a pass did."""
+    name: str
+    seconds: float
+    instructions_before: int
+    instructions_after: int
+
+    def __str__(self) -> str:
+        return (f'{self.name:<20} {self.instructions_before:>8} -> {self.instructions_after:<8} '
+                f'{self.seconds * 1000:>8.2f}ms')
+
+
+@dataclass(slots=True)
+class PassManager:
+    """Runs IR passes in order and records statistics for every run.
+
+    With `until_fixpoint`, the whole pipeline is repeated until a round
+    doesn't change the instruction count, or `max_rounds` is reached."""
+    passes: list[IRPass]
+    until_fixpoint: bool = False
+    max_rounds: int = 10
+    stats: list[PassStats] = field(default_factory=list)
+
+    def run(self, instructions: list[ir.Instruction]) -> list[ir.Instruction]:
+        for _ in range(self.max_rounds if self.until_fixpoint else 1):
+            count = len(instructions)
+            for ir_pass in self.passes:
+                before = len(instructions)
+                start = time.perf_counter()
+                instructions = ir_pass(instructions)
+                seconds = time.perf_counter() - start
+                self.stats.append(PassStats(ir_pass.__name__, seconds, before, len(instructions)))
+            if len(instructions) == count:
+                break
+        return instructions
+
+
+# The passes of each optimization level. -O0 leaves the IR as it is.
+optimization_levels: dict[int, list[IRPass]] = {
+    0: [],
+    1: [propagate_copies, remove_dead_code],
+    2: [thread_jumps, prune_unreachable, propagate_copies, remove_dead_code],
+}
+
+
+def pass_manager_for_level(level: int) -> PassManager:
+    """A pass manager for `-O<level>`. -O2 repeats its passes until they
+    find nothing more to do."""
+    if level not in optimization_levels:
+        raise ValueError(f"Unknown optimization level: {level}")
+    return PassManager(list(optimization_levels[level]), until_fixpoint=level >= 2)
@@ -0,0 +1,124 @@
+import heapq
+from dataclasses import dataclass, field
+from typing import Sequence
+from compiler import ir
+from compiler.cfg import CFG, build_cfg, liveness
+from compiler.ir import IRVar
+from compiler.ir_passes import destination, uses
+
+
+@dataclass(slots=True)
+class Interval:
+    """The instructions from `start` to `end` (inclusive) during which a
+    variable may hold a value that is still needed. Positions are
+    indices in the instruction list."""
+    var: IRVar
+    start: int
+    end: int
+
+
+@dataclass(slots=True)
+class Allocation:
+    """Where each IR variable lives: in a register or in a stack slot.
+    Variables whose intervals don't overlap can share a location."""
+    registers: dict[IRVar, str] = field(default_factory=dict)
+    stack_slots: dict[IRVar, int] = field(default_factory=dict)
+    # The number of stack slots needed, versus one slot per variable
+    slot_count: int = 0
+    naive_slot_count: int = 0
+
+    def location(self, var: IRVar) -> str | int:
+        """The register name or stack slot index of `var`."""
+        if var in self.registers:
+            return self.registers[var]
+        return self.stack_slots[var]
+
+
+def live_intervals(cfg: CFG) -> list[Interval]:
+    """One interval per variable, sorted by start. An interval covers
+    every block where the variable is live, so it may include holes."""
+    live = liveness(cfg)
+    intervals: dict[IRVar, Interval] = {}
+
+    def extend(var: IRVar, position: int) -> None:
+        interval = intervals.get(var)
+        if interval is None:
+            intervals[var] = Interval(var, position, position)
+        elif position < interval.start:
+            interval.start = position
+        elif position > interval.end:
+            interval.end = position
+
+    position = 0
+    for block in cfg.blocks:
+        block_start = position
+        for insn in block.instructions:
+            for var in uses(insn):
+                extend(var, position)
+            dest = destination(insn)
+            if dest is not None:
+                extend(dest, position)
+            position += 1
+        block_end = max(position - 1, block_start)
+        for var in live.live_variables(live.live_in[block.index]):
+            extend(var, block_start)
+        for var in live.live_variables(live.live_out[block.index]):
+            extend(var, block_end)
+    return sorted(intervals.values(), key=lambda interval: interval.start)
+
+
+def allocate(instructions: list[ir.Instruction], registers: Sequence[str] = ()) -> Allocation:
+    """Assign variables to `registers` and reused stack slots by linear scan.
+
+    Intervals are visited in order of start, and those that have ended
+    free their location. When all registers are taken, the interval that
+    ends last goes to the stack, since it would keep a register the
+    longest. The variables on the stack then get slots in a second scan,
+    so `slot_count` is the peak number of them live at once.
+    """
+    allocation = Allocation()
+    intervals = live_intervals(build_cfg(instructions))
+    allocation.naive_slot_count = len(intervals)
+
+    # A location is only reused after the last instruction that reads it,
+    # so an instruction never writes a location that it also reads.
+    free_registers = list(reversed(registers))
+    # (end, position in `intervals`) of the intervals in registers
+    active: list[tuple[int, int]] = []
+    on_stack = [False] * len(intervals)
+    for i, interval in enumerate(intervals):
+        while active and active[0][0] < interval.start:
+            _, ended = heapq.heappop(active)
+            free_registers.append(allocation.registers[intervals[ended].var])
+        if free_registers:
+            allocation.registers[interval.var] = free_registers.pop()
+            heapq.heappush(active, (interval.end, i))
+            continue
+        # The interval that ends last, either an active one or this one
+        last = max(active, default=None)
+        if last is not None and last[0] > interval.end:
+            active.remove(last)
+            heapq.heapify(active)
+            spilled = intervals[last[1]]
+            allocation.registers[interval.var] = allocation.registers.pop(spilled.var)
+            heapq.heappush(active, (interval.end, i))
+            on_stack[last[1]] = True
+        else:
+            on_stack[i] = True
+
+    free_slots: list[int] = []
+    # (end, slot) of the intervals on the stack
+    active_slots: list[tuple[int, int]] = []
+    for i, interval in enumerate(intervals):
+        if not on_stack[i]:
+            continue
+        while active_slots and active_slots[0][0] < interval.start:
+            free_slots.append(heapq.heappop(active_slots)[1])
+        if free_slots:
+            slot = free_slots.pop()
+        else:
+            slot = allocation.slot_count
+            allocation.slot_count += 1
+        allocation.stack_slots[interval.var] = slot
+        heapq.heappush(active_slots, (interval.end, slot))
+    return allocation
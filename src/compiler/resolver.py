@@ -0,0 +1,72 @@
+from compiler import ast
+
+
+def resolve(node: ast.Expression) -> int:
+    """Assign a frame slot to every variable and return the frame size.
+
+    Each VariableDeclaration gets a slot of its own, so a shadowing
+    declaration never overwrites the variable it hides. Identifiers get
+    the slot of the declaration they refer to, or -1 if no enclosing
+    declaration has their name (such names are globals, like built-in
+    functions). All slots of the program live in one flat frame, so a
+    block needs no storage of its own.
+    """
+    frame_size = 0
+    # The slots of the visible declarations of each name, innermost last.
+    # Unlike a chain of scopes, lookups don't get slower with nesting.
+    visible: dict[str, list[int]] = {}
+
+    def resolve_node(node: ast.Expression, declared: list[str]) -> None:
+        """`declared` collects the names declared in the current block."""
+        nonlocal frame_size
+        match node:
+            case ast.Literal():
+                pass
+
+            case ast.Identifier():
+                slots = visible.get(node.name)
+                node.slot = slots[-1] if slots else -1
+
+            case ast.BinaryOp():
+                resolve_node(node.left, declared)
+                resolve_node(node.right, declared)
+
+            case ast.UnaryOp():
+                resolve_node(node.operand, declared)
+
+            case ast.IfExpression():
+                resolve_node(node.condition, declared)
+                resolve_node(node.then_branch, declared)
+                if node.else_branch is not None:
+                    resolve_node(node.else_branch, declared)
+
+            case ast.FunctionCall():
+                resolve_node(node.function, declared)
+                for argument in node.arguments:
+                    resolve_node(argument, declared)
+
+            case ast.VariableDeclaration():
+                # The value is resolved before the new variable is in scope,
+                # so 'var x = x + 1' refers to an outer 'x'
+                resolve_node(node.value, declared)
+                node.slot = frame_size
+                frame_size += 1
+                visible.setdefault(node.name, []).append(node.slot)
+                declared.append(node.name)
+
+            case ast.Block():
+                block_declared: list[str] = []
+                for statement in node.statements:
+                    resolve_node(statement, block_declared)
+                for name in block_declared:
+                    visible[name].pop()
+
+            case ast.Assignment():
+                resolve_node(node.value, declared)
+                resolve_node(node.name, declared)
+
+            case _:
+                raise ValueError(f"Unknown node type: {type(node)}")
+
+    resolve_node(node, [])
+    return frame_size
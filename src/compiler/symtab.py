@@ -67,6 +67,10 @@ def create_global_symtab() -> SymTab:
     symtab.define("*", lambda a, b: a * b)
     symtab.define("/", lambda a, b: a / b)
     symtab.define("%", lambda a, b: a % b)
+
+    # Built-in unary operators
+    symtab.define("unary_-", lambda a: -a)
+    symtab.define("unary_not", lambda a: not a)
     
     return symtab
 
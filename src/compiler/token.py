@@ -1,8 +1,24 @@
-from dataclasses import dataclass
-from .token_location import Location
+from .token_location import Location, unpack_location
 
-@dataclass
 class Token:
-    text: str
-    type: str
-    location: Location
\ No newline at end of file
+    """A token with its location packed into an int (see `pack_location()`).
+    The Location object is only created when `location` is read, e.g. for
+    an error message."""
+    __slots__ = ('text', 'type', 'packed_location')
+
+    def __init__(self, text: str, type: str, location: Location | int):
+        self.text = text
+        self.type = type
+        self.packed_location = location if isinstance(location, int) else location.pack()
+
+    @property
+    def location(self) -> Location:
+        return unpack_location(self.packed_location)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Token):
+            return NotImplemented
+        return self.text == other.text and self.type == other.type and self.location == other.location
+
+    def __repr__(self) -> str:
+        return f'Token(text={self.text!r}, type={self.type!r}, location={self.location!r})'
@@ -0,0 +1,95 @@
+from array import array
+from typing import Iterator
+from .token_location import Location
+from .tokenizer import scan_locations, skipped_types, token_patterns
+
+# Token types that can be stored in a buffer. A token's kind id is its
+# index in this list.
+token_kinds = [name for name, _ in token_patterns if name not in skipped_types]
+kind_ids = {name: i for i, name in enumerate(token_kinds)}
+
+
+class TokenBuffer:
+    """All tokens of one source code, stored column-wise.
+
+    Instead of a Token and a Location object per token, the buffer keeps one
+    `array('i')` per field. Token text is not stored at all: it is sliced
+    from the shared source when asked for."""
+
+    def __init__(
+        self,
+        source: str,
+        kinds: array,
+        starts: array,
+        ends: array,
+        rows: array,
+        columns: array,
+    ):
+        self.source = source
+        self.kinds = kinds
+        self.starts = starts
+        self.ends = ends
+        self.rows = rows
+        self.columns = columns
+
+    @classmethod
+    def from_source(cls, source: str) -> 'TokenBuffer':
+        """Tokenizes `source` into a new buffer."""
+        buffer = cls(source, array('i'), array('i'), array('i'), array('i'), array('i'))
+        for token_type, start, end, row, column in scan_locations(source):
+            buffer.kinds.append(kind_ids[token_type])
+            buffer.starts.append(start)
+            buffer.ends.append(end)
+            buffer.rows.append(row)
+            buffer.columns.append(column)
+        return buffer
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getitem__(self, index: int) -> 'TokenView':
+        if index < 0:
+            index += len(self.kinds)
+        if not 0 <= index < len(self.kinds):
+            raise IndexError('token index out of range')
+        return TokenView(self, index)
+
+    def __iter__(self) -> Iterator['TokenView']:
+        for index in range(len(self.kinds)):
+            yield TokenView(self, index)
+
+
+class TokenView:
+    """One token of a TokenBuffer.
+
+    Has the same `text`, `type` and `location` attributes as a Token,
+    so it can be given to the parser in place of one."""
+    __slots__ = ('buffer', 'index')
+
+    def __init__(self, buffer: TokenBuffer, index: int):
+        self.buffer = buffer
+        self.index = index
+
+    @property
+    def text(self) -> str:
+        buffer = self.buffer
+        return buffer.source[buffer.starts[self.index]:buffer.ends[self.index]]
+
+    @property
+    def type(self) -> str:
+        return token_kinds[self.buffer.kinds[self.index]]
+
+    @property
+    def location(self) -> Location:
+        return Location(self.buffer.rows[self.index], self.buffer.columns[self.index])
+
+    def __eq__(self, other: object) -> bool:
+        try:
+            return (self.text == other.text  # type: ignore[attr-defined]
+                    and self.type == other.type  # type: ignore[attr-defined]
+                    and self.location == other.location)  # type: ignore[attr-defined]
+        except AttributeError:
+            return NotImplemented
+
+    def __repr__(self) -> str:
+        return f'TokenView(text={self.text!r}, type={self.type!r}, location={self.location!r})'
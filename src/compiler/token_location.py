@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(slots=True)
 class Location:
     row: int
     column: int
@@ -17,3 +17,15 @@ class Location:
         elif self.dummy or value.dummy:
             return True
         return False
+
+    def pack(self) -> int:
+        return pack_location(self.row, self.column, self.dummy)
+
+
+# Tokens store their location packed into a single int:
+# row in the high bits, then 31 bits of column, then the dummy flag.
+def pack_location(row: int, column: int, dummy: bool = False) -> int:
+    return (row << 32) | (column << 1) | dummy
+
+def unpack_location(packed: int) -> Location:
+    return Location(packed >> 32, (packed >> 1) & 0x7FFFFFFF, bool(packed & 1))
@@ -0,0 +1,45 @@
+from collections import deque
+from typing import Iterable
+from .token import Token
+from .token_location import Location
+
+
+class TokenStream:
+    """Pulls tokens lazily from any iterable of tokens.
+
+    At most `lookahead` tokens are buffered at a time, so a parser reading
+    from `iter_tokens()` never holds the whole token list in memory."""
+
+    def __init__(self, tokens: Iterable[Token], lookahead: int = 2):
+        self.tokens = iter(tokens)
+        self.lookahead = lookahead
+        self.buffer: deque[Token] = deque()
+        self.last_location = Location(1, 1)
+        self.exhausted = False
+
+    def peek(self, offset: int = 0) -> Token:
+        """Returns the token `offset` positions ahead without consuming it,
+        or a special 'end' token if the input ends before that."""
+        if offset >= self.lookahead:
+            raise ValueError(f'cannot look {offset} tokens ahead (lookahead is {self.lookahead})')
+        while len(self.buffer) <= offset and not self.exhausted:
+            token = next(self.tokens, None)
+            if token is None:
+                self.exhausted = True
+            else:
+                self.buffer.append(token)
+                self.last_location = token.location
+        if offset < len(self.buffer):
+            return self.buffer[offset]
+        return Token(
+            location=self.last_location,
+            type="end",
+            text="",
+        )
+
+    def consume(self) -> Token:
+        """Returns the next token and advances past it."""
+        token = self.peek()
+        if self.buffer:
+            self.buffer.popleft()
+        return token
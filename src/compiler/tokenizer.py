@@ -1,97 +1,92 @@
 import re
+from bisect import bisect_right
+from typing import Iterator
 from .token import Token
-from .token_location import Location
-
-def tokenize(source_code: str) -> list[str]:
-    identifier_regrex = r'[a-zA-Z_][a-zA-Z_0-9]*'
-    integer_regrex = r'[0-9]+'
-    bool_literal = r'(True)|(False)'
-    operator_regrex = r'==|!=|<=|>=|[+\-*/%=<>]'
-    punctuation_regrex = r'[(){},;]'
-    whitespace_regrex = r'\s+'
-    comment_regrex = r'//[^\n]*|#[^\n]*'
-    multiline_comment_regrex = r'/\*[\s\S]*?\*/'
-    tokens: list = []
-    i = 0
-    row = 1
-    column = 1
-    while i < len(source_code):
-        current_token = re.match(bool_literal, source_code[i:])
-        if current_token:
-            loc = Location(row, column)
-            token = Token(current_token.group(), "bool_literal", loc)
-            tokens.append(token)
-            i += len(current_token.group())
-            column += len(current_token.group())
-            continue
-        current_token = re.match(identifier_regrex, source_code[i:])
-        if current_token:
-            loc = Location(row, column)
-            token = Token(current_token.group(), "identifier", loc)
-            tokens.append(token)
-            i += len(current_token.group())
-            column += len(current_token.group())
-            continue
-        current_token = re.match(integer_regrex, source_code[i:])
-        if current_token:
-            loc = Location(row, column)
-            token = Token(current_token.group(), "int_literal", loc)
-            tokens.append(token)
-            i += len(current_token.group())
-            column += len(current_token.group())
-            continue
-        current_token = re.match(multiline_comment_regrex, source_code[i:])
-        if current_token:
-            for char in current_token.group():
-                if char == '\n':
-                    row += 1
-                    column = 1
-                else:
-                    column += 1
-            i += len(current_token.group())
-        current_token = re.match(comment_regrex, source_code[i:])
-        if current_token:
-            i += len(current_token.group())
-            column += len(current_token.group())
-            continue
-        current_token = re.match(operator_regrex, source_code[i:])
-        if current_token:
-            loc= Location(row, column)
-            token= Token(current_token.group(), "operator", loc)
-            tokens.append(token)
-            i += len(current_token.group())
-            column += len(current_token.group())
-            continue
-        current_token = re.match(punctuation_regrex, source_code[i:])
-        if current_token:
-            loc = Location(row, column)
-            token= Token(current_token.group(), "punctuation", loc)
-            tokens.append(token)
-            i += len(current_token.group())
-            column += len(current_token.group())
-            continue
-        current_token = re.match(whitespace_regrex, source_code[i:])
-        if current_token:
-            i += len(current_token.group())
-            for char in current_token.group():
-                if char == '\n':
-                    row += 1
-                    column = 1
-                else:
-                    column += 1
-            continue
-        current_token = re.match(comment_regrex, source_code[i:])
-        if current_token:
-            i += len(current_token.group())
-            for char in current_token.group():
-                if char == '\n':
-                    row += 1
-            column = 1
-            continue
-    i += 1
-    return tokens
-
-    
-    
-
-"pytest path/to/test_file.py::test_function_name"
\ No newline at end of file
+from .token_location import Location, pack_location
+
+# Token patterns in priority order: at every position the first alternative
+# that matches wins, so e.g. `True` is a bool literal and not an identifier.
+token_patterns = [
+    ('bool_literal', r'True|False'),
+    ('identifier', r'[a-zA-Z_][a-zA-Z_0-9]*'),
+    ('int_literal', r'[0-9]+'),
+    ('multiline_comment', r'/\*[\s\S]*?\*/'),
+    ('comment', r'//[^\n]*|#[^\n]*'),
+    ('operator', r'==|!=|<=|>=|[+\-*/%=<>]'),
+    ('punctuation', r'[(){},;]'),
+    ('whitespace', r'\s+'),
+]
+
+# All patterns combined into one regex with a named group per token type,
+# compiled once so that scanning is a single pass over the source.
+token_regex = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in token_patterns))
+
+# Token types that are matched but not returned.
+skipped_types = {'multiline_comment', 'comment', 'whitespace'}
+
+
+def line_starts(source_code: str) -> list[int]:
+    """Returns the offset of the first character of every line."""
+    return [0] + [m.end() for m in re.finditer('\n', source_code)]
+
+
+def location_at(starts: list[int], pos: int) -> Location:
+    """Converts an offset into a 1-based row and column using `line_starts()`."""
+    row = bisect_right(starts, pos)
+    return Location(row, pos - starts[row - 1] + 1)
+
+
+def scan(source_code: str, pos: int = 0) -> Iterator[tuple[str, int, int]]:
+    """Yields (type, start, end) for every token that is not skipped,
+    starting from offset `pos`."""
+    for m in token_regex.finditer(source_code, pos):
+        if m.start() != pos:
+            break
+        pos = m.end()
+        token_type = m.lastgroup
+        if token_type not in skipped_types:
+            yield token_type, m.start(), pos  # type: ignore[misc]
+    if pos < len(source_code):
+        loc = location_at(line_starts(source_code), pos)
+        raise Exception(f'{loc}: unexpected character "{source_code[pos]}"')
+
+
+def scan_locations(
+    source_code: str,
+    pos: int = 0,
+    row: int = 1,
+    line_start: int = 0,
+) -> Iterator[tuple[str, int, int, int, int]]:
+    """Like `scan()`, but also yields the row and column of every token.
+    When starting in the middle of the source, `row` and `line_start`
+    must describe the line that `pos` is on.
+
+    Rows are tracked by counting the newlines between consecutive tokens,
+    so apart from the source itself this needs constant memory."""
+    prev_end = pos
+    for token_type, start, end in scan(source_code, pos):
+        newlines = source_code.count('\n', prev_end, start)
+        if newlines:
+            row += newlines
+            line_start = source_code.rfind('\n', prev_end, start) + 1
+        prev_end = end
+        yield token_type, start, end, row, start - line_start + 1
+
+
+def iter_tokens(source_code: str, names: dict[str, str] | None = None) -> Iterator[Token]:
+    """Yields tokens one at a time as they are scanned.
+
+    Identifier texts are interned in `names`, so every occurrence of the
+    same name shares one string. Pass the same dict to every call that
+    belongs to one compilation; by default each call gets a new one."""
+    if names is None:
+        names = {}
+    for token_type, start, end, row, column in scan_locations(source_code):
+        text = source_code[start:end]
+        if token_type == 'identifier':
+            text = names.setdefault(text, text)
+        yield Token(text, token_type, pack_location(row, column))
+
+
+def tokenize(source_code: str, names: dict[str, str] | None = None) -> list[Token]:
+    return list(iter_tokens(source_code, names))
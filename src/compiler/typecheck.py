@@ -1,6 +1,8 @@
 import compiler.ast as ast
-from compiler.types import Type, Bool, Int, Unit
-from compiler.symtab import TypeSymTab, create_global_symtab
+from compiler.flat_ast import FlatAST, Kind
+from compiler.token_location import Location
+from compiler.types import Type, FunType, Bool, Int, Unit
+from compiler.symtab import SymTable, TypeSymTab, create_global_symtab
 
 def is_integer(num):
     return isinstance(num, int)
@@ -11,9 +13,62 @@ def is_boolean(a):
 def create_global_type_symtab() -> TypeSymTab:
     """Create a global symbol table with built-in types for operators."""
     symtab = TypeSymTab()
+    symtab.define('print_int', FunType([Int], Unit))
+    symtab.define('print_bool', FunType([Bool], Unit))
     return symtab
 
-def typecheck(node: ast.Expression, symtab: TypeSymTab | None = None) -> Type:
+def binary_op_type(op: str, t1: Type, t2: Type, location: Location) -> Type:
+    """Returns the result type of `t1 op t2`, or raises if the operands are wrong."""
+    if op in ['+', '-', '*', '/', '%']:
+        if t1 is not Int or t2 is not Int:
+            raise Exception(f'{location}: {op} expected Integers, instead got {t1} and {t2} ')
+        return Int
+    elif op in ['<', '>', '<=', '>=']:
+        if t1 is not Int or t2 is not Int:
+            raise Exception(f'{location}: {op} expected Integers, instead got {t1.type} and {t2.type} ')
+        return Bool
+    elif op in ['==', '!=']:
+        if t1 != t2:
+            raise Exception(f'{location}: {op} expected same types, instead got {t1.type} and {t2.type} ')
+        return Bool
+    elif op in ['and', 'or']:
+        if t1 is not Bool or t2 is not Bool:
+            raise Exception(f'{location}: {op} expected Booleans, instead got {t1.type} and {t2.type} ')
+        return Bool
+    else:
+        raise Exception(f'{location}: unknown op {op}')
+
+def unary_op_type(op: str, t1: Type, location: Location) -> Type:
+    """Returns the result type of `op t1`, or raises if the operand is wrong."""
+    if op not in ['-', 'not']:
+        raise Exception(f'{location}: unknown unary operator: {op}')
+    elif op == '-':
+        #int int
+        if t1 != Int:
+            raise Exception(f'{location}: the operand needs to be Int: {t1}')
+        return Int
+    else:
+        if t1 != Bool:
+            raise Exception(f'{location}: the operand needs to be Bool: {t1}')
+        return Bool
+
+def function_call_type(name: str, symtab: SymTable[Type], argument_types: list[Type], location: Location) -> Type:
+    """Returns the result type of calling the function `name` with
+    arguments of `argument_types`, or raises if the call is wrong."""
+    try:
+        t = symtab.lookup(name)
+    except NameError:
+        raise Exception(f'{location}: undefined function {name}')
+    if not isinstance(t, FunType):
+        raise Exception(f'{location}: {name} is not a function')
+    if len(argument_types) != len(t.parameters):
+        raise Exception(f'{location}: {name} expected {len(t.parameters)} arguments, got {len(argument_types)}')
+    for i, (parameter, argument) in enumerate(zip(t.parameters, argument_types)):
+        if parameter != argument:
+            raise Exception(f'{location}: argument {i + 1} of {name} must be {parameter.type}, got {argument.type}')
+    return t.returntype
+
+def typecheck(node: ast.Expression, symtab: SymTable[Type] | None = None) -> Type:
     """Typecheck an AST node and return its type."""
     if symtab is None:
         symtab = create_global_type_symtab()
@@ -21,28 +76,8 @@ def typecheck(node: ast.Expression, symtab: TypeSymTab | None = None) -> Type:
         case ast.BinaryOp():
             t1 = typecheck(node.left, symtab)
             t2 = typecheck(node.right, symtab)
-            if node.op in ['+', '-', '*', '/', '%']:
-                if t1 is not Int or t2 is not Int:
-                    raise Exception(f'{node.location}: {node.op} expected Integers, instead got {t1} and {t2} ')
-                node.type = Int
-                return Int
-            elif node.op in ['<', '>', '<=', '>=']:
-                if t1 is not Int or t2 is not Int:
-                    raise Exception(f'{node.location}: {node.op} expected Integers, instead got {t1.type} and {t2.type} ')
-                node.type = Bool
-                return Bool
-            elif node.op in ['==', '!=']:
-                if t1 != t2:
-                    raise Exception(f'{node.location}: {node.op} expected same types, instead got {t1.type} and {t2.type} ')
-                node.type = Bool
-                return Bool
-            elif node.op in ['and', 'or']:
-                if t1 is not Bool or t2 is not Bool:
-                    raise Exception(f'{node.location}: {node.op} expected Booleans, instead got {t1.type} and {t2.type} ')
-                node.type = Bool
-                return Bool
-            else:
-                raise Exception(f'{node.location}: unknown op {node.op}')
+            node.type = binary_op_type(node.op, t1, t2, node.location)
+            return node.type
         
         case ast.Identifier():
             # Look up variable type in the symbol table
@@ -95,22 +130,15 @@ def typecheck(node: ast.Expression, symtab: TypeSymTab | None = None) -> Type:
         
         case ast.UnaryOp():
             t1 = typecheck(node.operand, symtab)
-            if node.op not in ['-', 'not']:
-                raise Exception(f'{node.location}: unknown unary operator: {node.op}')
-            elif node.op == '-':
-                #int int
-                if t1 != Int:
-                    raise Exception(f'{node.location}: the operand needs to be Int: {t1}')
-                node.type = Int
-                return Int
-            elif node.op == 'not':
-                if t1 != Bool:
-                    raise Exception(f'{node.location}: the operand needs to be Bool: {t1}')
-                node.type = Bool
-                return Bool 
+            node.type = unary_op_type(node.op, t1, node.location)
+            return node.type
         
         case ast.FunctionCall():
-            ...
+            if not isinstance(node.function, ast.Identifier):
+                raise Exception(f'{node.location}: only named functions can be called')
+            argument_types = [typecheck(argument, symtab) for argument in node.arguments]
+            node.type = function_call_type(node.function.name, symtab, argument_types, node.location)
+            return node.type
 
         case ast.Assignment():
             value = node.value
@@ -124,3 +152,99 @@ def typecheck(node: ast.Expression, symtab: TypeSymTab | None = None) -> Type:
         case _:
             raise Exception(f'{node.location}: unknown node type: {type(node)}')
 
+def typecheck_flat(flat: FlatAST, node: int | None = None, symtab: SymTable[Type] | None = None) -> Type:
+    """Typecheck the FlatAST node with id `node` (the root by default) and
+    return its type. Works like `typecheck()`, but stores the types of the
+    nodes in `flat.types`.
+
+    The tree is walked with an explicit stack, so any depth is supported.
+    A node is checked after its children, from their types in `flat.types`."""
+    if node is None:
+        node = len(flat) - 1
+    if symtab is None:
+        symtab = create_global_type_symtab()
+
+    def child_type(node: int, index: int) -> Type:
+        t = flat.type(flat.child(node, index))
+        assert t is not None
+        return t
+
+    # Each entry is a node, the scope it is in, and the scope of its
+    # children, which is new for a block. `next_child` has the index of
+    # the next child to check of each entry.
+    stack: list[tuple[int, SymTable[Type], SymTable[Type]]] = [
+        (node, symtab, symtab.create_child() if flat.kinds[node] == Kind.BLOCK else symtab)
+    ]
+    # The function of a call is not checked as an expression
+    next_child = [1 if flat.kinds[node] == Kind.FUNCTION_CALL else 0]
+    while stack:
+        current, scope, child_scope = stack[-1]
+        kind = flat.kinds[current]
+        index = next_child[-1]
+        if index < flat.child_count[current]:
+            if kind == Kind.IF_EXPRESSION and index == 1 and child_type(current, 0) != Bool:
+                raise Exception(f'{flat.location(current)}: if condition must be Bool, got {child_type(current, 0).type}')
+            next_child[-1] = index + 1
+            child = flat.child(current, index)
+            child_kind = flat.kinds[child]
+            stack.append((child, child_scope, child_scope.create_child() if child_kind == Kind.BLOCK else child_scope))
+            next_child.append(1 if child_kind == Kind.FUNCTION_CALL else 0)
+            continue
+        stack.pop()
+        next_child.pop()
+
+        match kind:
+            case Kind.BINARY_OP:
+                t = binary_op_type(flat.operator(current), child_type(current, 0), child_type(current, 1),
+                                   flat.location(current))
+
+            case Kind.IDENTIFIER:
+                try:
+                    t = scope.lookup(flat.name(current))
+                except NameError:
+                    raise Exception(f'{flat.location(current)}: undefined variable {flat.name(current)}')
+
+            case Kind.INT_LITERAL:
+                t = Int
+
+            case Kind.BOOL_LITERAL:
+                t = Bool
+
+            case Kind.IF_EXPRESSION:
+                t = child_type(current, 1)
+                t3 = child_type(current, 2) if flat.child_count[current] > 2 else Unit
+                if t != t3:
+                    raise Exception(f'{flat.location(current)}: then and else branches have different types: {t.type} vs {t3.type}')
+
+            case Kind.VARIABLE_DECLARATION:
+                t = child_type(current, 0)
+                scope.define(flat.name(current), t)
+
+            case Kind.BLOCK:
+                count = flat.child_count[current]
+                t = child_type(current, count - 1) if count > 0 else Unit
+
+            case Kind.UNARY_OP:
+                t = unary_op_type(flat.operator(current), child_type(current, 0), flat.location(current))
+
+            case Kind.FUNCTION_CALL:
+                function = flat.child(current, 0)
+                if flat.kinds[function] != Kind.IDENTIFIER:
+                    raise Exception(f'{flat.location(current)}: only named functions can be called')
+                argument_types = [child_type(current, i) for i in range(1, flat.child_count[current])]
+                t = function_call_type(flat.name(function), scope, argument_types, flat.location(current))
+
+            case Kind.ASSIGNMENT:
+                variable_type = child_type(current, 0)
+                value_type = child_type(current, 1)
+                if variable_type != value_type:
+                    raise Exception(f'{flat.location(current)}: the assigned value ({value_type}) must have the same type as the variable ({variable_type}) ')
+                t = variable_type
+
+            case kind:
+                raise Exception(f'{flat.location(current)}: unknown node kind: {kind}')
+
+        flat.set_type(current, t)
+    result = flat.type(node)
+    assert result is not None
+    return result
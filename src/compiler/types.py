@@ -6,12 +6,19 @@ class Type:
     type: str
 
 @dataclass
-class FunType:
-    parameters: (Type)
+class FunType(Type):
+    """The type of a function. Functions are looked up in the same symbol
+    table as variables, so this is a Type too."""
+    parameters: list[Type]
     returntype: Type
-    
+
+    def __init__(self, parameters: list[Type], returntype: Type) -> None:
+        self.type = 'Function'
+        self.parameters = parameters
+        self.returntype = returntype
+
     def __repr__(self) -> str:
-        return "Unit"
+        return f"({', '.join(p.type for p in self.parameters)}) => {self.returntype.type}"
 
 
 # Primitive type singletons
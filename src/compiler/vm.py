@@ -0,0 +1,119 @@
+from typing import Any
+from compiler.bytecode import Bytecode, Opcode
+from compiler.symtab import SymTab, create_global_symtab
+
+type Value = int | bool | None
+
+
+def run_bytecode(bytecode: Bytecode, symtab: SymTab | None = None) -> Value:
+    """Evaluate a program compiled by `compile_bytecode()`. Globals are
+    looked up in `symtab` (the global symbol table by default)."""
+    if symtab is None:
+        symtab = create_global_symtab()
+    words = memoryview(bytecode.code).cast('I')
+    constants = bytecode.constants
+    frame: list[Any] = [None] * bytecode.frame_size
+    stack: list[Any] = []
+    push = stack.append
+    pop = stack.pop
+
+    # Opcodes as locals, so the dispatch below compares plain ints
+    LOAD_CONST = Opcode.LOAD_CONST.value
+    LOAD_LOCAL = Opcode.LOAD_LOCAL.value
+    STORE_LOCAL = Opcode.STORE_LOCAL.value
+    LOAD_GLOBAL = Opcode.LOAD_GLOBAL.value
+    STORE_GLOBAL = Opcode.STORE_GLOBAL.value
+    POP = Opcode.POP.value
+    JUMP = Opcode.JUMP.value
+    JUMP_IF_FALSE = Opcode.JUMP_IF_FALSE.value
+    JUMP_IF_FALSE_OR_POP = Opcode.JUMP_IF_FALSE_OR_POP.value
+    JUMP_IF_TRUE_OR_POP = Opcode.JUMP_IF_TRUE_OR_POP.value
+    RETURN = Opcode.RETURN.value
+    ADD = Opcode.ADD.value
+    SUB = Opcode.SUB.value
+    MUL = Opcode.MUL.value
+    DIV = Opcode.DIV.value
+    MOD = Opcode.MOD.value
+    EQ = Opcode.EQ.value
+    NE = Opcode.NE.value
+    LT = Opcode.LT.value
+    LE = Opcode.LE.value
+    GT = Opcode.GT.value
+    GE = Opcode.GE.value
+    NEG = Opcode.NEG.value
+    NOT = Opcode.NOT.value
+
+    pc = 0
+    while True:
+        word = words[pc]
+        op = word & 0xff
+        pc += 1
+        # The most common instructions are checked first
+        if op == LOAD_LOCAL:
+            push(frame[word >> 8])
+        elif op == LOAD_CONST:
+            push(constants[word >> 8])
+        elif op == STORE_LOCAL:
+            frame[word >> 8] = stack[-1]
+        elif op == POP:
+            pop()
+        elif op == ADD:
+            b = pop()
+            stack[-1] = stack[-1] + b
+        elif op == SUB:
+            b = pop()
+            stack[-1] = stack[-1] - b
+        elif op == MUL:
+            b = pop()
+            stack[-1] = stack[-1] * b
+        elif op == JUMP_IF_FALSE:
+            if not pop():
+                pc = word >> 8
+        elif op == JUMP:
+            pc = word >> 8
+        elif op == LT:
+            b = pop()
+            stack[-1] = stack[-1] < b
+        elif op == GT:
+            b = pop()
+            stack[-1] = stack[-1] > b
+        elif op == EQ:
+            b = pop()
+            stack[-1] = stack[-1] == b
+        elif op == NE:
+            b = pop()
+            stack[-1] = stack[-1] != b
+        elif op == LE:
+            b = pop()
+            stack[-1] = stack[-1] <= b
+        elif op == GE:
+            b = pop()
+            stack[-1] = stack[-1] >= b
+        elif op == DIV:
+            b = pop()
+            stack[-1] = stack[-1] / b
+        elif op == MOD:
+            b = pop()
+            stack[-1] = stack[-1] % b
+        elif op == JUMP_IF_FALSE_OR_POP:
+            if stack[-1]:
+                pop()
+            else:
+                pc = word >> 8
+        elif op == JUMP_IF_TRUE_OR_POP:
+            if stack[-1]:
+                pc = word >> 8
+            else:
+                pop()
+        elif op == NEG:
+            stack[-1] = -stack[-1]
+        elif op == NOT:
+            stack[-1] = not stack[-1]
+        elif op == LOAD_GLOBAL:
+            push(symtab.lookup(str(constants[word >> 8])))
+        elif op == STORE_GLOBAL:
+            symtab.set(str(constants[word >> 8]), stack[-1])
+        elif op == RETURN:
+            return pop()
+        else:
+            raise ValueError(f"Unknown opcode {op} at {pc - 1}")
@@ -0,0 +1,75 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import pytest
+from compiler.assembly_generator import generate_assembly
+from compiler.compiler import compile_to_executable, generate_program_ir
+from compiler.instrumentation import CompileReport
+from compiler.ir_interpreter import load_ir, run_ir
+
+pytestmark = pytest.mark.skipif(shutil.which('as') is None or shutil.which('ld') is None,
+                                reason='needs the GNU assembler and linker')
+
+
+def run_executable(executable: bytes) -> list[str]:
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, 'program')
+        with open(path, 'wb') as f:
+            f.write(executable)
+        os.chmod(path, 0o755)
+        result = subprocess.run([path], capture_output=True, text=True, check=True)
+    return result.stdout.splitlines()
+
+
+@pytest.mark.parametrize('optimization_level', [0, 2])
+@pytest.mark.parametrize('source', [
+    '1 + 2 * 3',
+    '{ var x = 0 - 7; print_int(x / 2); print_int(x % 2); print_int(7 / (0 - 2)); x * 3 }',
+    '{ var x = 0 - 9223372036854775807 - 1; print_int(x); print_int(x / (0 - 1)); x % (0 - 1) }',
+    '{ var x = 9223372036854775807; print_int(x + 1); -x }',
+    '{ var x = 1; if x < 2 and not (x == 0) or x > 5 then { x = x + 3 } else { x = x - 1 }; x }',
+    '{ var b = True; var n = 0; if b then if not b then n = 1 else n = 2 else n = 3; n == 2 }',
+    '{ var a = 1; var b = 2; var c = 3; var d = a + b * c; print_bool(d >= 7); d != 7 or a <= b }',
+    '{ var x = 0; { var x = 5; print_int(x) }; x }',
+    '{ var x = 3; var y = 0 - 4; print_bool(x == y); print_bool(x != y); print_bool(x <= y); y > x }',
+    '{ var x = 3; var c = x >= 3; if c then print_int(1) else print_int(2); c }',
+    '{ var x = 3; if x != 3 then print_int(1) else print_int(3); if not (x < 3) then print_int(2) else print_int(4); x % 2 == 1 }',
+])
+def test_executable_prints_the_same_as_ir(source: str, optimization_level: int) -> None:
+    instructions = generate_program_ir(source, optimization_level)
+    expected = run_ir(load_ir(instructions))
+    assert run_executable(compile_to_executable(source, optimization_level)) == expected
+
+def test_operators_are_inline() -> None:
+    assembly = generate_assembly(generate_program_ir('{ var x = 7; var y = x * 2 - x / 3 % 2; -y }', 0))
+    main = assembly[assembly.index('main:'):]
+    assert 'call' not in main.replace('call print_int', '')
+    assert 'imulq' in main and 'idivq' in main and 'negq' in main
+
+def test_fuses_comparison_and_jump() -> None:
+    assembly = generate_assembly(generate_program_ir('{ var x = 1; if x < 2 then print_int(1) else print_int(2) }', 0))
+    main = assembly[assembly.index('main:'):]
+    assert 'setl' not in main
+    assert 'cmpq $0' not in main
+    assert 'jge' in main or 'jl' in main
+
+def test_spills_to_stack() -> None:
+    # More values live at once than there are callee-saved registers
+    names = [f'v{i}' for i in range(12)]
+    source = '{ ' + ''.join(f'var {n} = {i} * 3; ' for i, n in enumerate(names)) + ' + '.join(names) + ' }'
+    assembly = generate_assembly(generate_program_ir(source, 0))
+    assert '(%rbp)' in assembly
+    assert run_executable(compile_to_executable(source, 0)) == [str(sum(i * 3 for i in range(12)))]
+
+def test_reports_stages() -> None:
+    report = CompileReport(trace_memory=True)
+    executable = compile_to_executable('{ var x = 1 + 2; print_int(x) }', report=report)
+    stages = {stage.name: stage for stage in report.stages}
+    assert list(stages) == ['parse', 'typecheck', 'fold constants', 'generate IR', 'optimize IR',
+                            'generate assembly', 'as', 'ld']
+    assert stages['parse'].counts == {'tokens': 13, 'nodes': 8}
+    assert stages['fold constants'].counts == {'nodes': 6}  # 1 + 2 is one literal
+    assert stages['ld'].counts == {'bytes': len(executable)}
+    assert all(stage.peak_memory is not None and stage.wall_seconds > 0 for stage in report.stages)
+    assert stages['as'].cpu_seconds > 0
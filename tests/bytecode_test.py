@@ -0,0 +1,65 @@
+import pytest
+from compiler.bytecode import Opcode, compile_bytecode, disassemble
+from compiler.interpreter import interpret
+from compiler.parser import parse
+from compiler.symtab import create_global_symtab
+from compiler.tokenizer import tokenize
+from compiler.vm import run_bytecode
+
+PROGRAMS = [
+    ('1 + 2 * 3 - 8 / 4 % 3', 5),
+    ('-2 * -(3 + 1)', 8),
+    ('not True or not not False', False),
+    ('1 < 2 and 2 <= 2 and 3 > 2 and 3 >= 4', False),
+    ('1 == 1 and 1 != 2', True),
+    ('{ var x = 1; x = x + 41; x }', 42),
+    ('{ var x = 1; { var x = 2; x = 3 }; x }', 1),
+    ('{ var x = 5; var x = x * 2; x }', 10),
+    ('{ var a = 1; var b = { var a = 10; a + 1 }; a + b }', 12),
+    ('if 1 < 2 then 10 else 20', 10),
+    ('{ var x = 1; if False then { x = 2 }; x }', 1),
+    ('{ var x = 1; if True then { x = 2 }; x }', 2),
+    ('{ var x = 1; if x == 1 then { x = 5 } else { x = 6 }; x }', 5),
+    ('{ var r = False; False and { r = True; True }; r }', False),
+    ('{ var r = False; True and { r = True; True }; r }', True),
+    ('{ var r = False; True or { r = True; True }; r }', False),
+    ('{ var r = False; False or { r = True; True }; r }', True),
+    ('{ }', None),
+]
+
+
+@pytest.mark.parametrize('source, expected', PROGRAMS)
+def test_vm_matches_interpreter(source: str, expected: object) -> None:
+    tree = parse(tokenize(source))
+    assert interpret(tree) == expected
+    assert run_bytecode(compile_bytecode(tree)) == expected
+
+def test_globals() -> None:
+    symtab = create_global_symtab()
+    symtab.define('g', 1)
+    bytecode = compile_bytecode(parse(tokenize('{ g = g + 1; g * 10 }')))
+    assert run_bytecode(bytecode, symtab) == 20
+    assert symtab.lookup('g') == 2
+
+def test_constant_pool_is_deduplicated() -> None:
+    bytecode = compile_bytecode(parse(tokenize('{ 1; True; 1; True; 1 == 1 }')))
+    assert bytecode.constants == [1, True]
+
+def test_disassemble() -> None:
+    bytecode = compile_bytecode(parse(tokenize('{ var x = 1; if x < 2 and True then x else 0 }')))
+    assert [bytecode.instruction(i)[0] for i in range(len(bytecode))][-1] == Opcode.RETURN
+    assert disassemble(bytecode) == '\n'.join([
+        '      0 LOAD_CONST           0 (1)',
+        '      1 STORE_LOCAL          0',
+        '      2 POP',
+        '      3 LOAD_LOCAL           0',
+        '      4 LOAD_CONST           1 (2)',
+        '      5 LT',
+        '      6 JUMP_IF_FALSE_OR_POP 8',
+        '      7 LOAD_CONST           2 (True)',
+        '>>    8 JUMP_IF_FALSE        11',
+        '      9 LOAD_LOCAL           0',
+        '     10 JUMP                 12',
+        '>>   11 LOAD_CONST           3 (0)',
+        '>>   12 RETURN',
+    ])
@@ -0,0 +1,81 @@
+from compiler import ir
+from compiler.cfg import bits, build_cfg, liveness, reaching_definitions
+from compiler.ir import IRVar
+from compiler.token_location import Location
+
+L = Location(0, 0, True) #dummy location
+a, b, c, t = IRVar('a'), IRVar('b'), IRVar('c'), IRVar('t')
+plus, less, print_int = IRVar('+'), IRVar('<'), IRVar('print_int')
+then_label, else_label, end_label = ir.Label(L, 'then'), ir.Label(L, 'else'), ir.Label(L, 'end')
+
+# a = 1; b = 2; if a < b then c = a else c = b; print_int(c + b)
+IF_PROGRAM: list[ir.Instruction] = [
+    ir.LoadIntConst(L, 1, a),
+    ir.LoadIntConst(L, 2, b),
+    ir.Call(L, less, [a, b], t),
+    ir.CondJump(L, t, then_label, else_label),
+    then_label,
+    ir.Copy(L, a, c),
+    ir.Jump(L, end_label),
+    else_label,
+    ir.Copy(L, b, c),
+    end_label,
+    ir.Call(L, plus, [c, b], t),
+    ir.Call(L, print_int, [t], IRVar('x')),
+]
+
+# a = 0; loop: a = a + a; if a < b then loop else end
+LOOP_PROGRAM: list[ir.Instruction] = [
+    ir.LoadIntConst(L, 0, a),
+    then_label,
+    ir.Call(L, plus, [a, a], a),
+    ir.Call(L, less, [a, b], t),
+    ir.CondJump(L, t, then_label, end_label),
+    end_label,
+    ir.Call(L, print_int, [a], IRVar('x')),
+]
+
+
+def test_build_cfg() -> None:
+    cfg = build_cfg(IF_PROGRAM)
+    assert [block.label for block in cfg.blocks] == [None, 'then', 'else', 'end']
+    assert [len(block.instructions) for block in cfg.blocks] == [4, 3, 2, 3]
+    assert [[s.index for s in block.successors] for block in cfg.blocks] == [[1, 2], [3], [3], []]
+    assert [[p.index for p in block.predecessors] for block in cfg.blocks] == [[], [0], [0], [1, 2]]
+    assert cfg.instructions() == IF_PROGRAM
+
+def test_build_cfg_with_loop() -> None:
+    cfg = build_cfg(LOOP_PROGRAM)
+    assert [[s.index for s in block.successors] for block in cfg.blocks] == [[1], [1, 2], []]
+    assert [[p.index for p in block.predecessors] for block in cfg.blocks] == [[], [0, 1], [1]]
+    assert [block.index for block in cfg.reverse_postorder()] == [0, 1, 2]
+
+def test_liveness() -> None:
+    cfg = build_cfg(IF_PROGRAM)
+    result = liveness(cfg)
+    live_in = [result.live_variables(s) for s in result.live_in]
+    live_out = [result.live_variables(s) for s in result.live_out]
+    # `t` is only used in the block that writes it, so it isn't tracked
+    assert live_in == [set(), {a, b}, {b}, {b, c}]
+    assert live_out == [{a, b}, {b, c}, {b, c}, set()]
+
+def test_liveness_with_loop() -> None:
+    result = liveness(build_cfg(LOOP_PROGRAM))
+    assert [result.live_variables(s) for s in result.live_in] == [{b}, {a, b}, {a}]
+    assert [result.live_variables(s) for s in result.live_out] == [{a, b}, {a, b}, set()]
+
+def test_reaching_definitions() -> None:
+    result = reaching_definitions(build_cfg(IF_PROGRAM))
+    def reaching(bitset: int) -> list[tuple[int, int]]:
+        return [result.definitions[i] for i in bits(bitset)]
+    # Both copies to `c` reach the end
+    assert reaching(result.reach_in[3]) == [(0, 0), (0, 1), (1, 1), (2, 1)]
+    assert reaching(result.reach_out[1]) == [(0, 0), (0, 1), (1, 1)]
+
+def test_reaching_definitions_with_loop() -> None:
+    result = reaching_definitions(build_cfg(LOOP_PROGRAM))
+    def reaching(bitset: int) -> list[tuple[int, int]]:
+        return [result.definitions[i] for i in bits(bitset)]
+    # The loop body is reached by the first write of `a` and by its own
+    assert reaching(result.reach_in[1]) == [(0, 0), (1, 1)]
+    assert reaching(result.reach_in[2]) == [(1, 1)]
@@ -0,0 +1,50 @@
+import pytest
+from compiler.closure_compiler import compile_closures
+from compiler.interpreter import interpret
+from compiler.parser import parse
+from compiler.tokenizer import tokenize
+
+PROGRAMS = [
+    ('2+3', 5),
+    ('1 + 2 * 3 - 8 / 4 % 3', 5),
+    ('-2 * -(3 + 1)', 8),
+    ('not True or not not False', False),
+    ('1 < 2 and 2 <= 2 and 3 > 2 and 3 >= 4', False),
+    ('1 == 1 and 1 != 2', True),
+    ('{ var x = 1 + 2 }', 3),
+    ('{ { var x = 1 } }', 1),
+    ('{ var x = 1; x = x + 41; x }', 42),
+    ('{ var x = 1; { var x = 2; x = 3 }; x }', 1),
+    ('{ var x = 1; { x = 2 }; x }', 2),
+    ('{ var x = 5; var x = x * 2; x }', 10),
+    ('{ var a = 1; var b = { var a = 10; a + 1 }; a + b }', 12),
+    ('if 1 < 2 then 10 else 20', 10),
+    ('if False then 10', None),
+    ('if True then if False then 1 else 2 else 3', 2),
+    ('{ var x = 1; if x == 1 then { x = 5 } else { x = 6 }; x }', 5),
+    ('True and True', True),
+    ('True and False', False),
+    ('False and True', False),
+    ('{ var r = False; False and { r = True; True }; r }', False),
+    ('{ var r = False; True and { r = True; True }; r }', True),
+    ('{ var r = False; True or { r = True; True }; r }', False),
+    ('{ var r = False; False or { r = True; True }; r }', True),
+    ('{ var c = 0; False and { c = c + 1; True }; c }', 0),
+    ('{ var c = 0; True or { c = c + 1; True }; c }', 0),
+    ('{ }', None),
+]
+
+
+@pytest.mark.parametrize('source, expected', PROGRAMS)
+def test_closures_match_interpreter(source: str, expected: object) -> None:
+    tree = parse(tokenize(source))
+    assert interpret(tree) == expected
+    assert compile_closures(tree)() == expected
+
+def test_compiled_program_can_run_many_times() -> None:
+    run = compile_closures(parse(tokenize('{ var x = 1; { var x = 2; x = x * 10 }; x = x + 1; x }')))
+    assert [run() for _ in range(3)] == [2, 2, 2]
+
+def test_undefined_variable_is_reported_at_compile_time() -> None:
+    with pytest.raises(NameError):
+        compile_closures(parse(tokenize('{ var x = 1; y }')))
@@ -0,0 +1,63 @@
+import os
+from pathlib import Path
+from compiler.compile_cache import CompileCache
+
+
+def test_key_depends_on_source_and_options(tmp_path: Path) -> None:
+    cache = CompileCache(tmp_path)
+    key = cache.key('1 + 2', {'optimization_level': 1})
+    assert key == cache.key('1 + 2', {'optimization_level': 1})
+    assert key != cache.key('1 + 3', {'optimization_level': 1})
+    assert key != cache.key('1 + 2', {'optimization_level': 2})
+
+def test_compiles_once(tmp_path: Path) -> None:
+    cache = CompileCache(tmp_path)
+    compiled: list[str] = []
+    def compile() -> bytes:
+        compiled.append('x')
+        return b'program'
+    assert cache.get_or_compile('1', {}, compile) == b'program'
+    assert cache.get_or_compile('1', {}, compile) == b'program'
+    assert compiled == ['x']
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries, stats.size_bytes) == (1, 1, 1, len(b'program'))
+
+def test_compile_error_is_not_cached(tmp_path: Path) -> None:
+    cache = CompileCache(tmp_path)
+    def fail() -> bytes:
+        raise Exception('type error')
+    for _ in range(2):
+        try:
+            cache.get_or_compile('x', {}, fail)
+        except Exception:
+            pass
+    assert cache.stats().entries == 0
+
+def test_evicts_least_recently_used(tmp_path: Path) -> None:
+    cache = CompileCache(tmp_path, max_bytes=250)
+    for i, key in enumerate(['a', 'b']):
+        cache.put(key, b'x' * 100)
+        os.utime(tmp_path / 'entries' / key, ns=(i, i))
+    assert cache.get('a') is not None  # Now the most recently used
+    cache.put('c', b'x' * 100)
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.get('c') is not None
+    assert cache.stats().size_bytes == 200
+
+def test_counters_are_shared_by_processes(tmp_path: Path) -> None:
+    cache = CompileCache(tmp_path)
+    cache.put('a', b'program')
+    children = []
+    for _ in range(4):
+        pid = os.fork()
+        if pid == 0:
+            for _ in range(50):
+                cache.get('a')
+                cache.get('missing')
+            os._exit(0)
+        children.append(pid)
+    for pid in children:
+        os.waitpid(pid, 0)
+    stats = cache.stats()
+    assert (stats.hits, stats.misses) == (200, 200)
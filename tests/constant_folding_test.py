@@ -0,0 +1,77 @@
+import pytest
+from compiler import ast
+from compiler.constant_folding import count_nodes, fold_constants
+from compiler.ir_generator import generate_ir
+from compiler.int_ops import INT_MIN
+from compiler.ir_interpreter import load_ir, run_ir
+from compiler.parser import parse
+from compiler.symtab import create_global_symtab
+from compiler.token_location import Location
+from compiler.tokenizer import tokenize
+from compiler.typecheck import typecheck
+from compiler.types import Bool, Int
+
+L = Location(0, 0, True) #dummy location
+RESERVED = set(create_global_symtab().symbols.keys()) | {'print_int', 'print_bool'}
+
+
+def fold(source: str) -> ast.Expression:
+    tree = parse(tokenize(source))
+    typecheck(tree)
+    return fold_constants(tree)
+
+def last_statement(source: str) -> ast.Expression:
+    block = fold(source)
+    assert isinstance(block, ast.Block)
+    return block.statements[-1]
+
+
+def test_fold_arithmetic() -> None:
+    assert fold('1 + 2 * 3 - 4') == ast.Literal(L, 3)
+    assert fold('1 + 2 * 3 - 4').type == Int
+    assert fold('1 < 2 and not (3 == 4)') == ast.Literal(L, True)
+    assert fold('1 < 2 and not (3 == 4)').type == Bool
+    assert fold('-(2 * 3)') == ast.Literal(L, -6)
+
+def test_fold_uses_machine_integers() -> None:
+    assert fold('9223372036854775807 + 1') == ast.Literal(L, INT_MIN)
+    assert fold('(0 - 7) / 2') == ast.Literal(L, -3)
+    assert fold('(0 - 7) % 2') == ast.Literal(L, -1)
+    assert isinstance(fold('1 / 0'), ast.BinaryOp)
+    assert isinstance(fold('1 % (2 - 2)'), ast.BinaryOp)
+
+def test_identities() -> None:
+    assert last_statement('{ var x = 3; x * 1 + 0 }') == ast.Identifier(L, 'x')
+    assert last_statement('{ var x = 3; 1 * (0 + x) - 0 }') == ast.Identifier(L, 'x')
+    assert last_statement('{ var b = True; not not b }') == ast.Identifier(L, 'b')
+    assert last_statement('{ var b = True; b and True }') == ast.Identifier(L, 'b')
+    assert last_statement('{ var b = True; False or b }') == ast.Identifier(L, 'b')
+    # The operand may have side effects, so it is not removed
+    assert isinstance(last_statement('{ var x = 3; x * 0 }'), ast.BinaryOp)
+    assert isinstance(last_statement('{ var b = True; b and False }'), ast.BinaryOp)
+
+def test_fold_if() -> None:
+    assert fold('if 1 < 2 then 10 else 20') == ast.Literal(L, 10)
+    assert fold('if 1 > 2 then 10 else 20') == ast.Literal(L, 20)
+    # Without an else branch the result is Unit
+    assert fold_constants(parse(tokenize('if False then 1'))) == ast.Block(L, [])
+
+def test_short_circuit() -> None:
+    assert last_statement('{ var r = 1; False and { r = 2; True } }') == ast.Literal(L, False)
+    assert last_statement('{ var r = 1; True or { r = 2; True } }') == ast.Literal(L, True)
+
+def test_count_nodes() -> None:
+    tree = fold('{ var x = 1 + 2 * 3; x * 1 }')
+    assert count_nodes(tree) == 4
+
+@pytest.mark.parametrize('source', [
+    '{ var x = 10; var y = x * (2 + 3) - 4 / 2; if y > 40 and not (1 == 2) then y % 7 else 0 - y }',
+    '{ var b = 1 < 2; var c = not not b or b; if c then 1 + 2 * 3 else 4 }',
+    '{ var x = 0 - 9223372036854775807; x - 1 - 1 * 1 }',
+])
+def test_folded_program_prints_the_same(source: str) -> None:
+    tree = parse(tokenize(source))
+    typecheck(tree)
+    expected = run_ir(load_ir(generate_ir(RESERVED, tree)))
+    folded = fold_constants(tree)
+    assert run_ir(load_ir(generate_ir(RESERVED, folded))) == expected
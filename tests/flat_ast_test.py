@@ -0,0 +1,81 @@
+import pytest
+from compiler.flat_ast import FlatAST, Kind, from_ast, to_ast
+from compiler.interpreter import interpret, interpret_flat
+from compiler.ir_generator import generate_ir, generate_ir_flat
+from compiler.parser import parse
+from compiler.symtab import create_global_symtab
+from compiler.tokenizer import tokenize
+from compiler.typecheck import typecheck, typecheck_flat
+from compiler.types import Int, Bool, Unit
+import compiler.ast as ast
+
+SOURCE = '{ var x = 1 + 2 * 3; var b = x < 3 or not True; if b then f(x, -x) else { x = 4 }; -x }'
+
+
+def test_round_trip() -> None:
+    tree = parse(tokenize(SOURCE))
+    flat = from_ast(tree)
+    assert flat.kinds[len(flat) - 1] == Kind.BLOCK
+    assert to_ast(flat) == tree
+    assert repr(to_ast(flat)) == repr(tree)
+
+def test_node_accessors() -> None:
+    flat = from_ast(parse(tokenize('a + 10')))
+    root = len(flat) - 1
+    assert flat.operator(root) == '+'
+    left, right = flat.child_list(root)
+    assert flat.kinds[left] == Kind.IDENTIFIER and flat.name(left) == 'a'
+    assert flat.kinds[right] == Kind.INT_LITERAL and flat.values[right] == 10
+    assert flat.location(right).column == 5
+
+def test_round_trip_deep_tree() -> None:
+    depth = 5000
+    flat = from_ast(parse(tokenize('{ ' * depth + 'x' + ' }' * depth)))
+    assert len(flat) == depth + 1
+    tree = to_ast(flat)
+    for _ in range(depth):
+        tree = tree.statements[0]
+    assert tree.name == 'x'
+
+def test_typecheck_flat() -> None:
+    source = '{ var x = 1 + 2 * 3; var b = x < 3 or not True; if b then { x = 4 } else { x = -x }; x == 3 }'
+    tree = parse(tokenize(source))
+    flat = from_ast(tree)
+    assert typecheck_flat(flat) == typecheck(tree) == Bool
+    # The types set on the ast nodes and the flat nodes agree
+    assert to_ast(flat).statements[0].value.type == Int
+    assert from_ast(tree).types == flat.types
+
+def test_typecheck_flat_function_calls() -> None:
+    tree = parse(tokenize('{ var x = 3; print_int(x); print_bool(x < 2) }'))
+    flat = from_ast(tree)
+    assert typecheck_flat(flat) == typecheck(tree) == Unit
+    assert from_ast(tree).types == flat.types
+    for source, error in [('f(1)', 'undefined function f'), ('print_int(True)', 'argument 1 of print_int must be Int'),
+                          ('print_bool()', 'expected 1 arguments'), ('{ var f = 1; f(2) }', 'f is not a function')]:
+        with pytest.raises(Exception, match=error):
+            typecheck_flat(from_ast(parse(tokenize(source))))
+        with pytest.raises(Exception, match=error):
+            typecheck(parse(tokenize(source)))
+
+def test_flat_walkers_deep_tree() -> None:
+    depth = 20_000
+    tree = parse(tokenize('{ var x = 1; ' + '(x + ' * depth + '(x = 2)' + ')' * depth + ' }'))
+    flat = from_ast(tree)
+    assert typecheck_flat(flat) == Int
+    assert interpret_flat(flat) == depth + 2
+    assert len(generate_ir_flat(set(create_global_symtab().symbols.keys()) | {'print_int', 'print_bool'}, flat)) > 0
+
+def test_interpret_flat() -> None:
+    for source in ['1 + 2 * 3 - 4 % 3', '{ var x = 3; var y = x * x; y - x }',
+                   'if 1 < 2 and True then 10 else 20', 'False or 2 >= 2', '{ var a = 1; { var a = 2 }; a }']:
+        tree = parse(tokenize(source))
+        assert interpret_flat(from_ast(tree)) == interpret(tree)
+
+def test_generate_ir_flat() -> None:
+    reserved = set(create_global_symtab().symbols.keys()) | {'print_int', 'print_bool'}
+    for source in ['{ var x = 1 + 2; var y = x * 3; { var x = y; x < y } }',
+                   '{ var x = 1; var b = x < 3 or not True and x > 0; if b then { x = 4 } else { x = -x }; x }']:
+        tree = parse(tokenize(source))
+        typecheck(tree)
+        assert generate_ir_flat(reserved, from_ast(tree)) == generate_ir(reserved, tree)
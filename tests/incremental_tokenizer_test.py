@@ -0,0 +1,80 @@
+import random
+import pytest
+from compiler.incremental_tokenizer import Edit, retokenize
+from compiler.token_buffer import TokenBuffer
+
+PIECES = [
+    'x', 'abc', 'True', 'False', '12', '0', ' ', '  ', '\n', '\t',
+    '+', '-', '*', '/', '%', '=', '==', '!=', '<', '<=', '>', '>=',
+    '(', ')', '{', '}', ',', ';', '/*', '*/', '//', '#', 'if', 'var',
+]
+
+
+def columns(buffer: TokenBuffer) -> list[tuple[int, int, int, int, int]]:
+    return list(zip(buffer.kinds, buffer.starts, buffer.ends, buffer.rows, buffer.columns))
+
+
+def random_text(rng: random.Random, max_pieces: int) -> str:
+    return ''.join(rng.choice(PIECES) for _ in range(rng.randint(0, max_pieces)))
+
+
+def check(source: str, edit: Edit) -> None:
+    buffer = TokenBuffer.from_source(source)
+    new_source = source[:edit.offset] + edit.inserted + source[edit.offset + edit.deleted:]
+    try:
+        expected = TokenBuffer.from_source(new_source)
+    except Exception:
+        with pytest.raises(Exception, match='unexpected character'):
+            retokenize(buffer, edit)
+        return
+    result = retokenize(buffer, edit)
+    assert result.source == new_source
+    assert columns(result) == columns(expected), (source, edit)
+    assert list(result) == list(expected)
+
+
+def test_edit_inside_token() -> None:
+    check('var abc = 1 + 2', Edit(5, 0, 'xy'))
+
+def test_edit_joins_tokens() -> None:
+    check('a b\nc', Edit(1, 1, ''))
+
+def test_edit_adds_line() -> None:
+    check('a b c\nd e\nf', Edit(3, 0, '\n\n  '))
+
+def test_edit_opens_comment() -> None:
+    check('a b */ c\nd', Edit(1, 0, '/*'))
+
+def test_edit_closes_comment() -> None:
+    check('a /* b c\nd e', Edit(9, 0, '*/'))
+
+def test_edit_removes_comment_end() -> None:
+    check('a /* b */ c\nd e', Edit(7, 2, ''))
+
+def test_edit_at_start_and_end() -> None:
+    check('x = 1', Edit(0, 0, '/* '))
+    check('x = 1', Edit(5, 0, '0 */'))
+
+def test_random_edits_match_full_tokenize() -> None:
+    rng = random.Random(20241018)
+    for _ in range(3000):
+        source = random_text(rng, 40)
+        offset = rng.randint(0, len(source))
+        deleted = rng.randint(0, min(len(source) - offset, 6))
+        check(source, Edit(offset, deleted, random_text(rng, 3)))
+
+def test_random_edit_sequences() -> None:
+    rng = random.Random(7)
+    for _ in range(100):
+        buffer = TokenBuffer.from_source(random_text(rng, 60))
+        for _ in range(20):
+            source = buffer.source
+            offset = rng.randint(0, len(source))
+            # Keep "!=" whole so that every intermediate source is valid.
+            while source[offset - 1:offset + 1] == '!=':
+                offset -= 1
+            deleted = rng.randint(0, min(len(source) - offset, 4))
+            while source[offset + deleted - 1:offset + deleted + 1] == '!=':
+                deleted -= 1
+            buffer = retokenize(buffer, Edit(offset, deleted, random_text(rng, 2)))
+            assert columns(buffer) == columns(TokenBuffer.from_source(buffer.source))
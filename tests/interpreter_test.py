@@ -1,3 +1,9 @@
+import pytest
+from compiler.flat_ast import from_ast
+from compiler.interpreter import interpret, interpret_flat
+from compiler.parser import parse
+from compiler.tokenizer import tokenize
+
 # from compiler.interpreter import interpret
 # from compiler.parser import parse
 # from compiler.tokenizer import tokenize
@@ -136,4 +142,21 @@
 #     tokens = tokenize('False or True')
 #     parsed = parse(tokens)
 #     result = interpret(parsed)
-#     assert result == True
\ No newline at end of file
+#     assert result == True
+
+
+# A declaration defines a new variable that shadows an outer one with the
+# same name, instead of assigning to the outer one
+SHADOWING_PROGRAMS = [
+    ('{ var x = 1; { var x = 2 }; x }', 1),
+    ('{ var x = 1; { var x = 2; x = 3 }; x }', 1),
+    ('{ var x = 1; { var x = x + 1; x } }', 2),
+    ('{ var x = 1; { x = 2 }; x }', 2),
+    ('{ var x = 5; var x = x * 2; x }', 10),
+]
+
+@pytest.mark.parametrize('source, expected', SHADOWING_PROGRAMS)
+def test_declaration_shadows_outer_variable(source: str, expected: int) -> None:
+    tree = parse(tokenize(source))
+    assert interpret(tree) == expected
+    assert interpret_flat(from_ast(tree)) == expected
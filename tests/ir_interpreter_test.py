@@ -0,0 +1,97 @@
+import pytest
+from compiler import ir
+from compiler.compiler import generate_program_ir
+from compiler.flat_ast import from_ast
+from compiler.interpreter import interpret
+from compiler.ir import IRVar
+from compiler.ir_generator import generate_ir, generate_ir_flat
+from compiler.int_ops import INT_MAX, INT_MIN, int_div, int_mod, wrap_int
+from compiler.ir_interpreter import load_ir, run_ir
+from compiler.parser import parse
+from compiler.symtab import create_global_symtab
+from compiler.token_location import Location
+from compiler.tokenizer import tokenize
+from compiler.typecheck import typecheck
+
+RESERVED = set(create_global_symtab().symbols.keys()) | {'print_int', 'print_bool'}
+
+PROGRAMS = [
+    '1 + 2 * 3 - 9 % 4',
+    '-2 * -(3 + 1)',
+    'not True or not not False',
+    '1 < 2 and 2 <= 2 and 3 > 2 and 3 >= 4',
+    '1 == 1 and 1 != 2',
+    '{ var x = 1; x = x + 41; x }',
+    '{ var x = 1; { var x = 2; x = 3 }; x }',
+    '{ var x = 5; var x = x * 2; x }',
+    '{ var a = 1; var b = { var a = 10; a + 1 }; a + b }',
+    'if 1 < 2 then 10 else 20',
+    '{ var x = 1; if x == 1 then { x = 5 } else { x = 6 }; x }',
+    '{ var r = False; False and { r = True; True }; r }',
+    '{ var r = False; True and { r = True; True }; r }',
+    '{ var r = False; True or { r = True; True }; r }',
+    '{ var r = False; False or { r = True; True }; r }',
+]
+
+
+def run_source(source: str) -> list[str]:
+    tree = parse(tokenize(source))
+    typecheck(tree)
+    return run_ir(load_ir(generate_ir(RESERVED, tree)))
+
+
+@pytest.mark.parametrize('source', PROGRAMS)
+def test_ir_matches_interpreter(source: str) -> None:
+    expected = interpret(parse(tokenize(source)))
+    assert run_source(source) == [str(expected).lower()]
+
+# Operands that a later operand assigns to
+ASSIGNING_OPERANDS = [
+    '{ var x = 1; (x = 2) + (x = 3) }',
+    '{ var x = 1; x + (x = 5) }',
+    '{ var z = 1; z + 0 + (z = 5) }',
+    '{ var x = 1; var y = 0; (y = x) + (x = 5) + y }',
+    '{ var x = 2; x * { x = x + 1; x } - x }',
+    '{ var x = 1; x < { x = 0; x } }',
+]
+
+@pytest.mark.parametrize('source', ASSIGNING_OPERANDS)
+@pytest.mark.parametrize('optimization_level', [0, 1, 2])
+def test_operands_keep_their_values(source: str, optimization_level: int) -> None:
+    expected = str(interpret(parse(tokenize(source)))).lower()
+    assert run_ir(load_ir(generate_program_ir(source, optimization_level)))[-1] == expected
+    tree = parse(tokenize(source))
+    typecheck(tree)
+    assert run_ir(load_ir(generate_ir_flat(RESERVED, from_ast(tree))))[-1] == expected
+
+def test_print_calls() -> None:
+    assert run_source('{ print_int(1); print_bool(2 > 1); print_int(3) }') == ['1', 'true', '3']
+
+def test_integer_semantics() -> None:
+    assert wrap_int(INT_MAX + 1) == INT_MIN
+    assert [int_div(7, 2), int_div(-7, 2), int_div(7, -2), int_div(-7, -2)] == [3, -3, -3, 3]
+    assert [int_mod(7, 2), int_mod(-7, 2), int_mod(7, -2), int_mod(-7, -2)] == [1, -1, 1, -1]
+    assert int_div(INT_MIN, -1) == INT_MIN
+    assert run_source('{ var x = 0 - 7; x / 2 }') == ['-3']
+    assert run_source('9223372036854775807 + 1') == [str(INT_MIN)]
+    with pytest.raises(ZeroDivisionError):
+        run_source('1 / 0')
+
+def test_unknown_function() -> None:
+    loc = Location(1, 1)
+    with pytest.raises(Exception, match='unknown function f'):
+        load_ir([ir.Call(loc, IRVar('f'), [], IRVar('x1'))])
+
+def test_jumps_to_labels() -> None:
+    loc = Location(1, 1)
+    skip, end = ir.Label(loc, 'skip'), ir.Label(loc, 'end')
+    program = load_ir([
+        ir.LoadBoolConst(loc, False, IRVar('c')),
+        ir.CondJump(loc, IRVar('c'), end, skip),
+        skip,
+        ir.LoadIntConst(loc, 7, IRVar('x')),
+        end,
+        ir.Call(loc, IRVar('print_int'), [IRVar('x')], IRVar('unit')),
+    ])
+    assert program.code[1][2:] == (3, 2)
+    assert run_ir(program) == ['7']
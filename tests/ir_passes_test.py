@@ -0,0 +1,117 @@
+import pytest
+from compiler import ir
+from compiler.ir import IRVar
+from compiler.ir_generator import generate_ir
+from compiler.ir_interpreter import load_ir, run_ir
+from compiler.ir_passes import propagate_copies, prune_unreachable, remove_dead_code, thread_jumps
+from compiler.parser import parse
+from compiler.pass_manager import PassManager, pass_manager_for_level
+from compiler.symtab import create_global_symtab
+from compiler.token_location import Location
+from compiler.tokenizer import tokenize
+from compiler.typecheck import typecheck
+
+L = Location(0, 0, True) #dummy location
+RESERVED = set(create_global_symtab().symbols.keys()) | {'print_int', 'print_bool'}
+a, b, c, d = IRVar('a'), IRVar('b'), IRVar('c'), IRVar('d')
+plus, print_int = IRVar('+'), IRVar('print_int')
+
+
+def test_propagate_copies() -> None:
+    assert propagate_copies([
+        ir.LoadIntConst(L, 1, a),
+        ir.Copy(L, a, b),
+        ir.Call(L, plus, [b, b], c),
+        ir.Copy(L, c, c),
+        ir.LoadIntConst(L, 2, a),
+        ir.Call(L, plus, [b, a], d),
+    ]) == [
+        ir.LoadIntConst(L, 1, a),
+        ir.Copy(L, a, b),
+        ir.Call(L, plus, [a, a], c),
+        ir.LoadIntConst(L, 2, a),
+        # `a` changed, so `b` is read again
+        ir.Call(L, plus, [b, a], d),
+    ]
+
+def test_propagate_copies_stops_at_labels() -> None:
+    label = ir.Label(L, 'L1')
+    instructions = [ir.Copy(L, a, b), label, ir.Call(L, print_int, [b], c)]
+    assert propagate_copies(instructions) == instructions
+
+def test_remove_dead_code() -> None:
+    assert remove_dead_code([
+        ir.LoadIntConst(L, 1, a),
+        ir.Copy(L, a, b),
+        ir.Copy(L, b, c),
+        ir.LoadBoolConst(L, True, d),
+        ir.Call(L, print_int, [d], IRVar('unused')),
+    ]) == [
+        ir.LoadBoolConst(L, True, d),
+        ir.Call(L, print_int, [d], IRVar('unused')),
+    ]
+
+def test_prune_unreachable() -> None:
+    used, unused = ir.Label(L, 'used'), ir.Label(L, 'unused')
+    assert prune_unreachable([
+        ir.Jump(L, used),
+        ir.LoadIntConst(L, 1, a),
+        unused,
+        ir.LoadIntConst(L, 2, a),
+        used,
+        ir.Call(L, print_int, [a], b),
+    ]) == [
+        ir.Jump(L, used),
+        used,
+        ir.Call(L, print_int, [a], b),
+    ]
+
+def test_thread_jumps() -> None:
+    l1, l2, l3, end = (ir.Label(L, name) for name in ['l1', 'l2', 'l3', 'end'])
+    assert thread_jumps([
+        ir.CondJump(L, a, l1, l2),
+        l1,
+        ir.Jump(L, l3),
+        l2,
+        ir.Jump(L, l3),
+        l3,
+        ir.Jump(L, end),
+        end,
+    ]) == [
+        ir.Jump(L, end),
+        l1,
+        ir.Jump(L, end),
+        l2,
+        ir.Jump(L, end),
+        # Only labels are skipped, so this jump is removed
+        l3,
+        end,
+    ]
+
+def test_pass_manager_records_stats() -> None:
+    manager = PassManager([propagate_copies, remove_dead_code])
+    manager.run([ir.LoadIntConst(L, 1, a), ir.Copy(L, a, b), ir.Call(L, print_int, [b], c)])
+    assert [(s.name, s.instructions_before, s.instructions_after) for s in manager.stats] == [
+        ('propagate_copies', 3, 3),
+        ('remove_dead_code', 3, 2),
+    ]
+
+@pytest.mark.parametrize('level', [0, 1, 2])
+@pytest.mark.parametrize('source', [
+    '{ var x = 10; var y = x * 3; { var x = y; x = x + 1; y = x }; y }',
+    '{ var x = 1; if x < 2 and not (x == 0) or x > 5 then { x = x + 3 } else { x = x - 1 }; x }',
+    '{ var b = True; var n = 0; if b then if not b then n = 1 else n = 2 else n = 3; n == 2 }',
+    '{ var x = 0 - 7; var r = False; False and { r = True; True }; x / 2 + x % 2 }',
+])
+def test_optimized_program_prints_the_same(source: str, level: int) -> None:
+    tree = parse(tokenize(source))
+    typecheck(tree)
+    instructions = generate_ir(RESERVED, tree)
+    optimized = pass_manager_for_level(level).run(instructions)
+    assert run_ir(load_ir(optimized)) == run_ir(load_ir(instructions))
+    if level > 0:
+        assert len(optimized) < len(instructions)
+
+def test_unknown_level() -> None:
+    with pytest.raises(ValueError):
+        pass_manager_for_level(3)
@@ -0,0 +1,51 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+MAIN = Path(__file__).parent.parent / 'src' / '__main__.py'
+
+needs_assembler = pytest.mark.skipif(shutil.which('as') is None or shutil.which('ld') is None,
+                                     reason='needs the GNU assembler and linker')
+
+
+@needs_assembler
+def test_compile_batch(tmp_path: Path) -> None:
+    sources = {'a': 'print_int(1 + 2)', 'b': 'print_bool(1 > 2)', 'bad': '1 + missing', 'c': '{ var x = 4; x * x }'}
+    for name, source in sources.items():
+        (tmp_path / f'{name}.src').write_text(source)
+    result = subprocess.run(
+        [sys.executable, str(MAIN), 'compile', '--batch', f'--output={tmp_path / "out"}',
+         *(str(tmp_path / f'{name}.src') for name in sources)],
+        capture_output=True, text=True,
+    )
+    assert result.returncode == 1
+    assert 'bad.src' in result.stderr and 'undefined' in result.stderr
+    outputs = {}
+    for name in ['a', 'b', 'c']:
+        executable = tmp_path / 'out' / name
+        os.chmod(executable, 0o755)
+        outputs[name] = subprocess.run([executable], capture_output=True, text=True).stdout
+    assert outputs == {'a': '3\n', 'b': 'false\n', 'c': '16\n'}
+    assert not (tmp_path / 'out' / 'bad').exists()
+
+def test_multiple_inputs_need_batch(tmp_path: Path) -> None:
+    result = subprocess.run([sys.executable, str(MAIN), 'compile', 'a.src', 'b.src', '--output=x'],
+                            capture_output=True, text=True)
+    assert result.returncode != 0
+    assert '--batch' in result.stderr
+
+@needs_assembler
+def test_stats_json(tmp_path: Path) -> None:
+    source = tmp_path / 'program.src'
+    source.write_text('{ var x = 2; print_int(x * 3) }')
+    result = subprocess.run([sys.executable, str(MAIN), 'compile', str(source), f'--output={tmp_path / "out"}',
+                             '--stats=json'], capture_output=True, text=True, check=True)
+    report = json.loads(result.stdout)
+    stages = {stage['name']: stage for stage in report['stages']}
+    assert stages['generate IR']['counts']['instructions'] > 0
+    assert stages['ld']['counts']['bytes'] == (tmp_path / 'out').stat().st_size
+    assert all(stage['wall_seconds'] >= 0 and stage['cpu_seconds'] >= 0 for stage in report['stages'])
@@ -1,5 +1,6 @@
 from compiler.parser import parse
-from compiler.tokenizer import tokenize
+from compiler.tokenizer import tokenize, iter_tokens
+from compiler.token_stream import TokenStream
 import compiler.ast as ast
 import pytest
 from compiler.token_location import Location
@@ -424,3 +425,66 @@ def test_parser_true():
 def test_parser_false():
     tokens = tokenize('False')
     assert(parse(tokens) == ast.Literal(L, False))    
+
+def test_parser_accepts_token_iterator():
+    source = '{ var x = 1 + 2; if x < 3 then f(x, y) else -x }'
+    assert parse(iter_tokens(source)) == parse(tokenize(source))
+
+def test_parser_lookahead_is_bounded():
+    pulled = 0
+    def tokens():
+        nonlocal pulled
+        for token in iter_tokens('1 + 2 + 3 + 4 + 5'):
+            pulled += 1
+            yield token
+    stream = TokenStream(tokens())
+    assert stream.consume().text == '1'
+    assert pulled == 1
+    assert stream.peek(1).text == '2'
+    assert pulled == 3
+    assert parse(tokens()) == parse(tokenize('1 + 2 + 3 + 4 + 5'))
+
+def test_parser_precedence_and_associativity():
+    result = parse(tokenize('a = b = 1 + 2 * 3 - 4 < 5 or c'))
+    expected = ast.Assignment(L, ast.Identifier(L, 'a'), ast.Assignment(L, ast.Identifier(L, 'b'),
+        ast.BinaryOp(L,
+            ast.BinaryOp(L,
+                ast.BinaryOp(L,
+                    ast.BinaryOp(L, ast.Literal(L, 1), '+', ast.BinaryOp(L, ast.Literal(L, 2), '*', ast.Literal(L, 3))),
+                    '-', ast.Literal(L, 4)),
+                '<', ast.Literal(L, 5)),
+            'or', ast.Identifier(L, 'c'))))
+    assert result == expected
+
+def test_parser_assignment_to_non_identifier():
+    with pytest.raises(Exception, match='left side of assignment must be an identifier'):
+        parse(tokenize('a + b = c'))
+
+def test_parser_long_flat_expressions():
+    terms = 20000
+    result = parse(tokenize(' + '.join(['1'] * terms)))
+    count = 1
+    while isinstance(result, ast.BinaryOp):
+        assert result.right == ast.Literal(L, 1)
+        result = result.left
+        count += 1
+    assert count == terms
+    assert isinstance(parse(tokenize(' = '.join(['x'] * terms))), ast.Assignment)
+    assert isinstance(parse(tokenize('not ' * terms + 'x')), ast.UnaryOp)
+
+def test_parser_deeply_nested_blocks_and_parentheses():
+    depth = 5000
+    result = parse(tokenize('{ ' * depth + '(' * depth + 'x' + ')' * depth + ' }' * depth))
+    for _ in range(depth):
+        assert isinstance(result, ast.Block)
+        result = result.statements[0]
+    assert result == ast.Identifier(L, 'x')
+
+def test_parser_long_else_if_chain():
+    depth = 5000
+    result = parse(tokenize('if a then f(1) else ' * depth + '0'))
+    for _ in range(depth):
+        assert isinstance(result, ast.IfExpression)
+        assert isinstance(result.then_branch, ast.FunctionCall)
+        result = result.else_branch
+    assert result == ast.Literal(L, 0)
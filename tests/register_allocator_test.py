@@ -0,0 +1,95 @@
+import dataclasses
+import pytest
+from compiler import ir
+from compiler.ir import IRVar
+from compiler.ir_generator import generate_ir
+from compiler.ir_interpreter import load_ir, run_ir
+from compiler.parser import parse
+from compiler.register_allocator import Allocation, allocate
+from compiler.symtab import create_global_symtab
+from compiler.token_location import Location
+from compiler.tokenizer import tokenize
+from compiler.typecheck import typecheck
+
+L = Location(0, 0, True) #dummy location
+RESERVED = set(create_global_symtab().symbols.keys()) | {'print_int', 'print_bool'}
+
+
+def rename(instructions: list[ir.Instruction], allocation: Allocation) -> list[ir.Instruction]:
+    """Replace every variable with its location, so running the result
+    shows whether variables that share a location overwrite each other."""
+    def location(var: IRVar) -> IRVar:
+        return IRVar(f'loc_{allocation.location(var)}')
+    renamed: list[ir.Instruction] = []
+    for insn in instructions:
+        match insn:
+            case ir.LoadIntConst() | ir.LoadBoolConst():
+                insn = dataclasses.replace(insn, dest=location(insn.dest))
+            case ir.Copy():
+                insn = dataclasses.replace(insn, source=location(insn.source), dest=location(insn.dest))
+            case ir.Call():
+                insn = dataclasses.replace(insn, args=[location(a) for a in insn.args], dest=location(insn.dest))
+            case ir.CondJump():
+                insn = dataclasses.replace(insn, cond=location(insn.cond))
+        renamed.append(insn)
+    return renamed
+
+
+def test_reuses_slots() -> None:
+    a, b, c, d, e = IRVar('a'), IRVar('b'), IRVar('c'), IRVar('d'), IRVar('e')
+    allocation = allocate([
+        ir.LoadIntConst(L, 1, a),
+        ir.LoadIntConst(L, 2, b),
+        ir.Call(L, IRVar('+'), [a, b], c),
+        ir.Call(L, IRVar('unary_-'), [c], d),
+        ir.Call(L, IRVar('print_int'), [d], e),
+    ])
+    assert allocation.naive_slot_count == 5
+    # An instruction's result never shares a location with its operands
+    assert allocation.slot_count == 3
+    assert allocation.stack_slots[d] in (allocation.stack_slots[a], allocation.stack_slots[b])
+    assert allocation.stack_slots[e] == allocation.stack_slots[c]
+
+def test_spills_to_stack() -> None:
+    variables = [IRVar(f'v{i}') for i in range(4)]
+    instructions: list[ir.Instruction] = [ir.LoadIntConst(L, i, v) for i, v in enumerate(variables)]
+    instructions += [ir.Call(L, IRVar('print_int'), [v], IRVar('unit')) for v in variables]
+    allocation = allocate(instructions, ['r1', 'r2'])
+    assert sorted(allocation.registers.values()) == ['r1', 'r2']
+    # Four values are live at once, so two are on the stack
+    assert allocation.slot_count == 3  # the two spilled values and 'unit'
+    assert run_ir(load_ir(rename(instructions, allocation))) == ['0', '1', '2', '3']
+
+@pytest.mark.parametrize('registers', [[], ['r1'], ['r1', 'r2', 'r3']])
+@pytest.mark.parametrize('source', [
+    '{ var x = 10; var y = x * 3; { var x = y; x = x + 1; y = x }; y }',
+    '{ var x = 1; if x < 2 and not (x == 0) or x > 5 then { x = x + 3 } else { x = x - 1 }; x }',
+    '{ var a = 1; var b = 2; var c = 3; var d = a + b * c; if d > 5 then a + b + c + d else a - b }',
+    '{ var b = True; var n = 0; if b then if not b then n = 1 else n = 2 else n = 3; n == 2 }',
+])
+def test_allocated_program_prints_the_same(source: str, registers: list[str]) -> None:
+    tree = parse(tokenize(source))
+    typecheck(tree)
+    instructions = generate_ir(RESERVED, tree)
+    allocation = allocate(instructions, registers)
+    assert allocation.slot_count + len(set(allocation.registers.values())) < allocation.naive_slot_count
+    assert run_ir(load_ir(rename(instructions, allocation))) == run_ir(load_ir(instructions))
+
+def test_loop_keeps_variables_live() -> None:
+    i, n, t, one = IRVar('i'), IRVar('n'), IRVar('t'), IRVar('one')
+    loop, end = ir.Label(L, 'loop'), ir.Label(L, 'end')
+    instructions: list[ir.Instruction] = [
+        ir.LoadIntConst(L, 0, i),
+        ir.LoadIntConst(L, 3, n),
+        loop,
+        ir.LoadIntConst(L, 1, one),
+        ir.Call(L, IRVar('+'), [i, one], i),
+        ir.Call(L, IRVar('<'), [i, n], t),
+        ir.CondJump(L, t, loop, end),
+        end,
+        ir.Call(L, IRVar('print_int'), [i], IRVar('unit')),
+    ]
+    allocation = allocate(instructions)
+    assert run_ir(load_ir(rename(instructions, allocation))) == ['3']
+    # `n` is live through the whole loop, so nothing in the loop shares its slot
+    assert allocation.stack_slots[n] not in {allocation.stack_slots[v] for v in [i, t, one]}
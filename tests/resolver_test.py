@@ -0,0 +1,42 @@
+from compiler import ast
+from compiler.interpreter import interpret
+from compiler.parser import parse
+from compiler.resolver import resolve
+from compiler.tokenizer import tokenize
+
+
+def declarations_and_identifiers(node: ast.Expression) -> list[tuple[str, int]]:
+    """(name, slot) of declarations and identifiers in evaluation order."""
+    match node:
+        case ast.Identifier():
+            return [(node.name, node.slot)]
+        case ast.VariableDeclaration():
+            return declarations_and_identifiers(node.value) + [(f'var {node.name}', node.slot)]
+        case ast.BinaryOp():
+            return declarations_and_identifiers(node.left) + declarations_and_identifiers(node.right)
+        case ast.Block():
+            return [pair for s in node.statements for pair in declarations_and_identifiers(s)]
+        case ast.Assignment():
+            return declarations_and_identifiers(node.value) + declarations_and_identifiers(node.name)
+        case _:
+            return []
+
+def test_resolve_shadowing() -> None:
+    tree = parse(tokenize('{ var x = 1; { var x = x + 1; x = 3 }; var y = x; print_int(y) }'))
+    assert resolve(tree) == 3
+    assert declarations_and_identifiers(tree) == [
+        ('var x', 0),
+        ('x', 0), ('var x', 1),
+        ('x', 1),
+        ('x', 0), ('var y', 2),
+    ]
+
+def test_resolve_undeclared_names_are_global() -> None:
+    tree = parse(tokenize('{ var a = b; { var b = 1 }; b }'))
+    assert resolve(tree) == 2
+    assert declarations_and_identifiers(tree) == [('b', -1), ('var a', 0), ('var b', 1), ('b', -1)]
+
+def test_interpret_deep_shadowing() -> None:
+    depth = 200
+    source = '{ var top = 7; var x = 0; ' + '{ var x = x + 1; ' * depth + 'top + x' + ' }' * depth + ' }'
+    assert interpret(parse(tokenize(source))) == 7 + depth
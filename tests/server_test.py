@@ -0,0 +1,195 @@
+from base64 import b64decode
+import json
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Iterator
+import pytest
+
+MAIN = Path(__file__).parent.parent / 'src' / '__main__.py'
+
+needs_assembler = pytest.mark.skipif(shutil.which('as') is None or shutil.which('ld') is None,
+                                     reason='needs the GNU assembler and linker')
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port: int = s.getsockname()[1]
+        return port
+
+
+def request(port: int, data: dict[str, Any]) -> dict[str, Any]:
+    with socket.create_connection(('127.0.0.1', port)) as s:
+        s.sendall(json.dumps(data).encode())
+        s.shutdown(socket.SHUT_WR)
+        response = b''
+        while chunk := s.recv(65536):
+            response += chunk
+    result: dict[str, Any] = json.loads(response)
+    return result
+
+
+def request_binary(port: int, data: dict[str, Any]) -> tuple[int, bytes]:
+    with socket.create_connection(('127.0.0.1', port)) as s:
+        s.sendall(json.dumps({**data, 'binary': True}).encode())
+        s.shutdown(socket.SHUT_WR)
+        response = b''
+        while chunk := s.recv(65536):
+            response += chunk
+    status, length = struct.unpack('>BI', response[:5])
+    assert len(response) == 5 + length
+    return status, response[5:]
+
+
+def send_frame(s: socket.socket, data: dict[str, Any]) -> None:
+    payload = json.dumps(data).encode()
+    s.sendall(struct.pack('>I', len(payload)) + payload)
+
+
+def receive_frame(s: socket.socket) -> dict[str, Any]:
+    def receive(size: int) -> bytes:
+        data = b''
+        while len(data) < size:
+            chunk = s.recv(size - len(data))
+            assert chunk, 'connection closed'
+            data += chunk
+        return data
+    (length,) = struct.unpack('>I', receive(4))
+    result: dict[str, Any] = json.loads(receive(length))
+    return result
+
+
+def start_server(*args: str) -> tuple[subprocess.Popen[bytes], int]:
+    port = free_port()
+    server = subprocess.Popen([sys.executable, str(MAIN), 'serve', f'--port={port}', *args],
+                              stdout=subprocess.DEVNULL)
+    for _ in range(200):
+        try:
+            request(port, {'command': 'ping'})
+            return server, port
+        except ConnectionError:
+            time.sleep(0.05)
+    server.kill()
+    raise Exception('server did not start')
+
+
+@pytest.fixture(params=[[], ['--workers=2', '--max-requests-per-worker=3', '--request-queue-size=8'],
+                        ['--async', '--workers=2']],
+                ids=['forking', 'worker pool', 'asyncio'])
+def server_port(request: pytest.FixtureRequest) -> Iterator[int]:
+    server, port = start_server(*request.param)
+    yield port
+    server.terminate()
+    server.wait()
+
+
+@needs_assembler
+def test_compile(server_port: int) -> None:
+    # More requests than the workers handle before they are replaced
+    for _ in range(8):
+        result = request(server_port, {'command': 'compile', 'code': 'print_int(1 + 2)'})
+        assert 'error' not in result
+        assert 'program' in result
+
+@needs_assembler
+def test_compile_batch(server_port: int) -> None:
+    codes = ['print_int(1)', 'undefined_name', 'print_bool(1 < 2)', '1 +']
+    results = request(server_port, {'command': 'compile_batch', 'codes': codes})['results']
+    assert ['program' in result for result in results] == [True, False, True, False]
+    assert 'undefined' in results[1]['error']
+    assert request(server_port, {'command': 'compile_batch', 'codes': []}) == {'results': []}
+
+@needs_assembler
+def test_binary_response(server_port: int) -> None:
+    code = '{ var x = 3; print_int(x * x) }'
+    status, program = request_binary(server_port, {'command': 'compile', 'code': code})
+    assert status == 0
+    assert program.startswith(b'\x7fELF')
+    # The debug info names a temporary directory, so only the size is the same
+    assert len(program) == len(b64decode(request(server_port, {'command': 'compile', 'code': code})['program']))
+
+def test_binary_error_and_json(server_port: int) -> None:
+    status, message = request_binary(server_port, {'command': 'compile', 'code': 'missing'})
+    assert status == 1
+    assert 'undefined' in message.decode()
+    assert request_binary(server_port, {'command': 'ping'}) == (2, b'{}')
+
+@needs_assembler
+def test_compile_stats(server_port: int) -> None:
+    result = request(server_port, {'command': 'compile', 'code': 'print_int(1 + 2)', 'stats': True})
+    assert 'program' in result
+    stages = result['stats']['stages']
+    assert [stage['name'] for stage in stages][:2] == ['parse', 'typecheck']
+    assert stages[0]['counts']['tokens'] == 6
+    assert all(stage['peak_memory'] is not None for stage in stages)
+    assert 'stats' not in request(server_port, {'command': 'compile', 'code': 'print_int(1)'})
+
+def test_compile_error(server_port: int) -> None:
+    result = request(server_port, {'command': 'compile', 'code': '1 + true_value'})
+    assert 'undefined' in result['error']
+
+def test_unknown_command(server_port: int) -> None:
+    assert request(server_port, {'command': 'nope'}) == {'error': 'Unknown command: nope'}
+
+def test_failing_workers_stop_the_server() -> None:
+    # A worker pool whose workers fail on start-up, with short delays
+    script = f"""
+import importlib.util, socketserver
+spec = importlib.util.spec_from_file_location('compiler_main', {str(MAIN)!r})
+main = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(main)
+main.RESTART_DELAY = 0.01
+def failing_context():
+    raise Exception('cannot start')
+main.run_worker_pool(('127.0.0.1', 0), socketserver.StreamRequestHandler, 2, worker_context=failing_context)
+"""
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, timeout=30,
+                            cwd=MAIN.parent)
+    assert result.returncode != 0
+    assert 'cannot start' in result.stderr
+    assert 'exited with status 1' in result.stderr
+    assert 'Workers failed to start 5 times in a row' in result.stderr
+
+@pytest.fixture
+def async_server_port() -> Iterator[int]:
+    server, port = start_server('--async', '--workers=2')
+    yield port
+    server.terminate()
+    server.wait()
+
+@needs_assembler
+def test_framed_requests_share_a_connection(async_server_port: int) -> None:
+    with socket.create_connection(('127.0.0.1', async_server_port)) as s:
+        for i in range(5):
+            send_frame(s, {'command': 'compile', 'code': f'print_int({i})', 'id': i})
+        send_frame(s, {'command': 'ping', 'id': 'p'})
+        send_frame(s, {'command': 'compile', 'code': 'x', 'id': 'bad'})
+        responses = {}
+        for _ in range(7):
+            response = receive_frame(s)
+            responses[response['id']] = response
+    assert all('program' in responses[i] for i in range(5))
+    assert responses['p'] == {'id': 'p'}
+    assert 'undefined' in responses['bad']['error']
+
+def test_framed_invalid_json(async_server_port: int) -> None:
+    with socket.create_connection(('127.0.0.1', async_server_port)) as s:
+        s.sendall(struct.pack('>I', 3) + b'{{{')
+        assert 'error' in receive_frame(s)
+        # The connection stays usable
+        send_frame(s, {'command': 'ping'})
+        assert receive_frame(s) == {}
+
+def test_request_timeout() -> None:
+    server, port = start_server('--async', '--workers=1', '--timeout=0.001')
+    try:
+        result = request(port, {'command': 'compile', 'code': '{ var x = 1; ' + 'x = x + 1; ' * 300 + 'x }'})
+    finally:
+        server.terminate()
+        server.wait()
+    assert 'timed out' in result['error']
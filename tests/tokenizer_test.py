@@ -1,6 +1,9 @@
-from compiler.tokenizer import tokenize
+import pytest
+from compiler.tokenizer import tokenize, iter_tokens
 from compiler.token import Token
 from compiler.token_location import Location
+from compiler.token_buffer import TokenBuffer
+from compiler.parser import parse
 
 L = Location(1,1, True)
 
@@ -73,3 +76,48 @@ def test_multiline_comment() -> None:
     token4 = Token(')', 'punctuation', Location(6,14))
     assert tokenize('/*\nMany lines\nof comment\ntext.\n*/\nprint_int(123)\n/* Another\ncomment. */') == [token1, token2, token3, token4]
 
+
+def test_unexpected_character() -> None:
+    with pytest.raises(Exception, match='unexpected character "@"'):
+        tokenize("x = @")
+
+def test_locations_after_comments() -> None:
+    token1 = Token('a', 'identifier', Location(1,1))
+    token2 = Token('b', 'identifier', Location(2,5))
+    token3 = Token('c', 'identifier', Location(3,11))
+    assert tokenize("a // one\n/**/b /* two\n three */ c") == [token1, token2, token3]
+
+def test_iter_tokens_is_lazy() -> None:
+    tokens = iter_tokens("x = @")
+    assert next(tokens) == Token('x', 'identifier', Location(1,1))
+    assert next(tokens) == Token('=', 'operator', Location(1,3))
+    with pytest.raises(Exception):
+        next(tokens)
+
+def test_token_buffer_matches_tokenize() -> None:
+    source = '/* c */ var x = 12;\n  if x >= 3 then { print_int(x) } # done\nTrue'
+    buffer = TokenBuffer.from_source(source)
+    assert len(buffer) == len(tokenize(source))
+    assert list(buffer) == tokenize(source)
+    assert buffer[-1] == Token('True', 'bool_literal', Location(3,1))
+
+def test_token_buffer_can_be_parsed() -> None:
+    source = '{ var x = 1 + 2; if x < 3 then f(x, y) else -x }'
+    assert parse(TokenBuffer.from_source(source)) == parse(tokenize(source))
+
+def test_identifiers_are_interned() -> None:
+    names: dict[str, str] = {}
+    tokens = tokenize('count + count2 + count', names) + tokenize('{ count }', names)
+    counts = [t.text for t in tokens if t.text == 'count']
+    assert len(counts) == 3
+    assert all(text is counts[0] for text in counts)
+    assert names == {'count': 'count', 'count2': 'count2'}
+
+def test_token_location_is_packed() -> None:
+    token = tokenize('\n\n   x')[0]
+    assert isinstance(token.packed_location, int)
+    assert token.location == Location(3, 4)
+    assert not token.location.dummy
+    assert Token('x', 'identifier', L).location.dummy
+    assert token == Token('x', 'identifier', L)
+    assert token != Token('x', 'identifier', Location(3, 5))
@@ -11,7 +11,7 @@ from compiler.compiler import compile
 L = Location(1,1, True)
 
 def testtest():
-    c = compile('var x = 1 + 2 ')
+    c = compile('var x = 1 + 2 ', print_ir=True)
     assert c ==0
 
 def test_typecheck():
@@ -37,4 +37,12 @@ def test_typecheck_and():
 def test_typecheck_assigmenr():
     tokens = tokenize('{var x = 1;x = 2}')
     parsed = parse(tokens)
-    assert(typecheck(parsed) == Type('Int'))
\ No newline at end of file
+    assert(typecheck(parsed) == Type('Int'))
+
+def test_typecheck_sets_declared_type_field():
+    parsed = parse(tokenize('{ var x = 1; x < 2 }'))
+    assert parsed.type is None
+    typecheck(parsed)
+    assert parsed.type == Type('Bool')
+    assert parsed.statements[0].value.type == Type('Int')
+    assert not hasattr(parsed, '__dict__')